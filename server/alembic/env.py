@@ -0,0 +1,77 @@
+import os
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+from sqlalchemy import Column, create_engine, pool
+from sqlmodel import SQLModel
+
+# Register every table on SQLModel.metadata
+import app.models  # noqa: F401
+
+load_dotenv()
+
+config = context.config
+# The app sets configure_logger=False so its own logging setup is kept
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def get_url() -> str:
+    """
+    DATABASE_URL with any async driver swapped for its sync counterpart.
+    """
+    url = os.getenv("DATABASE_URL", "")
+    return url.replace("+asyncpg", "").replace("+aiosqlite", "")
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Leave expression indexes out of autogenerate: Alembic cannot compare
+    their expressions and would report them as changed on every run. They
+    are managed by hand.
+    """
+    if type_ == "index" and any(not isinstance(expr, Column) for expr in object.expressions):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """
+    Emit the migration SQL without connecting to a database.
+    """
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite can only alter tables by copying them
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
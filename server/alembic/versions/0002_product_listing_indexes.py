@@ -0,0 +1,65 @@
+"""product listing and search indexes
+
+Partial indexes for the active product listing filters (category, price
+range) and its newest-first order, plus the full-text search index that
+previously lived in sql/product_search_index.sql.
+
+On PostgreSQL the indexes are built CONCURRENTLY so the products table
+stays writable during the migration.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LISTING_INDEXES = [
+    ('ix_products_active_category_price', ['category_id', 'price']),
+    ('ix_products_active_price', ['price']),
+    ('ix_products_active_created_at_id', ['created_at', 'id']),
+    ('ix_products_active_category_created_at_id', ['category_id', 'created_at', 'id']),
+]
+
+# Superseded by the generated search_vector column in 0006
+SEARCH_VECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    active = sa.text('is_active')
+
+    if not is_postgresql:
+        for name, columns in LISTING_INDEXES:
+            op.create_index(name, 'products', columns, unique=False, sqlite_where=active)
+        return
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, columns in LISTING_INDEXES:
+            op.create_index(
+                name, 'products', columns, unique=False,
+                postgresql_where=active, postgresql_concurrently=True, if_not_exists=True
+            )
+        op.create_index(
+            'ix_products_search_vector', 'products', [sa.text(SEARCH_VECTOR)], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_products_search_vector', table_name='products', if_exists=True)
+    for name, _ in reversed(LISTING_INDEXES):
+        op.drop_index(name, table_name='products', if_exists=True)
@@ -0,0 +1,35 @@
+"""order idempotency key
+
+Checkout requests carry an Idempotency-Key; storing it on the order with
+a unique (user_id, idempotency_key) constraint lets a retried request
+find the order it already created.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True))
+        batch_op.create_unique_constraint('uq_orders_user_id_idempotency_key', ['user_id', 'idempotency_key'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_constraint('uq_orders_user_id_idempotency_key', type_='unique')
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,44 @@
+"""order history index
+
+The order history is a user's orders newest first, paged by
+(created_at, id); the composite index serves it without a sort and
+replaces the single-column user_id index it starts with.
+
+On PostgreSQL the index is built CONCURRENTLY so the orders table stays
+writable during the migration.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+        op.drop_index('ix_orders_user_id', table_name='orders')
+        return
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_orders_user_id', table_name='orders', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index('ix_orders_user_id', 'orders', ['user_id'], unique=False)
+    op.drop_index('ix_orders_user_id_created_at_id', table_name='orders')
@@ -0,0 +1,71 @@
+"""product search vector column
+
+Store the product search document in a generated search_vector column and
+index that column, instead of an expression index over to_tsvector(). The
+expression index only served queries whose SQL text matched the index
+expression exactly, which bound separator parameters could break; a
+column reference always matches, and ranking reads the stored vector
+rather than rebuilding it per row.
+
+On PostgreSQL the column is a STORED tsvector. Adding it rewrites the
+products table under an ACCESS EXCLUSIVE lock, so run this migration in a
+maintenance window on large catalogs. The GIN index is then built
+CONCURRENTLY. SQLite gets a virtual text column and no index.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay identical to app.models.product.SearchDocument
+SEARCH_DOCUMENT = "coalesce(name, '') || ' ' || coalesce(description, '')"
+SEARCH_VECTOR = f"to_tsvector('simple', {SEARCH_DOCUMENT})"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.add_column('products', sa.Column('search_vector', sa.Text(), sa.Computed(SEARCH_DOCUMENT)))
+        return
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction. The old
+    # expression index goes first so the table rewrite doesn't rebuild it.
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_products_search_vector', table_name='products', postgresql_concurrently=True, if_exists=True
+        )
+
+    op.execute(
+        f"ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_products_search_vector', 'products', ['search_vector'], unique=False,
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_column('products', 'search_vector')
+        return
+
+    op.drop_index('ix_products_search_vector', table_name='products', if_exists=True)
+    op.drop_column('products', 'search_vector')
+    op.create_index(
+        'ix_products_search_vector', 'products', [sa.text(SEARCH_VECTOR)], unique=False,
+        postgresql_using='gin', if_not_exists=True
+    )
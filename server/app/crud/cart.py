@@ -0,0 +1,242 @@
+from typing import Any, Dict, List, Tuple
+from uuid import UUID, uuid4
+from datetime import datetime
+from decimal import Decimal
+from sqlmodel import select, func
+from sqlalchemy import delete, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import product as product_crud
+from app.database import async_session_factory
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+from app.services.cart_store import (
+    CART_FLUSH_BATCH_SIZE, CART_FLUSH_INTERVAL, CartFlusher, CartItems, cart_store,
+    parse_cart_key, session_cart_key, user_cart_key
+)
+
+# Live carts are read and written in the cart store; the database copy
+# is kept up to date by the write-behind flusher.
+
+def _owner_filter(cart_key: str):
+    kind, value = parse_cart_key(cart_key)
+    if kind == "user":
+        return Cart.user_id == UUID(value)
+    return Cart.session_id == value
+
+async def load_cart_items(session: AsyncSession, cart_key: str) -> CartItems:
+    """
+    Read a cart's persisted items from the database.
+    """
+    query = (
+        select(CartItem.product_id, func.sum(CartItem.quantity))
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(_owner_filter(cart_key))
+        .group_by(CartItem.product_id)
+    )
+    result = await session.execute(query)
+    return {str(product_id): int(quantity) for product_id, quantity in result.all()}
+
+async def _ensure_loaded(session: AsyncSession, cart_key: str) -> CartItems:
+    """
+    Get a cart from the store, loading it from the database on first use.
+    """
+    items = await cart_store.get(cart_key)
+    if items is None:
+        items = await cart_store.load(cart_key, await load_cart_items(session, cart_key))
+    return items
+
+async def get_cart_items(session: AsyncSession, cart_key: str) -> CartItems:
+    """
+    Get a cart's items as {product_id: quantity}.
+    """
+    return await _ensure_loaded(session, cart_key)
+
+async def add_cart_item(session: AsyncSession, cart_key: str, product_id: UUID, quantity: int) -> int:
+    """
+    Atomically add quantity of a product to a cart.
+    Returns the product's new quantity in the cart.
+    """
+    await _ensure_loaded(session, cart_key)
+    return await cart_store.add(cart_key, str(product_id), quantity)
+
+async def set_cart_item_quantity(session: AsyncSession, cart_key: str, product_id: UUID, quantity: int) -> None:
+    """
+    Set a product's quantity in a cart; zero removes it.
+    """
+    await _ensure_loaded(session, cart_key)
+    await cart_store.set(cart_key, str(product_id), quantity)
+
+async def clear_cart(session: AsyncSession, cart_key: str) -> None:
+    """
+    Remove every item from a cart.
+    """
+    await cart_store.clear(cart_key)
+
+async def merge_carts(session: AsyncSession, source_key: str, target_key: str) -> CartItems:
+    """
+    Move every item of the source cart (an anonymous session cart) into
+    the target cart in one atomic store operation, adding up quantities of
+    products in both. Returns the target cart's items.
+    """
+    await _ensure_loaded(session, source_key)
+    await _ensure_loaded(session, target_key)
+    return await cart_store.merge(source_key, target_key)
+
+async def get_priced_cart(session: AsyncSession, cart_key: str) -> Dict[str, Any]:
+    """
+    Get a cart with its lines priced against current product data.
+    Quantities come from the cart store; prices, stock and the primary
+    image of every product in the cart are read in one query, so a
+    cart costs at most two queries (one more when the cart is loaded from
+    the database) whatever its size. Money is summed as Decimal.
+    Lines for inactive products are returned but not charged; products
+    that no longer exist are listed in missing_product_ids.
+    """
+    items = await _ensure_loaded(session, cart_key)
+    rows = {}
+    if items:
+        query = (
+            select(
+                Product.id, Product.name, Product.slug, Product.price, Product.sale_price,
+                Product.stock_quantity, Product.is_active,
+                product_crud.primary_image_url(Product.id).label("image_url")
+            )
+            .where(Product.id.in_([UUID(product_id) for product_id in items]))
+        )
+        rows = {str(row.id): row for row in (await session.execute(query)).all()}
+    
+    lines = []
+    missing_product_ids = []
+    subtotal = savings = Decimal("0.00")
+    item_count = 0
+    all_in_stock = True
+    for product_id, quantity in items.items():
+        row = rows.get(product_id)
+        if row is None:
+            missing_product_ids.append(product_id)
+            continue
+        
+        list_price = Decimal(row.price)
+        unit_price = product_crud.unit_price(row.price, row.sale_price)
+        line_total = unit_price * quantity
+        line_savings = (list_price - unit_price) * quantity
+        in_stock = row.stock_quantity >= quantity
+        
+        if row.is_active:
+            subtotal += line_total
+            savings += line_savings
+            item_count += quantity
+            all_in_stock = all_in_stock and in_stock
+        lines.append({
+            "product_id": product_id,
+            "name": row.name,
+            "slug": row.slug,
+            "image_url": row.image_url,
+            "quantity": quantity,
+            "list_price": list_price,
+            "unit_price": unit_price,
+            "line_total": line_total,
+            "line_savings": line_savings,
+            "stock_quantity": row.stock_quantity,
+            "in_stock": in_stock,
+            "is_active": row.is_active
+        })
+    
+    return {
+        "items": lines,
+        "item_count": item_count,
+        "subtotal": subtotal,
+        "savings": savings,
+        "all_in_stock": all_in_stock,
+        "missing_product_ids": missing_product_ids
+    }
+
+async def persist_carts(carts: Dict[str, CartItems]) -> None:
+    """
+    Write a batch of carts to carts/cart_items in one transaction.
+    Each cart's rows are replaced with its current items: one DELETE and
+    one multi-row INSERT for the whole batch. Products deleted since they
+    were added are dropped, and emptied anonymous carts are removed.
+    """
+    async with async_session_factory() as session:
+        # An empty anonymous cart never needs a row of its own
+        cart_ids, stored_cart_ids = await _get_or_create_cart_ids(
+            session,
+            list(carts),
+            [cart_key for cart_key, items in carts.items() if items or parse_cart_key(cart_key)[0] == "user"]
+        )
+
+        product_ids = {UUID(product_id) for items in carts.values() for product_id in items}
+        existing_products = set()
+        if product_ids:
+            existing_products = set(await session.scalars(select(Product.id).where(Product.id.in_(product_ids))))
+
+        await session.execute(delete(CartItem).where(CartItem.cart_id.in_(stored_cart_ids)))
+
+        now = datetime.utcnow()
+        rows = [
+            {"id": uuid4(), "cart_id": cart_ids[cart_key], "product_id": UUID(product_id), "quantity": quantity, "created_at": now}
+            for cart_key, items in carts.items()
+            for product_id, quantity in items.items()
+            if UUID(product_id) in existing_products
+        ]
+        if rows:
+            await session.execute(CartItem.__table__.insert(), rows)
+
+        empty_sessions = [
+            cart_ids[cart_key] for cart_key, items in carts.items()
+            if not items and cart_key in cart_ids and parse_cart_key(cart_key)[0] == "session"
+        ]
+        if empty_sessions:
+            await session.execute(delete(Cart).where(Cart.id.in_(empty_sessions)))
+        await session.execute(
+            update(Cart)
+            .where(Cart.id.in_([cart_id for cart_id in cart_ids.values() if cart_id not in empty_sessions]))
+            .values(updated_at=now)
+        )
+        await session.commit()
+
+async def _get_or_create_cart_ids(
+    session: AsyncSession,
+    cart_keys: List[str],
+    create_keys: List[str]
+) -> Tuple[Dict[str, UUID], List[UUID]]:
+    """
+    Map cart keys to cart rows, creating the missing ones among create_keys.
+    An owner with several rows maps to its oldest one.
+    Returns a tuple of (cart ids by key, ids of all existing rows)
+    """
+    owners: List[Tuple[str, str]] = [parse_cart_key(cart_key) for cart_key in cart_keys]
+    user_ids = [UUID(value) for kind, value in owners if kind == "user"]
+    session_ids = [value for kind, value in owners if kind == "session"]
+
+    result = await session.execute(
+        select(Cart.id, Cart.user_id, Cart.session_id)
+        .where(or_(Cart.user_id.in_(user_ids), Cart.session_id.in_(session_ids)))
+        .order_by(Cart.created_at)
+    )
+    cart_ids: Dict[str, UUID] = {}
+    stored_cart_ids = []
+    for cart_id, user_id, session_id in result.all():
+        stored_cart_ids.append(cart_id)
+        cart_key = user_cart_key(user_id) if user_id is not None else session_cart_key(session_id)
+        cart_ids.setdefault(cart_key, cart_id)
+
+    now = datetime.utcnow()
+    new_carts = []
+    for cart_key in create_keys:
+        if cart_key in cart_ids:
+            continue
+        kind, value = parse_cart_key(cart_key)
+        cart_ids[cart_key] = uuid4()
+        new_carts.append({
+            "id": cart_ids[cart_key],
+            "user_id": UUID(value) if kind == "user" else None,
+            "session_id": value if kind == "session" else None,
+            "created_at": now
+        })
+    if new_carts:
+        await session.execute(Cart.__table__.insert(), new_carts)
+    return cart_ids, stored_cart_ids
+
+cart_flusher = CartFlusher(cart_store, persist_carts, CART_FLUSH_INTERVAL, CART_FLUSH_BATCH_SIZE)
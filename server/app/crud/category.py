@@ -1,11 +1,33 @@
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
+from collections import defaultdict
+import os
 from sqlmodel import select, func
+from sqlalchemy import delete, exists, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from app.database import primary_session
 from app.models.category import Category
+from app.schemas.category import CategoryTree, CategoryTreeItem
+from app.services.cache import get_cache
+from app.services.catalog import bump_catalog_version
+from app.services.counts import DEFAULT_COUNT_STRATEGY, CountStrategy, TotalMode, fetch_page_and_count
+from app.utils.db_errors import integrity_error
 from fastapi import HTTPException
 
+# Pre-serialized category tree responses keyed by (parent_id, is_active).
+# Cleared on every category mutation; with the in-process backend the TTL
+# bounds staleness for other workers that did not see the mutation.
+CATEGORY_TREE_CACHE_TTL = int(os.getenv("CATEGORY_TREE_CACHE_TTL", "300"))
+category_tree_cache = get_cache("category_tree", ttl=CATEGORY_TREE_CACHE_TTL, max_entries=100)
+
+# Constraint names (as they appear in database errors) mapped to client errors
+CATEGORY_CONSTRAINT_ERRORS = {
+    "slug": "Category with this slug already exists",
+    "parent_id": "Parent category not found",
+}
+
 async def get_category(session: AsyncSession, category_id: UUID) -> Optional[Category]:
     """
     Get a category by ID.
@@ -29,54 +51,112 @@ async def get_categories(
     skip: int = 0, 
     limit: int = 100,
     parent_id: Optional[UUID] = None,
-    is_active: Optional[bool] = None
-) -> Tuple[List[Category], int]:
+    is_active: Optional[bool] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+    count_strategy: CountStrategy = CountStrategy(DEFAULT_COUNT_STRATEGY)
+) -> Tuple[List[Category], Optional[int], Optional[bool]]:
     """
     Get multiple categories with pagination.
-    Returns a tuple of (categories, total_count)
+    Returns a tuple of (categories, total_count, total_is_exact)
     """
-    query = select(Category)
-    count_query = select(func.count(Category.id))
+    filters = []
     
     # Apply filters
     if parent_id is not None:
-        query = query.where(Category.parent_id == parent_id)
-        count_query = count_query.where(Category.parent_id == parent_id)
+        filters.append(Category.parent_id == parent_id)
     
     if is_active is not None:
-        query = query.where(Category.is_active == is_active)
-        count_query = count_query.where(Category.is_active == is_active)
-    
-    # Get total count for pagination
-    total_result = await session.execute(count_query)
-    total = total_result.scalar_one()
+        filters.append(Category.is_active == is_active)
     
     # Apply pagination
-    query = query.offset(skip).limit(limit)
+    query = select(Category).where(*filters).offset(skip).limit(limit)
     
-    # Execute query
-    result = await session.execute(query)
-    categories = result.scalars().all()
-    
-    return categories, total
+    # Execute query, counting the total as selected by count_strategy
+    return await fetch_page_and_count(
+        session,
+        query,
+        model=Category,
+        filters=filters,
+        total_mode=total_mode,
+        cache_key=f"categories:{parent_id}:{is_active}",
+        strategy=count_strategy
+    )
 
-async def get_category_tree(session: AsyncSession, parent_id: Optional[UUID] = None, is_active: Optional[bool] = None) -> List[Category]:
+async def get_category_tree(session: AsyncSession, parent_id: Optional[UUID] = None, is_active: Optional[bool] = None) -> List[CategoryTreeItem]:
     """
     Get categories as a hierarchical tree.
     If parent_id is None, returns root categories.
+    All levels are loaded with a single query and assembled in memory.
     """
-    query = select(Category).where(Category.parent_id == parent_id)
+    query = select(
+        Category.id,
+        Category.parent_id,
+        Category.name,
+        Category.slug,
+        Category.description,
+        Category.image_url,
+        Category.is_active
+    ).order_by(Category.name)
     
     if is_active is not None:
         query = query.where(Category.is_active == is_active)
     
-    # Include subcategories
-    query = query.options(selectinload(Category.subcategories))
-    
     result = await session.execute(query)
-    categories = result.scalars().all()
     
-    return categories
+    # Group rows by parent so each node's children are found in O(1)
+    children_by_parent = defaultdict(list)
+    for row in result.all():
+        children_by_parent[row.parent_id].append(row)
+    
+    visited = set()
+    
+    def build(parent: Optional[UUID]) -> List[CategoryTreeItem]:
+        items = []
+        for row in children_by_parent.get(parent, []):
+            # Guard against parent cycles in bad data
+            if row.id in visited:
+                continue
+            visited.add(row.id)
+            items.append(CategoryTreeItem(
+                id=row.id,
+                name=row.name,
+                slug=row.slug,
+                description=row.description,
+                image_url=row.image_url,
+                is_active=row.is_active,
+                children=build(row.id)
+            ))
+        return items
+    
+    return build(parent_id)
+
+async def get_category_tree_json(session: AsyncSession, parent_id: Optional[UUID] = None, is_active: Optional[bool] = None) -> bytes:
+    """
+    Get the category tree as a pre-serialized JSON response body.
+    Served from the category tree cache when available; misses are read
+    from the primary.
+    """
+    key = f"{parent_id}:{is_active}"
+    body = await category_tree_cache.get(key)
+    if body is not None:
+        return body
+    
+    async with primary_session(session) as primary:
+        items = await get_category_tree(primary, parent_id=parent_id, is_active=is_active)
+    body = CategoryTree(items=items).model_dump_json().encode()
+    await category_tree_cache.set(key, body)
+    
+    return body
+
+async def invalidate_category_tree_cache() -> None:
+    """
+    Drop all cached category trees and bump the catalog version.
+    """
+    await category_tree_cache.clear()
+    await bump_catalog_version()
+
+async def _category_exists(session: AsyncSession, category_id: UUID) -> bool:
+    return await session.scalar(select(exists().where(Category.id == category_id)))
 
 async def create_category(
     session: AsyncSession, 
@@ -84,23 +164,24 @@ async def create_category(
 ) -> Category:
     """
     Create a new category.
+    Slug uniqueness is enforced by the database.
     """
-    # Check if slug already exists
-    existing_category = await get_category_by_slug(session, category_data["slug"])
-    if existing_category:
-        raise HTTPException(status_code=400, detail="Category with this slug already exists")
-    
     # Check if parent category exists if specified
     if category_data.get("parent_id"):
-        parent = await get_category(session, category_data["parent_id"])
-        if not parent:
+        if not await _category_exists(session, category_data["parent_id"]):
             raise HTTPException(status_code=400, detail="Parent category not found")
     
     # Create category
     category = Category(**category_data)
+    # A new category has no subcategories; don't lazy-load them for the response
+    category.subcategories = []
     session.add(category)
-    await session.commit()
-    await session.refresh(category)
+    try:
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise integrity_error(e, CATEGORY_CONSTRAINT_ERRORS, "Could not create category")
+    await invalidate_category_tree_cache()
     
     return category
 
@@ -110,59 +191,69 @@ async def update_category(
     category_data: Dict[str, Any]
 ) -> Optional[Category]:
     """
-    Update a category.
+    Update a category with a single UPDATE ... RETURNING.
+    Returns None if the category does not exist.
     """
-    category = await get_category(session, category_id)
-    if not category:
-        return None
-    
-    # Check if slug already exists if it's being updated
-    if "slug" in category_data and category_data["slug"] != category.slug:
-        existing_category = await get_category_by_slug(session, category_data["slug"])
-        if existing_category:
-            raise HTTPException(status_code=400, detail="Category with this slug already exists")
+    if not category_data:
+        return await get_category(session, category_id)
     
     # Check if parent category exists if it's being updated
-    if "parent_id" in category_data and category_data["parent_id"] != category.parent_id:
-        # Verify the parent exists
-        if category_data["parent_id"] is not None:
-            parent = await get_category(session, category_data["parent_id"])
-            if not parent:
-                raise HTTPException(status_code=400, detail="Parent category not found")
-        
+    if category_data.get("parent_id") is not None:
         # Prevent circular references
         if category_data["parent_id"] == category_id:
             raise HTTPException(status_code=400, detail="Category cannot be its own parent")
+        
+        if not await _category_exists(session, category_data["parent_id"]):
+            raise HTTPException(status_code=400, detail="Parent category not found")
     
-    # Update category fields
-    for field, value in category_data.items():
-        setattr(category, field, value)
-    
-    await session.commit()
-    await session.refresh(category)
+    query = (
+        update(Category)
+        .where(Category.id == category_id)
+        .values(**category_data)
+        .returning(Category)
+        .options(selectinload(Category.subcategories))
+    )
+    try:
+        result = await session.scalars(query, execution_options={"populate_existing": True})
+        category = result.one_or_none()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise integrity_error(e, CATEGORY_CONSTRAINT_ERRORS, "Could not update category")
     
+    if category:
+        await invalidate_category_tree_cache()
     return category
 
 async def delete_category(session: AsyncSession, category_id: UUID) -> bool:
     """
-    Delete a category.
+    Delete a category that has no subcategories.
+    Returns False if the category does not exist.
     """
-    category = await get_category(session, category_id)
-    if not category:
-        return False
-    
-    # Check if category has subcategories
-    if category.subcategories:
+    has_subcategories = exists().where(Category.parent_id == category_id)
+    try:
+        result = await session.execute(
+            delete(Category)
+            .where(Category.id == category_id, ~has_subcategories)
+            .returning(Category.id)
+        )
+        deleted = result.scalar_one_or_none() is not None
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
         raise HTTPException(
             status_code=400, 
-            detail="Cannot delete category with subcategories. Delete or reassign subcategories first."
+            detail="Cannot delete category with products. Delete or reassign its products first."
         )
     
-    # Check if category has associated products
-    # This would require a query to check if any products use this category
-    # For simplicity, this check is not implemented here
-    
-    await session.delete(category)
-    await session.commit()
+    if not deleted:
+        # Either missing or guarded by the subcategory check
+        if await _category_exists(session, category_id):
+            raise HTTPException(
+                status_code=400, 
+                detail="Cannot delete category with subcategories. Delete or reassign subcategories first."
+            )
+        return False
     
-    return True 
\ No newline at end of file
+    await invalidate_category_tree_cache()
+    return True
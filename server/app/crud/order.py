@@ -0,0 +1,233 @@
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from datetime import datetime
+from decimal import Decimal
+from sqlmodel import select, func
+from sqlalchemy import and_, exists, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from fastapi import HTTPException, status
+from app.crud import cart as cart_crud
+from app.crud import product as product_crud
+from app.crud import reservation as reservation_crud
+from app.models.address import Address
+from app.models.order import Order, OrderItem
+from app.models.product import Product, ProductImage
+from app.utils.db_errors import integrity_error
+from app.utils.pagination import encode_cursor, decode_cursor
+
+# Constraint names (as they appear in database errors) mapped to client errors
+ORDER_CONSTRAINT_ERRORS = {
+    "shipping_address_id": "Shipping address not found",
+    "product_id": "Product not found",
+}
+
+async def get_user_orders(
+    session: AsyncSession,
+    user_id: UUID,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get a page of a user's orders, newest first, with keyset pagination on
+    (created_at, id) served by ix_orders_user_id_created_at_id.
+    Each order's line count, item count and thumbnail (the primary image
+    of its most expensive line) are aggregated over the page's orders only,
+    in the same query.
+    Returns a tuple of (orders, next_cursor)
+    """
+    page = select(Order.id, Order.status, Order.total_amount, Order.created_at).where(Order.user_id == user_id)
+    if cursor:
+        created_at, order_id = _parse_order_cursor(cursor)
+        page = page.where(tuple_(Order.created_at, Order.id) < tuple_(created_at, order_id))
+    # Fetch one extra row to know whether there is a next page
+    page = page.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).subquery()
+
+    thumbnail = (
+        select(ProductImage.image_url)
+        .join(OrderItem, and_(OrderItem.product_id == ProductImage.product_id, ProductImage.is_primary))
+        .where(OrderItem.order_id == page.c.id)
+        .order_by(OrderItem.price_at_purchase.desc(), OrderItem.id, ProductImage.display_order, ProductImage.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            page.c.id, page.c.status, page.c.total_amount, page.c.created_at,
+            func.count(OrderItem.id).label("line_count"),
+            func.coalesce(func.sum(OrderItem.quantity), 0).label("item_count"),
+            thumbnail.label("thumbnail_url")
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == page.c.id)
+        .group_by(page.c.id, page.c.status, page.c.total_amount, page.c.created_at)
+        .order_by(page.c.created_at.desc(), page.c.id.desc())
+    )
+    orders = [dict(row._mapping) for row in (await session.execute(query)).all()]
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1]["created_at"], orders[-1]["id"])
+    return orders, next_cursor
+
+def _parse_order_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Parse an order history cursor into its (created_at, id) values.
+    """
+    created_at, order_id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), UUID(order_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+async def get_user_order(session: AsyncSession, user_id: UUID, order_id: UUID) -> Optional[Dict[str, Any]]:
+    """
+    Get one of a user's orders with its shipping address and lines, each
+    line with its product's name, slug and primary image.
+    Two queries: the order joined to its address, then the lines joined
+    to their products, with one primary image each.
+    """
+    query = (
+        select(Order)
+        .where(Order.id == order_id, Order.user_id == user_id)
+        .options(joinedload(Order.shipping_address))
+    )
+    order = (await session.execute(query)).scalars().first()
+    if not order:
+        return None
+
+    lines = (
+        select(
+            OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.price_at_purchase,
+            Product.name, Product.slug, product_crud.primary_image_url(OrderItem.product_id).label("image_url")
+        )
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id == order_id)
+        .order_by(OrderItem.price_at_purchase.desc(), OrderItem.id)
+    )
+    items = [dict(row._mapping) for row in (await session.execute(lines)).all()]
+
+    return {
+        **{field: getattr(order, field) for field in Order.model_fields if field != "items"},
+        "shipping_address": order.shipping_address,
+        "items": items
+    }
+
+async def get_order_by_idempotency_key(session: AsyncSession, user_id: UUID, idempotency_key: str) -> Optional[Order]:
+    """
+    Get the order a user created with an idempotency key, with its items.
+    """
+    query = (
+        select(Order)
+        .where(Order.user_id == user_id, Order.idempotency_key == idempotency_key)
+        .options(selectinload(Order.items))
+    )
+    result = await session.execute(query)
+    return result.scalars().first()
+
+async def checkout(
+    session: AsyncSession,
+    user_id: UUID,
+    cart_key: str,
+    shipping_address_id: UUID,
+    idempotency_key: str
+) -> Tuple[Order, bool]:
+    """
+    Turn a cart into an order.
+    The cart's stock hold is taken first (or refreshed if it no longer
+    matches the cart), so only buyers who got stock reach the product
+    rows. Their stock is then taken by one conditional UPDATE, and the
+    order with its items (priced at the reserved rows' current price) is
+    written in the same transaction that commits the hold, so stock can't
+    be oversold and a failed checkout leaves it untouched; a checkout
+    rejected for stock releases the cart's hold. The idempotency
+    key makes retries safe: a repeated request returns the order the first
+    one created.
+    Returns a tuple of (order, created)
+    """
+    order = await get_order_by_idempotency_key(session, user_id, idempotency_key)
+    if order:
+        return order, False
+
+    address_exists = await session.scalar(
+        select(exists().where(Address.id == shipping_address_id, Address.user_id == user_id))
+    )
+    if not address_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Shipping address not found"
+        )
+
+    items = await cart_crud.get_cart_items(session, cart_key)
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cart is empty"
+        )
+
+    quantities = {UUID(product_id): quantity for product_id, quantity in items.items()}
+    if await reservation_crud.get_hold(session, cart_key) != quantities:
+        await reservation_crud.hold_stock(session, cart_key, quantities)
+
+    reserved = await product_crud.reserve_product_stock(session, quantities)
+    if len(reserved) < len(quantities):
+        # The hold was committed by hold_stock, so it outlives the rollback.
+        # Its counts were wrong for the short products, so those are
+        # reloaded from the database on next use.
+        short = [product_id for product_id in quantities if product_id not in reserved]
+        await session.rollback()
+        await reservation_crud.release_hold(session, cart_key)
+        await reservation_crud.forget_available_stock(short)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Not enough stock",
+                "product_ids": [str(product_id) for product_id in short]
+            }
+        )
+
+    order_items = []
+    total_amount = Decimal("0.00")
+    for product_id, quantity in quantities.items():
+        row = reserved[product_id]
+        price = product_crud.unit_price(row.price, row.sale_price)
+        total_amount += price * quantity
+        order_items.append(OrderItem(product_id=product_id, quantity=quantity, price_at_purchase=price))
+
+    order = Order(
+        user_id=user_id,
+        shipping_address_id=shipping_address_id,
+        total_amount=total_amount,
+        idempotency_key=idempotency_key,
+        items=order_items
+    )
+    session.add(order)
+    try:
+        await session.flush()
+        short, surplus = await reservation_crud.consume_hold(session, cart_key, order.id, quantities)
+        if short:
+            await session.rollback()
+            await reservation_crud.release_hold(session, cart_key)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": "Stock hold expired", "product_ids": short}
+            )
+        await session.commit()
+    except IntegrityError as e:
+        # A concurrent request with the same key got there first; its
+        # reservation stands and ours is rolled back
+        await session.rollback()
+        existing = await get_order_by_idempotency_key(session, user_id, idempotency_key)
+        if existing:
+            return existing, False
+        raise integrity_error(e, ORDER_CONSTRAINT_ERRORS, "Could not create order")
+
+    await reservation_crud.give_back(surplus)
+    await cart_crud.clear_cart(session, cart_key)
+    await product_crud.invalidate_product_caches(list(quantities))
+
+    return order, True
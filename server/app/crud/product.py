@@ -1,11 +1,49 @@
-from typing import List, Optional, Dict, Any, Tuple
-from uuid import UUID
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from uuid import UUID, uuid4
+from datetime import datetime
+from decimal import Decimal
 from sqlmodel import select, func
+from sqlalchemy import and_, case, delete, exists, literal, or_, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from app.crud import reservation as reservation_crud
+from app.database import is_replica_session, primary_session
+from app.models.category import Category
 from app.models.product import Product, ProductImage
-from fastapi import HTTPException
+from app.models.review import Review
+from app.schemas.product import Product as ProductSchema, ProductCreate, ProductSort
+from app.services.cache import get_cache
+from app.services.catalog import bump_catalog_version, get_catalog_version
+from app.services.counts import DEFAULT_COUNT_STRATEGY, CountStrategy, TotalMode, count_cache, fetch_page_and_count
+from app.services.search import product_search_clause
+from app.utils.db_errors import integrity_error
+from app.utils.pagination import PaginationMode, encode_cursor, decode_cursor
+from fastapi import HTTPException, status
 import math
+import os
+
+# Read-through cache for product detail lookups, keyed by id.
+# Slug keys only map to the product id, so a renamed slug can never
+# serve a stale entry: the cached product's slug is checked on read.
+# Each product has a generation counter, bumped on invalidation. A miss
+# reads it before loading the product and only stores the entry if it is
+# unchanged, so a load that raced an update never re-caches the old row.
+PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", "60"))
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+product_cache = get_cache("product", ttl=PRODUCT_CACHE_TTL, max_entries=PRODUCT_CACHE_MAX_ENTRIES)
+
+# Constraint names (as they appear in database errors) mapped to client errors
+PRODUCT_CONSTRAINT_ERRORS = {
+    "slug": "Product with this slug already exists",
+    "category_id": "Category not found",
+}
+
+# Lower edges of the price facet buckets; the last bucket is open-ended
+PRICE_FACET_BUCKETS = [
+    Decimal(edge) for edge in os.getenv("PRICE_FACET_BUCKETS", "0,25,50,100,250,500,1000").split(",")
+]
 
 # PRODUCT OPERATIONS
 async def get_product(session: AsyncSession, product_id: UUID) -> Optional[Product]:
@@ -24,6 +62,241 @@ async def get_product_by_slug(session: AsyncSession, slug: str) -> Optional[Prod
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+def _generation_key(product_id: Any) -> str:
+    return f"generation:{product_id}"
+
+async def _cache_products(products: List[Product], generations: Dict[str, Optional[int]]) -> List[Dict[str, Any]]:
+    """
+    Serialize products and map their slugs to their ids. Each product is
+    stored under its id only if its generation was read before it was
+    loaded and has not changed since.
+    """
+    items, slugs = [], {}
+    for product in products:
+        data = ProductSchema.model_validate(product).model_dump(mode="json")
+        items.append(data)
+        slugs[f"slug:{data['slug']}"] = data["id"]
+    await product_cache.set_many(slugs)
+    await product_cache.set_many_if_counters([
+        (f"id:{data['id']}", data, _generation_key(data["id"]), generations[data["id"]])
+        for data in items if generations.get(data["id"]) is not None
+    ])
+    return items
+
+async def get_product_cached(session: AsyncSession, product_id: UUID) -> Optional[Dict[str, Any]]:
+    """
+    Get a serialized product by ID through the product cache.
+    Misses are read from the primary.
+    """
+    data = await product_cache.get(f"id:{product_id}")
+    if data is not None:
+        return data
+    
+    generation = await product_cache.get_counter(_generation_key(product_id))
+    async with primary_session(session) as primary:
+        product = await get_product(primary, product_id)
+    if not product:
+        return None
+    
+    return (await _cache_products([product], {str(product_id): generation}))[0]
+
+async def get_product_by_slug_cached(session: AsyncSession, slug: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a serialized product by slug through the product cache.
+    A slug already mapped to an id goes through the id lookup; other
+    misses are read from the primary and only cache the slug mapping,
+    since the product's generation could not be read before the load.
+    """
+    product_id = await product_cache.get(f"slug:{slug}")
+    if product_id is not None:
+        data = await get_product_cached(session, UUID(product_id))
+        if data is not None and data["slug"] == slug:
+            return data
+    
+    async with primary_session(session) as primary:
+        product = await get_product_by_slug(primary, slug)
+    if not product:
+        return None
+    
+    return (await _cache_products([product], {}))[0]
+
+async def get_products_by_keys_cached(
+    session: AsyncSession,
+    ids: List[UUID],
+    slugs: List[str]
+) -> Tuple[List[Dict[str, Any]], List[UUID], List[str]]:
+    """
+    Get serialized products by ids and slugs through the product cache.
+    Products come back in the requested order (ids, then slugs), each once.
+    The cache is read in two round trips (slugs, then ids), and all
+    misses are loaded from the primary together, with one query for
+    products and one for their images. Generations are read for the
+    missed products whose ids are known before the load.
+    Returns a tuple of (products, missing_ids, missing_slugs)
+    """
+    ids = list(dict.fromkeys(ids))
+    slugs = list(dict.fromkeys(slugs))
+    
+    cached_slug_ids = await product_cache.get_many([f"slug:{slug}" for slug in slugs])
+    slug_ids = {slug: product_id for slug, product_id in zip(slugs, cached_slug_ids) if product_id is not None}
+    lookup_ids = list(dict.fromkeys([str(product_id) for product_id in ids] + list(slug_ids.values())))
+    cached = await product_cache.get_many([f"id:{product_id}" for product_id in lookup_ids])
+    by_id = {product_id: data for product_id, data in zip(lookup_ids, cached) if data is not None}
+    # A renamed slug must not serve the product it used to point to
+    by_slug = {
+        slug: by_id[product_id] for slug, product_id in slug_ids.items()
+        if product_id in by_id and by_id[product_id]["slug"] == slug
+    }
+    
+    uncached_ids = [product_id for product_id in ids if str(product_id) not in by_id]
+    uncached_slugs = [slug for slug in slugs if slug not in by_slug]
+    if uncached_ids or uncached_slugs:
+        conditions = []
+        if uncached_ids:
+            conditions.append(Product.id.in_(uncached_ids))
+        if uncached_slugs:
+            conditions.append(Product.slug.in_(uncached_slugs))
+        query = select(Product).where(or_(*conditions)).options(selectinload(Product.images))
+        known_ids = list(dict.fromkeys(
+            [str(product_id) for product_id in uncached_ids]
+            + [slug_ids[slug] for slug in uncached_slugs if slug in slug_ids]
+        ))
+        generations = dict(zip(
+            known_ids, await product_cache.get_counters([_generation_key(product_id) for product_id in known_ids])
+        ))
+        async with primary_session(session) as primary:
+            products_loaded = (await primary.scalars(query)).all()
+        for data in await _cache_products(products_loaded, generations):
+            by_id[data["id"]] = data
+            by_slug[data["slug"]] = data
+    
+    products, seen = [], set()
+    missing_ids, missing_slugs = [], []
+    for key, data, missing in (
+        *[(product_id, by_id.get(str(product_id)), missing_ids) for product_id in ids],
+        *[(slug, by_slug.get(slug), missing_slugs) for slug in slugs]
+    ):
+        if data is None:
+            missing.append(key)
+        elif data["id"] not in seen:
+            seen.add(data["id"])
+            products.append(data)
+    
+    return products, missing_ids, missing_slugs
+
+async def invalidate_product_cache(product_id: UUID) -> None:
+    """
+    Drop the cached entry for a product after it or its images change,
+    and bump the catalog version used for list ETags.
+    """
+    await invalidate_product_caches([product_id])
+
+async def invalidate_product_caches(product_ids: List[UUID]) -> None:
+    """
+    Drop the cached entries for several products (e.g. after their stock
+    changed) and bump the catalog version once.
+    """
+    if not product_ids:
+        return
+    # Bump the generations first, so a load already under way can't store
+    # its entry once it has been dropped
+    await product_cache.incr_many([_generation_key(product_id) for product_id in product_ids])
+    await product_cache.delete(*[f"id:{product_id}" for product_id in product_ids])
+    await bump_catalog_version()
+
+def unit_price(price: Decimal, sale_price: Optional[Decimal]) -> Decimal:
+    """
+    The price a product sells for: its sale price when that is lower.
+    """
+    price = Decimal(price)
+    if sale_price is not None and Decimal(sale_price) < price:
+        return Decimal(sale_price)
+    return price
+
+async def reserve_product_stock(session: AsyncSession, quantities: Dict[UUID, int]) -> Dict[UUID, Any]:
+    """
+    Take stock for several active products in one conditional UPDATE:
+    stock_quantity = stock_quantity - n WHERE stock_quantity >= n.
+    updated_at is bumped too, so the product's ETag changes with its stock.
+    Only rows with enough stock are changed and returned, so a caller that
+    gets fewer rows back than it asked for must roll back. Nothing is
+    committed here; the row locks are held until the caller's transaction
+    ends.
+    Returns {product_id: row with price and sale_price} for reserved products.
+    """
+    if not quantities:
+        return {}
+    # Rows are locked in index (id) order whatever order the cart lists them in
+    product_ids = sorted(quantities)
+    requested = case({product_id: quantities[product_id] for product_id in product_ids}, value=Product.id)
+    result = await session.execute(
+        update(Product)
+        .where(
+            Product.id.in_(product_ids),
+            Product.is_active,
+            Product.stock_quantity >= requested
+        )
+        .values(stock_quantity=Product.stock_quantity - requested, updated_at=datetime.utcnow())
+        .returning(Product.id, Product.price, Product.sale_price)
+        .execution_options(synchronize_session=False)
+    )
+    return {row.id: row for row in result.all()}
+
+async def _touch_product(session: AsyncSession, product_id: UUID) -> bool:
+    """
+    Bump a product's updated_at so its ETag changes when its images change.
+    Returns False if the product does not exist.
+    """
+    result = await session.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(updated_at=datetime.utcnow())
+        .returning(Product.id)
+    )
+    return result.scalar_one_or_none() is not None
+
+def _product_sort_key(sort: ProductSort) -> Tuple[Any, bool]:
+    """
+    Get the (expression, descending) sort key for a product sort.
+    Ties are always broken by id in the same direction.
+    """
+    if sort == ProductSort.PRICE:
+        return Product.price, False
+    if sort == ProductSort.PRICE_DESC:
+        return Product.price, True
+    if sort == ProductSort.RATING:
+        # Average review rating, unrated products last
+        rating = (
+            select(func.coalesce(func.avg(Review.rating), 0))
+            .where(Review.product_id == Product.id)
+            .scalar_subquery()
+        )
+        return rating, True
+    return Product.created_at, True
+
+def _product_filters(
+    dialect_name: str,
+    search: Optional[str],
+    is_active: Optional[bool]
+) -> Tuple[List[Any], Optional[Any]]:
+    """
+    Build the filters every product listing and facet count shares.
+    Returns a tuple of (filters, search_rank)
+    """
+    filters = []
+    search_rank = None
+    if search and search.strip():
+        search_filter, search_rank = product_search_clause(dialect_name, search)
+        filters.append(search_filter)
+    
+    if is_active is not None:
+        filters.append(Product.is_active == is_active)
+    
+    return filters, search_rank
+
+def _in_stock_filter(in_stock: bool) -> Any:
+    return Product.stock_quantity > 0 if in_stock else Product.stock_quantity <= 0
+
 async def get_products(
     session: AsyncSession, 
     skip: int = 0, 
@@ -32,56 +305,191 @@ async def get_products(
     search: Optional[str] = None,
     price_min: Optional[float] = None,
     price_max: Optional[float] = None,
-    is_active: Optional[bool] = True
-) -> Tuple[List[Product], int]:
+    is_active: Optional[bool] = True,
+    in_stock: Optional[bool] = None,
+    sort: Optional[ProductSort] = None,
+    pagination: PaginationMode = PaginationMode.OFFSET,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = TotalMode.EXACT,
+    count_strategy: CountStrategy = CountStrategy(DEFAULT_COUNT_STRATEGY)
+) -> Tuple[List[Product], Optional[int], Optional[bool], Optional[str]]:
     """
-    Get multiple products with pagination and filtering.
-    Returns a tuple of (products, total_count)
+    Get multiple products with pagination, filtering and sorting.
+    Without a sort, search results are ordered by relevance and other
+    listings newest first.
+    In keyset mode (or when a cursor is given) pages follow (sort key, id)
+    from the cursor instead of using OFFSET, and skip is ignored. The total
+    is only counted for the first keyset page; later pages skip the count
+    so they cost the same however deep they are.
+    count_strategy selects how the total is fetched alongside the page.
+    Returns a tuple of (products, total_count, total_is_exact, next_cursor)
     """
-    # Base query with relationship loading
-    query = select(Product).options(selectinload(Product.images))
-    count_query = select(func.count(Product.id))
+    filters, search_rank = _product_filters(session.bind.dialect.name, search, is_active)
     
     # Apply filters
     if category_id is not None:
-        query = query.where(Product.category_id == category_id)
-        count_query = count_query.where(Product.category_id == category_id)
-        
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.where(
-            (Product.name.ilike(search_pattern)) | 
-            (Product.description.ilike(search_pattern))
-        )
-        count_query = count_query.where(
-            (Product.name.ilike(search_pattern)) | 
-            (Product.description.ilike(search_pattern))
-        )
+        filters.append(Product.category_id == category_id)
     
     if price_min is not None:
-        query = query.where(Product.price >= price_min)
-        count_query = count_query.where(Product.price >= price_min)
+        filters.append(Product.price >= price_min)
         
     if price_max is not None:
-        query = query.where(Product.price <= price_max)
-        count_query = count_query.where(Product.price <= price_max)
+        filters.append(Product.price <= price_max)
     
-    if is_active is not None:
-        query = query.where(Product.is_active == is_active)
-        count_query = count_query.where(Product.is_active == is_active)
+    if in_stock is not None:
+        filters.append(_in_stock_filter(in_stock))
+    
+    count_args = dict(
+        model=Product,
+        filters=filters,
+        total_mode=total_mode,
+        cache_key=f"products:{category_id}:{search}:{price_min}:{price_max}:{is_active}:{in_stock}",
+        strategy=count_strategy
+    )
     
-    # Get total count for pagination
-    total_result = await session.execute(count_query)
-    total = total_result.scalar_one()
+    # Base query with relationship loading
+    query = select(Product).options(selectinload(Product.images)).where(*filters)
     
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
+    # Offset pagination, most relevant first when searching without an
+    # explicit sort; id breaks ties so pages are stable
+    if pagination == PaginationMode.OFFSET and not cursor:
+        if sort is None and search_rank is not None:
+            query = query.order_by(search_rank.desc(), Product.id)
+        else:
+            key, descending = _product_sort_key(sort or ProductSort.NEWEST)
+            if descending:
+                query = query.order_by(key.desc(), Product.id.desc())
+            else:
+                query = query.order_by(key, Product.id)
+        query = query.offset(skip).limit(limit)
+        products, total, total_is_exact = await fetch_page_and_count(session, query, **count_args)
+        return products, total, total_is_exact, None
     
-    # Execute query
-    result = await session.execute(query)
-    products = result.scalars().all()
+    # Keyset pagination
+    sort = sort or ProductSort.NEWEST
+    key, descending = _product_sort_key(sort)
+    if descending:
+        query = query.order_by(key.desc(), Product.id.desc())
+    else:
+        query = query.order_by(key, Product.id)
+    if cursor:
+        key_value, product_id = _parse_product_cursor(cursor, sort)
+        if descending:
+            query = query.where(tuple_(key, Product.id) < tuple_(key_value, product_id))
+        else:
+            query = query.where(tuple_(key, Product.id) > tuple_(key_value, product_id))
+        # The client already has the total from the first page
+        count_args["total_mode"] = TotalMode.NONE
+    
+    # Fetch one extra row to know whether there is a next page
+    products, total, total_is_exact = await fetch_page_and_count(session, query.limit(limit + 1), **count_args)
+    
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        last = products[-1]
+        if sort == ProductSort.RATING:
+            key_value = await session.scalar(select(key).where(Product.id == last.id))
+        else:
+            key_value = getattr(last, key.key)
+        next_cursor = encode_cursor(sort.value, key_value, last.id)
     
-    return products, total
+    return products, total, total_is_exact, next_cursor
+
+def _parse_product_cursor(cursor: str, sort: ProductSort) -> Tuple[Any, UUID]:
+    """
+    Parse a product listing cursor into its (sort key, id) values.
+    The cursor must have been issued for the same sort.
+    """
+    cursor_sort, key_value, product_id = decode_cursor(cursor, 3)
+    try:
+        if cursor_sort != sort.value:
+            raise ValueError("Cursor was issued for a different sort")
+        if sort == ProductSort.NEWEST:
+            return datetime.fromisoformat(key_value), UUID(product_id)
+        return Decimal(key_value), UUID(product_id)
+    except (ValueError, ArithmeticError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+async def get_product_facets(
+    session: AsyncSession,
+    category_id: Optional[UUID] = None,
+    search: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    is_active: Optional[bool] = True,
+    in_stock: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Get category, price bucket and stock facet counts for a product listing.
+    All facets come from one query grouped by (category, price bucket,
+    in stock, in price range) over the search and is_active filters; the
+    category, price and stock filters are applied while rolling the groups
+    up, each facet ignoring its own. Results are cached per catalog version.
+    """
+    cache_key = f"facets:{await get_catalog_version()}:{category_id}:{search}:{price_min}:{price_max}:{is_active}:{in_stock}"
+    cached = await count_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    filters, _ = _product_filters(session.bind.dialect.name, search, is_active)
+    
+    bucket = case(
+        *[(Product.price < edge, index) for index, edge in enumerate(PRICE_FACET_BUCKETS[1:])],
+        else_=len(PRICE_FACET_BUCKETS) - 1
+    )
+    price_filters = []
+    if price_min is not None:
+        price_filters.append(Product.price >= price_min)
+    if price_max is not None:
+        price_filters.append(Product.price <= price_max)
+    in_price_range = and_(*price_filters) if price_filters else literal(True)
+    
+    # Group over a subquery so the bucket expression's bound parameters
+    # are not repeated in GROUP BY
+    matches = select(
+        Product.category_id,
+        bucket.label("bucket"),
+        (Product.stock_quantity > 0).label("in_stock"),
+        in_price_range.label("in_price_range")
+    ).where(*filters).subquery()
+    columns = list(matches.c)
+    rows = (await session.execute(select(*columns, func.count()).group_by(*columns))).all()
+    
+    categories: Dict[UUID, int] = {}
+    buckets = [0] * len(PRICE_FACET_BUCKETS)
+    stock = {"in_stock": 0, "out_of_stock": 0}
+    for row_category_id, row_bucket, row_in_stock, row_in_price_range, count in rows:
+        row_in_stock = bool(row_in_stock)
+        category_match = category_id is None or row_category_id == category_id
+        stock_match = in_stock is None or row_in_stock == in_stock
+        if row_in_price_range and stock_match:
+            categories[row_category_id] = categories.get(row_category_id, 0) + count
+        if category_match and stock_match:
+            buckets[row_bucket] += count
+        if category_match and row_in_price_range:
+            stock["in_stock" if row_in_stock else "out_of_stock"] += count
+    
+    edges = PRICE_FACET_BUCKETS + [None]
+    facets = {
+        "categories": [
+            {"category_id": str(key), "count": count}
+            for key, count in sorted(categories.items(), key=lambda item: -item[1])
+        ],
+        "price_buckets": [
+            {"min": str(edges[index]), "max": str(edges[index + 1]) if edges[index + 1] is not None else None, "count": count}
+            for index, count in enumerate(buckets)
+        ],
+        "stock": stock
+    }
+    # Facets are computed wherever the listing is read, but a replica's
+    # may lag the catalog version they would be cached under
+    if not is_replica_session(session):
+        await count_cache.set(cache_key, facets)
+    return facets
 
 async def create_product(
     session: AsyncSession, 
@@ -89,17 +497,18 @@ async def create_product(
 ) -> Product:
     """
     Create a new product.
+    Slug uniqueness is enforced by the database.
     """
-    # Check if slug already exists
-    existing_product = await get_product_by_slug(session, product_data["slug"])
-    if existing_product:
-        raise HTTPException(status_code=400, detail="Product with this slug already exists")
-    
-    # Create product
     product = Product(**product_data)
+    # A new product has no images; don't lazy-load them for the response
+    product.images = []
     session.add(product)
-    await session.commit()
-    await session.refresh(product)
+    try:
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise integrity_error(e, PRODUCT_CONSTRAINT_ERRORS, "Could not create product")
+    await bump_catalog_version()
     
     return product
 
@@ -109,39 +518,141 @@ async def update_product(
     product_data: Dict[str, Any]
 ) -> Optional[Product]:
     """
-    Update a product.
+    Update a product with a single UPDATE ... RETURNING.
+    Returns None if the product does not exist.
     """
-    product = await get_product(session, product_id)
-    if not product:
-        return None
-    
-    # Check if slug already exists if it's being updated
-    if "slug" in product_data and product_data["slug"] != product.slug:
-        existing_product = await get_product_by_slug(session, product_data["slug"])
-        if existing_product:
-            raise HTTPException(status_code=400, detail="Product with this slug already exists")
-    
-    # Update product fields
-    for field, value in product_data.items():
-        setattr(product, field, value)
-    
-    await session.commit()
-    await session.refresh(product)
+    query = (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(**product_data, updated_at=datetime.utcnow())
+        .returning(Product)
+        .options(selectinload(Product.images))
+    )
+    try:
+        result = await session.scalars(query, execution_options={"populate_existing": True})
+        product = result.one_or_none()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise integrity_error(e, PRODUCT_CONSTRAINT_ERRORS, "Could not update product")
     
+    if product:
+        await invalidate_product_cache(product_id)
+        if "stock_quantity" in product_data or "is_active" in product_data:
+            await reservation_crud.forget_available_stock([product_id])
     return product
 
 async def delete_product(session: AsyncSession, product_id: UUID) -> bool:
     """
-    Delete a product.
+    Delete a product and its images.
+    Returns False if the product does not exist.
     """
-    product = await get_product(session, product_id)
-    if not product:
-        return False
+    await session.execute(delete(ProductImage).where(ProductImage.product_id == product_id))
+    try:
+        result = await session.execute(
+            delete(Product).where(Product.id == product_id).returning(Product.id)
+        )
+        deleted = result.scalar_one_or_none() is not None
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete a product that is referenced by carts, orders, reviews or stock reservations"
+        )
     
-    await session.delete(product)
-    await session.commit()
+    if deleted:
+        await invalidate_product_cache(product_id)
+        await reservation_crud.forget_available_stock([product_id])
+    return deleted
+
+# BULK OPERATIONS
+async def upsert_products(session: AsyncSession, products: List[Dict[str, Any]]) -> Tuple[int, Dict[int, str]]:
+    """
+    Insert a batch of products, updating the existing ones with the same
+    slug, in one transaction with a multi-row
+    INSERT ... ON CONFLICT (slug) DO UPDATE. Rows that match what is stored
+    are left alone, and a later row in the batch replaces an earlier one
+    with the same slug. Rows referencing unknown categories are rejected
+    up front, so one bad row doesn't fail the whole batch.
+    Returns a tuple of (written_count, errors by index in products)
+    """
+    errors: Dict[int, str] = {}
+    category_ids = {product_data["category_id"] for product_data in products}
+    known_categories = set(await session.scalars(select(Category.id).where(Category.id.in_(category_ids))))
     
-    return True
+    rows_by_slug: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    for index, product_data in enumerate(products):
+        if product_data["category_id"] not in known_categories:
+            errors[index] = PRODUCT_CONSTRAINT_ERRORS["category_id"]
+            continue
+        rows_by_slug[product_data["slug"]] = (index, product_data)
+    if not rows_by_slug:
+        return 0, errors
+    
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        for _, product_data in rows_by_slug.values():
+            product = await get_product_by_slug(session, product_data["slug"])
+            if product:
+                await update_product(session, product.id, product_data)
+            else:
+                await create_product(session, product_data)
+        return len(rows_by_slug), errors
+    
+    # Executed with a parameter list, the statement is compiled once and
+    # sent as multi-row VALUES batches ("insertmanyvalues")
+    now = datetime.utcnow()
+    columns = Product.__table__.c
+    fields = [field for field in products[0] if field != "slug"]
+    stmt = insert(Product.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[columns.slug],
+        set_={**{field: stmt.excluded[field] for field in fields}, "updated_at": now},
+        where=or_(*[columns[field].is_distinct_from(stmt.excluded[field]) for field in fields])
+    ).returning(columns.id)
+    
+    try:
+        result = await session.execute(stmt, [
+            {"id": uuid4(), "created_at": now, **product_data}
+            for _, product_data in rows_by_slug.values()
+        ])
+        written_ids = result.scalars().all()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        detail = integrity_error(e, PRODUCT_CONSTRAINT_ERRORS, "Could not import product").detail
+        for index, _ in rows_by_slug.values():
+            errors[index] = detail
+        return 0, errors
+    
+    if written_ids:
+        await invalidate_product_caches(written_ids)
+        await reservation_crud.forget_available_stock(written_ids)
+    return len(written_ids), errors
+
+async def iter_product_rows(session: AsyncSession, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield all products as plain rows (id and the ProductCreate fields) in
+    batches, paging by id so each batch is a short indexed read in its own
+    transaction rather than one long-running cursor.
+    """
+    columns = [Product.id, *[Product.__table__.c[field] for field in ProductCreate.model_fields]]
+    last_id = None
+    while True:
+        query = select(*columns).order_by(Product.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(Product.id > last_id)
+        rows = (await session.execute(query)).mappings().all()
+        await session.commit()
+        if not rows:
+            return
+        yield [dict(row) for row in rows]
+        last_id = rows[-1]["id"]
 
 # PRODUCT IMAGE OPERATIONS
 async def get_product_image(session: AsyncSession, image_id: UUID) -> Optional[ProductImage]:
@@ -160,14 +671,44 @@ async def get_product_images(session: AsyncSession, product_id: UUID) -> List[Pr
     result = await session.execute(query)
     return result.scalars().all()
 
-async def create_product_image(session: AsyncSession, image_data: Dict[str, Any]) -> ProductImage:
+def primary_image_url(product_id: Any) -> Any:
+    """
+    Scalar subquery for the URL of a product's primary image (NULL when
+    it has none). Image writes keep one primary image per product, but
+    the schema doesn't enforce it, so the first one by display order is
+    picked instead of joining (and repeating the row for) every primary.
+    """
+    return (
+        select(ProductImage.image_url)
+        .where(ProductImage.product_id == product_id, ProductImage.is_primary)
+        .order_by(ProductImage.display_order, ProductImage.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+async def _clear_other_primary_images(session: AsyncSession, product_id: UUID, image_id: UUID) -> None:
+    await session.execute(
+        update(ProductImage)
+        .where(ProductImage.product_id == product_id, ProductImage.id != image_id, ProductImage.is_primary)
+        .values(is_primary=False)
+    )
+
+async def create_product_image(session: AsyncSession, image_data: Dict[str, Any]) -> Optional[ProductImage]:
     """
     Create a new product image.
+    Returns None if the product does not exist.
     """
+    # Doubles as the existence check for the product
+    if not await _touch_product(session, image_data["product_id"]):
+        await session.rollback()
+        return None
+    
     # Check if this is the first image for the product
-    existing_images = await get_product_images(session, image_data["product_id"])
-    if not existing_images and "is_primary" not in image_data:
-        image_data["is_primary"] = True
+    if "is_primary" not in image_data:
+        has_images = await session.scalar(
+            select(exists().where(ProductImage.product_id == image_data["product_id"]))
+        )
+        image_data["is_primary"] = not has_images
     
     # Create image
     image = ProductImage(**image_data)
@@ -175,18 +716,10 @@ async def create_product_image(session: AsyncSession, image_data: Dict[str, Any]
     
     # If this image is primary, make sure other images are not primary
     if image.is_primary:
-        query = select(ProductImage).where(
-            (ProductImage.product_id == image.product_id) & 
-            (ProductImage.id != image.id)
-        )
-        result = await session.execute(query)
-        other_images = result.scalars().all()
-        
-        for other_image in other_images:
-            other_image.is_primary = False
+        await _clear_other_primary_images(session, image.product_id, image.id)
     
     await session.commit()
-    await session.refresh(image)
+    await invalidate_product_cache(image.product_id)
     
     return image
 
@@ -196,55 +729,63 @@ async def update_product_image(
     image_data: Dict[str, Any]
 ) -> Optional[ProductImage]:
     """
-    Update a product image.
+    Update a product image with a single UPDATE ... RETURNING.
+    Returns None if the image does not exist.
     """
-    image = await get_product_image(session, image_id)
+    if not image_data:
+        return await get_product_image(session, image_id)
+    
+    result = await session.scalars(
+        update(ProductImage).where(ProductImage.id == image_id).values(**image_data).returning(ProductImage),
+        execution_options={"populate_existing": True}
+    )
+    image = result.one_or_none()
     if not image:
+        await session.rollback()
         return None
     
-    # Update image fields
-    for field, value in image_data.items():
-        setattr(image, field, value)
-    
     # If this image is being set as primary, make sure other images are not primary
     if image_data.get("is_primary"):
-        query = select(ProductImage).where(
-            (ProductImage.product_id == image.product_id) & 
-            (ProductImage.id != image_id)
-        )
-        result = await session.execute(query)
-        other_images = result.scalars().all()
-        
-        for other_image in other_images:
-            other_image.is_primary = False
+        await _clear_other_primary_images(session, image.product_id, image_id)
     
+    await _touch_product(session, image.product_id)
     await session.commit()
-    await session.refresh(image)
+    await invalidate_product_cache(image.product_id)
     
     return image
 
 async def delete_product_image(session: AsyncSession, image_id: UUID) -> bool:
     """
     Delete a product image.
+    Returns False if the image does not exist.
     """
-    image = await get_product_image(session, image_id)
-    if not image:
+    result = await session.execute(
+        delete(ProductImage)
+        .where(ProductImage.id == image_id)
+        .returning(ProductImage.product_id, ProductImage.is_primary)
+    )
+    row = result.one_or_none()
+    if not row:
+        await session.rollback()
         return False
     
-    product_id = image.product_id
-    is_primary = image.is_primary
-    
-    await session.delete(image)
-    await session.commit()
+    product_id, is_primary = row
     
     # If the deleted image was primary, set another image as primary
     if is_primary:
-        query = select(ProductImage).where(ProductImage.product_id == product_id).limit(1)
-        result = await session.execute(query)
-        new_primary = result.scalar_one_or_none()
-        
-        if new_primary:
-            new_primary.is_primary = True
-            await session.commit()
+        next_primary = (
+            select(ProductImage.id)
+            .where(ProductImage.product_id == product_id)
+            .order_by(ProductImage.display_order)
+            .limit(1)
+            .scalar_subquery()
+        )
+        await session.execute(
+            update(ProductImage).where(ProductImage.id == next_primary).values(is_primary=True)
+        )
+    
+    await _touch_product(session, product_id)
+    await session.commit()
+    await invalidate_product_cache(product_id)
     
-    return True 
\ No newline at end of file
+    return True
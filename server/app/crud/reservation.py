@@ -0,0 +1,253 @@
+import asyncio
+from typing import Dict, List, Tuple
+from uuid import UUID, uuid4
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlmodel import select, func
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from app.database import async_session_factory
+from app.models.product import Product
+from app.models.reservation import ReservationStatus, StockReservation
+from app.services.stock_store import (
+    STOCK_HOLD_TTL, STOCK_SWEEP_BATCH_SIZE, STOCK_SWEEP_INTERVAL, HoldSweeper, StockCounts, stock_store
+)
+
+# Stock is held in two places: the stock_reservations ledger is the
+# durable record of every hold, and the stock store keeps each product's
+# available count (stock_quantity minus held stock) so that reserving
+# never locks the product row. Only buyers who got a hold touch the row,
+# once, at checkout, where the conditional stock UPDATE remains the final
+# guard against overselling.
+
+# When a hot product's counter is missing, one request loads it while the
+# others wait instead of all running the same query
+_counter_load_lock = asyncio.Lock()
+
+def _counts(rows) -> StockCounts:
+    counts: StockCounts = defaultdict(int)
+    for product_id, quantity in rows:
+        counts[str(product_id)] += quantity
+    return dict(counts)
+
+async def _ensure_counters(session: AsyncSession, product_ids: List[UUID]) -> None:
+    """
+    Load the available count of products the stock store doesn't know yet
+    from the database: stock_quantity minus every open hold, 0 for
+    inactive or unknown products.
+    """
+    missing = await stock_store.missing([str(product_id) for product_id in product_ids])
+    if not missing:
+        return
+    async with _counter_load_lock:
+        missing = await stock_store.missing(missing)
+        if missing:
+            await _load_counters(session, missing)
+
+async def _load_counters(session: AsyncSession, missing: List[str]) -> None:
+    held = (
+        select(StockReservation.product_id, func.sum(StockReservation.quantity).label("quantity"))
+        .where(
+            StockReservation.status == ReservationStatus.HELD,
+            StockReservation.product_id.in_([UUID(product_id) for product_id in missing])
+        )
+        .group_by(StockReservation.product_id)
+        .subquery()
+    )
+    query = (
+        select(Product.id, Product.stock_quantity, Product.is_active, held.c.quantity)
+        .outerjoin(held, held.c.product_id == Product.id)
+        .where(Product.id.in_([UUID(product_id) for product_id in missing]))
+    )
+    counts = dict.fromkeys(missing, 0)
+    for product_id, stock_quantity, is_active, held_quantity in (await session.execute(query)).all():
+        if is_active:
+            counts[str(product_id)] = stock_quantity - (held_quantity or 0)
+    await stock_store.load(counts)
+
+async def get_hold(session: AsyncSession, owner_key: str) -> Dict[UUID, int]:
+    """
+    Get the stock currently held for a cart as {product_id: quantity}.
+    """
+    query = (
+        select(StockReservation.product_id, func.sum(StockReservation.quantity))
+        .where(
+            StockReservation.owner_key == owner_key,
+            StockReservation.status == ReservationStatus.HELD,
+            StockReservation.expires_at > datetime.utcnow()
+        )
+        .group_by(StockReservation.product_id)
+    )
+    result = await session.execute(query)
+    return {product_id: int(quantity) for product_id, quantity in result.all()}
+
+async def _release_held(session: AsyncSession, owner_key: str) -> StockCounts:
+    """
+    Mark a cart's open holds released. Nothing is committed here.
+    Returns the stock they held as {product_id: quantity}.
+    """
+    query = (
+        update(StockReservation)
+        .where(
+            StockReservation.owner_key == owner_key,
+            StockReservation.status == ReservationStatus.HELD
+        )
+        .values(status=ReservationStatus.RELEASED, updated_at=datetime.utcnow())
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return _counts((await session.execute(query)).all())
+
+async def hold_stock(
+    session: AsyncSession,
+    owner_key: str,
+    quantities: Dict[UUID, int],
+    ttl: int = STOCK_HOLD_TTL
+) -> datetime:
+    """
+    Hold stock for a cart for ttl seconds, replacing its previous hold.
+    Only the difference between the two holds is taken from (or given back
+    to) the available counts, so re-holding an unchanged cart never puts
+    its stock up for grabs. Raises 409 with the short product ids, holding
+    nothing new, if any product hasn't enough stock available.
+    Returns when the hold expires.
+    """
+    await _ensure_counters(session, list(quantities))
+    needed = {str(product_id): quantity for product_id, quantity in quantities.items()}
+
+    # Only a cart that may already hold stock needs its hold read before
+    # taking, so in a rush a buyer who can't get stock is turned away
+    # without touching the database
+    holder = await stock_store.is_holder(owner_key)
+    previous = await _release_held(session, owner_key) if holder else {}
+    to_take = {
+        product_id: quantity - previous.get(product_id, 0)
+        for product_id, quantity in needed.items() if quantity > previous.get(product_id, 0)
+    }
+    short = await stock_store.take(to_take) if to_take else []
+    if short:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Not enough stock", "product_ids": short}
+        )
+    if not holder:
+        previous = await _release_held(session, owner_key)
+    kept = {product_id: quantity - to_take.get(product_id, 0) for product_id, quantity in needed.items()}
+    to_give = {
+        product_id: quantity - kept.get(product_id, 0)
+        for product_id, quantity in previous.items() if quantity > kept.get(product_id, 0)
+    }
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    rows = [
+        {
+            "id": uuid4(), "product_id": product_id, "owner_key": owner_key, "quantity": quantity,
+            "status": ReservationStatus.HELD, "expires_at": expires_at, "created_at": now
+        }
+        for product_id, quantity in quantities.items()
+    ]
+    try:
+        if rows:
+            await session.execute(StockReservation.__table__.insert(), rows)
+            await stock_store.mark_holder(owner_key, ttl)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        await stock_store.give(to_take)
+        raise
+
+    # Given back only once the previous hold's release is committed
+    await stock_store.give(to_give)
+    return expires_at
+
+async def release_hold(session: AsyncSession, owner_key: str) -> None:
+    """
+    Release the stock held for a cart.
+    """
+    released = await _release_held(session, owner_key)
+    await session.commit()
+    await stock_store.give(released)
+
+async def consume_hold(
+    session: AsyncSession,
+    owner_key: str,
+    order_id: UUID,
+    quantities: Dict[UUID, int]
+) -> Tuple[List[str], StockCounts]:
+    """
+    Mark a cart's unexpired holds as committed to an order, as part of the
+    caller's checkout transaction (nothing is committed here).
+    Returns a tuple of (ids of products the hold doesn't cover, surplus
+    held stock to give back with give_back once the caller commits)
+    """
+    query = (
+        update(StockReservation)
+        .where(
+            StockReservation.owner_key == owner_key,
+            StockReservation.status == ReservationStatus.HELD,
+            StockReservation.expires_at > datetime.utcnow()
+        )
+        .values(status=ReservationStatus.COMMITTED, order_id=order_id, updated_at=datetime.utcnow())
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    held = _counts((await session.execute(query)).all())
+    needed = {str(product_id): quantity for product_id, quantity in quantities.items()}
+    short = [product_id for product_id, quantity in needed.items() if held.get(product_id, 0) < quantity]
+    surplus = {
+        product_id: quantity - needed.get(product_id, 0)
+        for product_id, quantity in held.items() if quantity > needed.get(product_id, 0)
+    }
+    return short, surplus
+
+async def give_back(counts: StockCounts) -> None:
+    """
+    Return stock to the available counts.
+    """
+    await stock_store.give(counts)
+
+async def forget_available_stock(product_ids: List[UUID]) -> None:
+    """
+    Drop products' available counts after their stock or status changed
+    outside of a hold; they are reloaded from the database on next use.
+    """
+    await stock_store.forget([str(product_id) for product_id in product_ids])
+
+async def release_expired_holds(batch_size: int) -> int:
+    """
+    Expire up to batch_size holds past their expiry and give their stock
+    back. Each hold is flipped from held to expired by one UPDATE, so
+    concurrent sweepers (one per worker) never give the same stock back
+    twice. Returns the number of holds released.
+    """
+    async with async_session_factory() as session:
+        now = datetime.utcnow()
+        expired = (
+            select(StockReservation.id)
+            .where(
+                StockReservation.status == ReservationStatus.HELD,
+                StockReservation.expires_at <= now
+            )
+            .limit(batch_size)
+        )
+        if session.bind.dialect.name == "postgresql":
+            expired = expired.with_for_update(skip_locked=True)
+        result = await session.execute(
+            update(StockReservation)
+            .where(
+                StockReservation.id.in_(expired),
+                StockReservation.status == ReservationStatus.HELD
+            )
+            .values(status=ReservationStatus.EXPIRED, updated_at=now)
+            .returning(StockReservation.product_id, StockReservation.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await session.commit()
+    await stock_store.give(_counts(rows))
+    return len(rows)
+
+hold_sweeper = HoldSweeper(release_expired_holds, STOCK_SWEEP_INTERVAL, STOCK_SWEEP_BATCH_SIZE)
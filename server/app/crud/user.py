@@ -1,8 +1,34 @@
 from typing import Optional, Dict, Any, List
+from datetime import datetime
+from uuid import uuid4
 from sqlmodel import select
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
+from app.schemas.user import User as UserSchema
+from app.services.cache import get_cache
+from app.utils.db_errors import integrity_error
+from fastapi import HTTPException, status
 from uuid import UUID
+import os
+
+# Short-lived cache of the user row behind a token identity (Clerk sub).
+# "sub:<identity>" holds the user, "id:<user_id>" maps back to the identity
+# so writes that only know the user id can invalidate it.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+user_cache = get_cache("user_identity", ttl=USER_CACHE_TTL, max_entries=USER_CACHE_MAX_ENTRIES)
+
+# Constraint names (as they appear in database errors) mapped to client errors
+USER_CONSTRAINT_ERRORS = {
+    "email": "Email already registered",
+}
+
+def _user_columns(user_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Schemas carry fields (profile_image_url) that live in Clerk, not the users table
+    return {field: value for field, value in user_data.items() if field in User.__table__.c}
 
 async def get_user(session: AsyncSession, user_id: UUID) -> Optional[User]:
     """
@@ -20,6 +46,46 @@ async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]
     result = await session.execute(query)
     return result.scalar_one_or_none()
 
+async def get_user_by_identity_cached(session: AsyncSession, identity: str, email: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a user as a JSON-ready dict by token identity, falling back to
+    an email lookup on a cache miss.
+    """
+    data = await user_cache.get(f"sub:{identity}")
+    if data is not None:
+        return data
+    
+    user = await get_user_by_email(session, email)
+    if not user:
+        return None
+    
+    return await cache_user_identity(identity, user)
+
+async def get_cached_user_by_identity(identity: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a cached user by token identity without touching the database.
+    """
+    return await user_cache.get(f"sub:{identity}")
+
+async def cache_user_identity(identity: str, user: User) -> Dict[str, Any]:
+    """
+    Cache a user under its token identity and return the cached dict.
+    """
+    data = UserSchema.model_validate(user).model_dump(mode="json")
+    await user_cache.set(f"sub:{identity}", data)
+    await user_cache.set(f"id:{user.id}", identity)
+    return data
+
+async def invalidate_user_cache(user_id: UUID) -> None:
+    """
+    Drop the cached identity entries for a user after it changes.
+    """
+    keys = [f"id:{user_id}"]
+    identity = await user_cache.get(keys[0])
+    if identity is not None:
+        keys.append(f"sub:{identity}")
+    await user_cache.delete(*keys)
+
 async def get_users(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
     """
     Get multiple users with pagination.
@@ -31,36 +97,95 @@ async def get_users(session: AsyncSession, skip: int = 0, limit: int = 100) -> L
 async def create_user(session: AsyncSession, user_data: Dict[str, Any]) -> User:
     """
     Create a new user.
+    Email uniqueness is enforced by the database.
     """
-    user = User(**user_data)
+    user = User(**_user_columns(user_data))
     session.add(user)
-    await session.commit()
-    await session.refresh(user)
+    try:
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise integrity_error(e, USER_CONSTRAINT_ERRORS, "Could not create user")
     return user
 
-async def update_user(session: AsyncSession, user_id: UUID, user_data: Dict[str, Any]) -> Optional[User]:
+async def upsert_user(session: AsyncSession, user_data: Dict[str, Any]) -> User:
     """
-    Update a user.
+    Insert a user or update the existing one with the same email in a
+    single INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING statement.
+    The update only fires when a field actually differs, so re-syncing
+    unchanged data writes nothing; that case falls back to a select.
     """
-    user = await get_user(session, user_id)
-    if not user:
-        return None
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        user = await get_user_by_email(session, user_data["email"])
+        if user:
+            return await update_user(session, user.id, user_data)
+        return await create_user(session, user_data)
     
-    for field, value in user_data.items():
-        setattr(user, field, value)
+    now = datetime.utcnow()
+    stmt = insert(User).values(id=uuid4(), created_at=now, **user_data)
+    columns = User.__table__.c
+    fields = [field for field in user_data if field != "email"]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[columns.email],
+        set_={**{field: stmt.excluded[field] for field in fields}, "updated_at": now},
+        where=or_(*[columns[field].is_distinct_from(stmt.excluded[field]) for field in fields])
+    ).returning(User)
     
+    result = await session.scalars(stmt, execution_options={"populate_existing": True})
+    user = result.one_or_none()
     await session.commit()
-    await session.refresh(user)
+    
+    if user is None:
+        # Nothing changed; the conflicting row is returned as-is
+        user = await get_user_by_email(session, user_data["email"])
+    else:
+        await invalidate_user_cache(user.id)
+    return user
+
+async def update_user(session: AsyncSession, user_id: UUID, user_data: Dict[str, Any]) -> Optional[User]:
+    """
+    Update a user with a single UPDATE ... RETURNING.
+    Returns None if the user does not exist.
+    """
+    query = (
+        update(User)
+        .where(User.id == user_id)
+        .values(**_user_columns(user_data), updated_at=datetime.utcnow())
+        .returning(User)
+    )
+    try:
+        result = await session.scalars(query, execution_options={"populate_existing": True})
+        user = result.one_or_none()
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise integrity_error(e, USER_CONSTRAINT_ERRORS, "Could not update user")
+    
+    if user:
+        await invalidate_user_cache(user_id)
     return user
 
 async def delete_user(session: AsyncSession, user_id: UUID) -> bool:
     """
     Delete a user.
+    Returns False if the user does not exist.
     """
-    user = await get_user(session, user_id)
-    if not user:
-        return False
+    try:
+        result = await session.execute(delete(User).where(User.id == user_id).returning(User.id))
+        deleted = result.scalar_one_or_none() is not None
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot delete a user that still has addresses, carts, orders or reviews"
+        )
     
-    await session.delete(user)
-    await session.commit()
-    return True 
\ No newline at end of file
+    if deleted:
+        await invalidate_user_cache(user_id)
+    return deleted
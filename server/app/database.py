@@ -1,8 +1,13 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterator, Dict, Any, List
+from contextlib import asynccontextmanager
 import os
+import time
+import itertools
 import logging
+from fastapi import Request
 from sqlmodel import SQLModel, create_engine, Session, inspect
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,25 +19,203 @@ logger = logging.getLogger(__name__)
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+# 0 disables the server-side statement timeout
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# PgBouncer (transaction pooling) mode: no app-side pool, no prepared statement cache
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "False").lower() == "true"
+
+# Read replicas for GET traffic (comma separated URLs)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# "round_robin" or "least_loaded" (fewest checked out connections)
+DB_REPLICA_SELECTION = os.getenv("DB_REPLICA_SELECTION", "round_robin").lower()
+# After a write, the same client reads from the primary for this many seconds
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+
+class PoolMetrics:
+    """Counters for how long requests wait to acquire a connection."""
+
+    def __init__(self):
+        self.acquire_count = 0
+        self.acquire_total_seconds = 0.0
+        self.acquire_max_seconds = 0.0
+
+    def record_acquire(self, seconds: float) -> None:
+        self.acquire_count += 1
+        self.acquire_total_seconds += seconds
+        self.acquire_max_seconds = max(self.acquire_max_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "acquire_count": self.acquire_count,
+            "acquire_avg_ms": round(self.acquire_total_seconds / self.acquire_count * 1000, 3) if self.acquire_count else None,
+            "acquire_max_ms": round(self.acquire_max_seconds * 1000, 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _AcquireTimingMixin:
+    """Records the time spent waiting for (or opening) a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_acquire(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_AcquireTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_AcquireTimingMixin, NullPool):
+    pass
+
+
+def _async_engine_options(url: str) -> Dict[str, Any]:
+    """
+    Build pool and driver options for the async engine.
+    """
+    if not url.startswith("postgresql"):
+        # SQLite (development) keeps SQLAlchemy's defaults
+        return {}
+
+    connect_args: Dict[str, Any] = {}
+    if DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+    if DB_PGBOUNCER:
+        # Prepared statements don't survive PgBouncer transaction pooling
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        return {"poolclass": InstrumentedNullPool, "connect_args": connect_args}
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def _sync_engine_options(url: str) -> Dict[str, Any]:
+    """
+    Build options for the sync engine used for migrations and setup.
+    """
+    if not url.startswith("postgresql"):
+        return {}
+
+    options: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if DB_PGBOUNCER:
+        options["poolclass"] = NullPool
+    if DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
 # Create synchronous engine for migrations and setup
 sync_engine = create_engine(
     DATABASE_URL,
-    echo=os.getenv("DEBUG", "False").lower() == "true"
+    echo=DEBUG,
+    **_sync_engine_options(DATABASE_URL)
 )
 
+def _create_async_engine(url: str):
+    """
+    Create an async engine with the configured pool options.
+    """
+    async_url = url.replace("postgresql://", "postgresql+asyncpg://")
+    return create_async_engine(
+        async_url,
+        echo=DEBUG,
+        future=True,
+        **_async_engine_options(async_url)
+    )
+
+
+def _create_session_factory(engine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=engine,
+        expire_on_commit=False,
+        class_=AsyncSession
+    )
+
+
 # Create async engine for API operations
-async_engine = create_async_engine(
-    DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=os.getenv("DEBUG", "False").lower() == "true",
-    future=True
-)
+async_engine = _create_async_engine(DATABASE_URL)
 
 # Create async session factory
-async_session_factory = async_sessionmaker(
-    bind=async_engine,
-    expire_on_commit=False,
-    class_=AsyncSession
-)
+async_session_factory = _create_session_factory(async_engine)
+
+# Read-only engines and session factories for the replicas
+replica_engines = [_create_async_engine(url) for url in DATABASE_REPLICA_URLS]
+replica_session_factories = [_create_session_factory(engine) for engine in replica_engines]
+_replica_cycle = itertools.cycle(range(len(replica_engines)))
+
+
+def _pool_status(engine) -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    status = {"pool": type(pool).__name__}
+
+    # NullPool/StaticPool don't track these counts
+    for name, attr in (("size", "size"), ("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+        if hasattr(pool, attr):
+            status[name] = getattr(pool, attr)()
+
+    return status
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """
+    Get connection pool usage for the primary (and replica) async engines.
+    """
+    status = _pool_status(async_engine)
+    status.update(pool_metrics.snapshot())
+    if replica_engines:
+        status["replicas"] = [_pool_status(engine) for engine in replica_engines]
+    return status
+
+
+def _select_replica() -> async_sessionmaker:
+    """
+    Pick a replica session factory using the configured selection strategy.
+    """
+    if DB_REPLICA_SELECTION == "least_loaded":
+        index = min(
+            range(len(replica_engines)),
+            key=lambda i: getattr(replica_engines[i].sync_engine.pool, "checkedout", lambda: 0)()
+        )
+        return replica_session_factories[index]
+    return replica_session_factories[next(_replica_cycle)]
+
+
+def reads_from_primary(request: Request) -> bool:
+    """
+    Check whether this client wrote recently and must read its own writes.
+    """
+    value = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
@@ -46,6 +229,50 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def get_read_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Get the session factory for a read-only request: a replica when
+    replicas are configured, unless the client wrote recently
+    (read-your-writes).
+    """
+    if not replica_session_factories or reads_from_primary(request):
+        return async_session_factory
+    return _select_replica()
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read-only handlers (see get_read_session_factory).
+    """
+    async with get_read_session_factory(request)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """
+    Check whether a session reads from a replica, whose data may lag
+    behind the primary.
+    """
+    return any(session.bind is engine for engine in replica_engines)
+
+
+@asynccontextmanager
+async def primary_session(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    Yield the given session if it is on the primary, else a new primary
+    session. Read-through caches load their misses through it, so a
+    lagging replica's data is never cached after an invalidation.
+    """
+    if not is_replica_session(session):
+        yield session
+        return
+    async with async_session_factory() as primary:
+        yield primary
+
+
 def get_sync_session():
     """
     Create and return a synchronous session.
@@ -62,10 +289,23 @@ def table_exists(table_name):
     return table_name in inspector.get_table_names()
 
 
+def stamp_alembic_head():
+    """
+    Mark the database as being at the latest Alembic revision.
+    """
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    command.stamp(config, "head")
+
+
 async def create_db_and_tables():
     """
     Create all tables defined in models.
-    Used only during development or initial setup.
+    Used only during development or initial setup; other databases are
+    managed with Alembic (`alembic upgrade head`).
     """
     # Import models để đảm bảo SQLModel biết về tất cả các model
     import app.models.user
@@ -96,4 +336,7 @@ async def create_db_and_tables():
         await asyncio.get_event_loop().run_in_executor(
             pool, lambda: SQLModel.metadata.create_all(sync_engine)
         )
+        # The tables match the latest migration; record that so
+        # `alembic upgrade head` only applies migrations added later
+        await asyncio.get_event_loop().run_in_executor(pool, stamp_alembic_head)
         logger.info("Database tables created successfully") 
\ No newline at end of file
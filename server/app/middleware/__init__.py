@@ -4,5 +4,6 @@ Middleware for request/response processing.
 
 from app.middleware.cors import setup_cors_middleware
 from app.middleware.error_handlers import setup_error_handlers
+from app.middleware.read_your_writes import setup_read_your_writes_middleware
 
-__all__ = ["setup_cors_middleware", "setup_error_handlers"] 
\ No newline at end of file
+__all__ = ["setup_cors_middleware", "setup_error_handlers", "setup_read_your_writes_middleware"] 
\ No newline at end of file
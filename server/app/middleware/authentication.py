@@ -1,11 +1,20 @@
-from fastapi import Request, HTTPException, Depends
+from fastapi import Request, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
-import httpx
+from loguru import logger
+import hashlib
 import json
+import time
+
+from app.crud import user as user_crud
+from app.database import get_async_session
+from app.schemas.user import User
+from app.services.cache import get_cache
+from app.services.jwks import jwks_cache
 
 load_dotenv()
 
@@ -15,17 +24,94 @@ CLERK_JWT_ISSUER = "https://api.clerk.com"  # Default Clerk issuer
 
 # Set up security scheme
 security = HTTPBearer()
+# Same scheme for routes that also serve anonymous callers
+optional_security = HTTPBearer(auto_error=False)
+
+# Verified claims keyed by token hash, kept until the token expires.
+# In-process only: raw claims never leave the worker.
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on how long a verified token is trusted without re-checking
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", "300"))
+token_cache = get_cache("verified_token", ttl=TOKEN_CACHE_MAX_TTL, max_entries=TOKEN_CACHE_MAX_ENTRIES, local=True)
 
 
-async def get_clerk_jwks() -> Dict[str, Any]:
+async def decode_clerk_token(token: str) -> Dict[str, Any]:
     """
-    Fetch the JSON Web Key Set (JWKS) from Clerk.
-    This is used to verify token signatures.
+    Verify a Clerk session token and return its claims.
+    RS256 tokens are checked against the cached JWKS by kid, so no network
+    call is made on the request path once the key set is loaded.
+    Legacy HS256 tokens are checked with the Clerk secret key.
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get("https://api.clerk.com/.well-known/jwks.json")
-        response.raise_for_status()
-        return response.json()
+    header = jwt.get_unverified_header(token)
+    
+    if header.get("alg") == "RS256":
+        key = await jwks_cache.get_key(header.get("kid", ""))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            options={"verify_aud": False, "verify_iss": False}
+        )
+    
+    return jwt.decode(
+        token,
+        CLERK_SECRET_KEY,
+        algorithms=["HS256"],
+        options={"verify_aud": False, "verify_iss": False}
+    )
+
+
+def _first_email_address(addresses: Any) -> Optional[str]:
+    if isinstance(addresses, list) and len(addresses) > 0:
+        if isinstance(addresses[0], dict):
+            return addresses[0].get("email_address")
+        if isinstance(addresses[0], str):
+            return addresses[0]
+    return None
+
+
+def extract_email_from_claims(claims: Dict[str, Any]) -> Optional[str]:
+    """
+    Find the user's email in Clerk token claims.
+    Checks the direct email fields, Clerk's email_addresses and user_data
+    structures, then email-like standard claims.
+    """
+    email = (
+        claims.get("email")
+        or claims.get("primary_email_address")
+        or _first_email_address(claims.get("email_addresses"))
+    )
+    if email:
+        return email
+    
+    user_data = claims.get("user_data")
+    if isinstance(user_data, dict):
+        email = (
+            user_data.get("primary_email_address")
+            or _first_email_address(user_data.get("email_addresses"))
+        )
+        if email:
+            return email
+    
+    for claim in ("preferred_username", "sub"):
+        value = claims.get(claim)
+        if isinstance(value, str) and "@" in value:
+            return value
+    return None
+
+
+async def _cache_verified_payload(cache_key: str, payload: Dict[str, Any]) -> None:
+    """
+    Cache verified claims until the token's exp (capped at TOKEN_CACHE_MAX_TTL).
+    """
+    ttl = TOKEN_CACHE_MAX_TTL
+    if isinstance(payload.get("exp"), (int, float)):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        # Store a copy so the caller can't modify the cached claims
+        await token_cache.set(cache_key, dict(payload), ttl=ttl)
 
 
 async def verify_jwt_token(
@@ -39,6 +125,12 @@ async def verify_jwt_token(
     
     token = credentials.credentials
     
+    # Clients reuse the same token for many calls; skip decoding it again
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached_payload = await token_cache.get(cache_key)
+    if cached_payload is not None:
+        return dict(cached_payload)
+    
     try:
         # In development mode, decode with a dummy key
         if os.getenv("DEBUG", "False").lower() == "true":
@@ -57,87 +149,85 @@ async def verify_jwt_token(
                 }
             )
             
-            # Debug: Print token payload in development mode
-            print("JWT Token Payload FULL:", token[:20] + "..." + token[-20:])
-            print("JWT Token Payload:", json.dumps(payload, indent=2))
-            
-            # Enhanced email extraction - Clerk specific format
-            email = None
-            
-            # Method 1: Direct email field
-            if 'email' in payload:
-                email = payload['email']
-                print(f"Found email directly in token: {email}")
-            
-            # Method 2: Check for primary_email_address in Clerk tokens
-            elif 'primary_email_address' in payload:
-                email = payload['primary_email_address']
-                print(f"Found email in primary_email_address: {email}")
-            
-            # Method 3: Check for Clerk's email_addresses array
-            elif 'email_addresses' in payload and isinstance(payload['email_addresses'], list) and len(payload['email_addresses']) > 0:
-                if isinstance(payload['email_addresses'][0], dict) and 'email_address' in payload['email_addresses'][0]:
-                    email = payload['email_addresses'][0]['email_address']
-                    print(f"Found email in email_addresses array: {email}")
-                elif isinstance(payload['email_addresses'][0], str):
-                    email = payload['email_addresses'][0]
-                    print(f"Found email in email_addresses array (string format): {email}")
-            
-            # Method 4: Check Clerk's user_data structure
-            elif 'user_data' in payload and isinstance(payload['user_data'], dict):
-                user_data = payload['user_data']
-                if 'email_addresses' in user_data and len(user_data['email_addresses']) > 0:
-                    if isinstance(user_data['email_addresses'][0], dict) and 'email_address' in user_data['email_addresses'][0]:
-                        email = user_data['email_addresses'][0]['email_address']
-                        print(f"Found email in user_data.email_addresses: {email}")
-                    elif isinstance(user_data['email_addresses'][0], str):
-                        email = user_data['email_addresses'][0]
-                        print(f"Found email in user_data.email_addresses (string format): {email}")
-                elif 'primary_email_address' in user_data:
-                    email = user_data['primary_email_address']
-                    print(f"Found email in user_data.primary_email_address: {email}")
+            # Debug: Log token payload in development mode (serialized only if enabled)
+            logger.opt(lazy=True).debug(
+                "JWT token {} payload: {}",
+                lambda: token[:20] + "..." + token[-20:],
+                lambda: json.dumps(payload)
+            )
             
-            # Method 5: Try standard OpenID Connect & OAuth2 fields
-            elif 'preferred_username' in payload and '@' in payload['preferred_username']:
-                email = payload['preferred_username']
-                print(f"Found email-like username in preferred_username: {email}")
-            elif 'sub' in payload and '@' in payload['sub']:
-                email = payload['sub']
-                print(f"Found email-like sub claim: {email}")
+            email = extract_email_from_claims(payload)
+            logger.debug("Email from token claims: {}", email)
             
             # If we found an email, add it to the payload
             if email:
                 payload['email'] = email
             else:
-                print("Could not find email in token with keys:", list(payload.keys()))
-                
-                # For Clerk tokens, try to extract from azp or sub as a last resort
-                if 'azp' in payload:
-                    print(f"AZP claim found: {payload['azp']}")
-                if 'sub' in payload:
-                    print(f"SUB claim found: {payload['sub']}")
+                logger.opt(lazy=True).debug(
+                    "Could not find email in token with keys: {} (azp={}, sub={})",
+                    lambda: list(payload.keys()),
+                    lambda: payload.get('azp'),
+                    lambda: payload.get('sub')
+                )
                 
                 # Clerk user ID might be in 'sub' claim
                 if 'sub' in payload:
                     # Extracting Clerk user ID from sub claim
                     user_id = payload['sub']
-                    print(f"Using Clerk user ID as fallback: {user_id}")
                     # For development: Create a fake email from the user ID
                     fake_email = f"{user_id}@clerk.user"
-                    print(f"Created fake email for development: {fake_email}")
+                    logger.debug("Using Clerk user ID as fallback email: {}", fake_email)
                     payload['email'] = fake_email
                     payload['is_fake_email'] = True
             
         else:
-            # In production, use the Clerk secret key to verify
-            payload = jwt.decode(
-                token,
-                CLERK_SECRET_KEY,
-                algorithms=["HS256"],  # Clerk uses HS256 with the secret key
-                options={"verify_aud": False, "verify_iss": False}
-            )
+            # In production, verify the signature against Clerk's keys
+            payload = await decode_clerk_token(token)
         
+        await _cache_verified_payload(cache_key, payload)
         return payload
         
     except JWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}") 
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_async_session),
+    token_data: dict = Depends(verify_jwt_token)
+) -> User:
+    """
+    Resolve the token's Clerk user (sub) to the User row.
+    FastAPI caches dependencies per request, so routes and other
+    dependencies that ask for the current user share one lookup; across
+    requests the row comes from the short-lived user identity cache.
+    """
+    email = extract_email_from_claims(token_data)
+    if not email:
+        logger.opt(lazy=True).warning("Could not find email in token with keys: {}", lambda: list(token_data.keys()))
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not extract email from credentials"
+        )
+    
+    user = await user_crud.get_user_by_identity_cached(session, token_data.get("sub") or email, email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    return User.model_validate(user)
+
+
+async def get_optional_current_user(
+    session: AsyncSession = Depends(get_async_session),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[User]:
+    """
+    Resolve the current user when a bearer token is sent, or None for
+    anonymous requests. An invalid token is still rejected.
+    """
+    if credentials is None:
+        return None
+    token_data = await verify_jwt_token(credentials)
+    return await get_current_user(session, token_data)
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
+from app.database import READ_PRIMARY_HEADER
 
 load_dotenv()
 
@@ -21,4 +22,5 @@ def setup_cors_middleware(app: FastAPI) -> None:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[READ_PRIMARY_HEADER],
     ) 
\ No newline at end of file
@@ -0,0 +1,36 @@
+import time
+from fastapi import FastAPI, Request
+
+from app.database import (
+    DB_READ_YOUR_WRITES_SECONDS, READ_PRIMARY_COOKIE, READ_PRIMARY_HEADER, replica_engines
+)
+
+# Methods that can write; everything else is safe to serve from a replica
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+def setup_read_your_writes_middleware(app: FastAPI) -> None:
+    """
+    After a successful write, pin the client's reads to the primary for a
+    short window so it doesn't see stale data from a lagging replica.
+    The window is returned both as a cookie and as a response header that
+    API clients can echo back.
+    """
+    if not replica_engines:
+        return
+
+    @app.middleware("http")
+    async def read_your_writes(request: Request, call_next):
+        response = await call_next(request)
+
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            until = f"{time.time() + DB_READ_YOUR_WRITES_SECONDS:.3f}"
+            response.headers[READ_PRIMARY_HEADER] = until
+            response.set_cookie(
+                READ_PRIMARY_COOKIE,
+                until,
+                max_age=int(DB_READ_YOUR_WRITES_SECONDS) + 1,
+                httponly=True,
+                samesite="lax"
+            )
+
+        return response
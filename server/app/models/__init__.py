@@ -15,10 +15,11 @@ from app.models.cart import Cart, CartItem
 from app.models.wishlist import Wishlist, WishlistItem
 from app.models.order import Order, OrderItem
 from app.models.review import Review
+from app.models.reservation import StockReservation
 
 __all__ = [
     "UUIDModel", "TimestampModel",
     "User", "Address", "Category", "Product", "ProductImage",
     "Cart", "CartItem", "Wishlist", "WishlistItem",
-    "Order", "OrderItem", "Review"
+    "Order", "OrderItem", "Review", "StockReservation"
 ] 
\ No newline at end of file
@@ -3,7 +3,7 @@ import enum
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
 from decimal import Decimal
-from sqlalchemy import DECIMAL, Column
+from sqlalchemy import DECIMAL, Column, Index, UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
 from app.models.base import UUIDModel, TimestampModel
 
@@ -25,12 +25,19 @@ class Order(UUIDModel, TimestampModel, table=True):
     """Order model."""
     
     __tablename__ = "orders"
+    __table_args__ = (
+        # A retried checkout with the same key finds the order it created
+        UniqueConstraint("user_id", "idempotency_key", name="uq_orders_user_id_idempotency_key"),
+        # A user's order history, newest first, paged by (created_at, id)
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
     
-    user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
+    user_id: uuid.UUID = Field(foreign_key="users.id")
     status: OrderStatus = Field(default=OrderStatus.PENDING)
     total_amount: Decimal = Field(default=0, sa_column=Column(DECIMAL(10, 2)))
     shipping_address_id: uuid.UUID = Field(foreign_key="addresses.id")
     tracking_number: Optional[str] = None
+    idempotency_key: Optional[str] = Field(default=None, max_length=255)
     
     # Relationships
     user: "User" = Relationship(back_populates="orders")
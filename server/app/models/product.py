@@ -1,7 +1,11 @@
 import uuid
 from typing import Optional, List, TYPE_CHECKING
 from decimal import Decimal
-from sqlalchemy import DECIMAL, Column
+from sqlalchemy import DECIMAL, Column, Computed, Index, literal_column, text
+from sqlalchemy.dialects import postgresql  # registers to_tsvector/to_tsquery types
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.types import UserDefinedType
 from sqlmodel import Field, SQLModel, Relationship
 from app.models.base import UUIDModel, TimestampModel
 
@@ -18,6 +22,29 @@ class Product(UUIDModel, TimestampModel, table=True):
     """Product model."""
     
     __tablename__ = "products"
+    __table_args__ = (
+        # Listing indexes. Public listings only show active products, so
+        # the indexes are partial and skip inactive rows entirely.
+        # Category listing filtered by price range
+        Index(
+            "ix_products_active_category_price", "category_id", "price",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")
+        ),
+        # Price range across all categories
+        Index(
+            "ix_products_active_price", "price",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")
+        ),
+        # Default newest-first order and keyset pagination
+        Index(
+            "ix_products_active_created_at_id", "created_at", "id",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")
+        ),
+        Index(
+            "ix_products_active_category_created_at_id", "category_id", "created_at", "id",
+            postgresql_where=text("is_active"), sqlite_where=text("is_active")
+        ),
+    )
     
     name: str = Field(index=True)
     slug: str = Field(unique=True, index=True)
@@ -49,4 +76,52 @@ class ProductImage(UUIDModel, table=True):
     display_order: int = Field(default=0)
     
     # Relationship to product
-    product: "Product" = Relationship(back_populates="images") 
\ No newline at end of file
+    product: "Product" = Relationship(back_populates="images")
+
+
+# Full-text search document over name + description, kept in a generated
+# column so that neither the GIN index nor ranking rebuilds it per row.
+# PostgreSQL stores a tsvector; other databases (the SQLite dev database)
+# get the plain text, which search matches with LIKE.
+PRODUCT_SEARCH_CONFIG = literal_column("'simple'")
+
+
+class SearchVector(UserDefinedType):
+    """Column type of the search document: tsvector on PostgreSQL, text elsewhere."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "TEXT"
+
+
+@compiles(SearchVector, "postgresql")
+def _compile_search_vector(type_, compiler, **kw):
+    return "TSVECTOR"
+
+
+class SearchDocument(ColumnElement):
+    """Generation expression of the search document column."""
+    inherit_cache = True
+
+
+@compiles(SearchDocument)
+def _compile_search_document(element, compiler, **kw):
+    return "coalesce(name, '') || ' ' || coalesce(description, '')"
+
+
+@compiles(SearchDocument, "postgresql")
+def _compile_search_document_postgresql(element, compiler, **kw):
+    return "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+# Generated by the database and never written or loaded by the ORM
+product_search_vector = Column("search_vector", SearchVector(), Computed(SearchDocument()))
+Product.__table__.append_column(product_search_vector)
+
+Product.__table__.append_constraint(
+    Index(
+        "ix_products_search_vector",
+        product_search_vector,
+        postgresql_using="gin"
+    ).ddl_if(dialect="postgresql")
+)
@@ -0,0 +1,32 @@
+import uuid
+import enum
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Index
+from sqlmodel import Field
+from app.models.base import UUIDModel, TimestampModel
+
+
+class ReservationStatus(str, enum.Enum):
+    """Stock reservation status enumeration."""
+    HELD = "held"
+    COMMITTED = "committed"
+    RELEASED = "released"
+    EXPIRED = "expired"
+
+class StockReservation(UUIDModel, TimestampModel, table=True):
+    """Stock held for a cart until it checks out or the hold expires."""
+    
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # The sweeper's scan for expired holds
+        Index("ix_stock_reservations_status_expires_at", "status", "expires_at"),
+    )
+    
+    product_id: uuid.UUID = Field(foreign_key="products.id", index=True)
+    # The cart the stock is held for (see app.services.cart_store)
+    owner_key: str = Field(max_length=80, index=True)
+    quantity: int
+    status: ReservationStatus = Field(default=ReservationStatus.HELD)
+    expires_at: datetime
+    order_id: Optional[uuid.UUID] = Field(default=None, foreign_key="orders.id")
@@ -10,5 +10,6 @@ from app.routes.carts import router as carts
 from app.routes.wishlists import router as wishlists
 from app.routes.orders import router as orders
 from app.routes.reviews import router as reviews
+from app.routes.metrics import router as metrics
 
-__all__ = ["users", "products", "categories", "carts", "wishlists", "orders", "reviews"] 
\ No newline at end of file
+__all__ = ["users", "products", "categories", "carts", "wishlists", "orders", "reviews", "metrics"] 
\ No newline at end of file
@@ -1,11 +1,167 @@
-from fastapi import APIRouter
+import re
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Path
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from app.database import get_async_session
+from app.crud import cart as cart_crud
+from app.crud import product as product_crud
+from app.crud import reservation as reservation_crud
+from app.schemas.cart import Cart, CartItemAdd, CartItemUpdate, PricedCart, StockHold, CART_MAX_ITEM_QUANTITY
+from app.schemas.user import User
+from app.middleware.authentication import get_current_user, get_optional_current_user
+from app.services.cart_store import CartItems, session_cart_key, user_cart_key
 
 router = APIRouter()
 
-@router.get("/")
-async def get_carts():
+# Anonymous carts are identified by a client-generated id (e.g. a UUID kept in local storage)
+CART_SESSION_HEADER = "X-Cart-Session"
+_CART_SESSION_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+def _session_id(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    if not _CART_SESSION_PATTERN.match(value):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{CART_SESSION_HEADER} must be 16-64 letters, digits, '-' or '_'"
+        )
+    return value
+
+async def get_cart_key(
+    user: Optional[User] = Depends(get_optional_current_user),
+    cart_session: Optional[str] = Header(None, alias=CART_SESSION_HEADER)
+) -> str:
+    """
+    The caller's cart: the signed-in user's, or the anonymous session's.
+    """
+    if user is not None:
+        return user_cart_key(user.id)
+    session_id = _session_id(cart_session)
+    if session_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Sign in or send an {CART_SESSION_HEADER} header"
+        )
+    return session_cart_key(session_id)
+
+def _cart_response(items: CartItems) -> dict:
+    return {
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items.items()],
+        "item_count": sum(items.values())
+    }
+
+@router.get("/me", response_model=PricedCart)
+async def get_my_cart(
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Get the caller's cart with priced lines, subtotal, sale savings and
+    stock availability.
+    """
+    return await cart_crud.get_priced_cart(session, cart_key)
+
+@router.post("/me/items", response_model=Cart)
+async def add_cart_item(
+    item_in: CartItemAdd,
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Add a product to the caller's cart, or increase its quantity.
+    """
+    product = await product_crud.get_product_cached(session, product_id=item_in.product_id)
+    if not product or not product["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+    quantity = await cart_crud.add_cart_item(session, cart_key, item_in.product_id, item_in.quantity)
+    if quantity > CART_MAX_ITEM_QUANTITY:
+        await cart_crud.set_cart_item_quantity(session, cart_key, item_in.product_id, CART_MAX_ITEM_QUANTITY)
+    return _cart_response(await cart_crud.get_cart_items(session, cart_key))
+
+@router.put("/me/items/{product_id}", response_model=Cart)
+async def update_cart_item(
+    item_in: CartItemUpdate,
+    product_id: UUID = Path(..., description="The ID of the product in the cart"),
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Set a product's quantity in the caller's cart (0 removes it).
+    """
+    await cart_crud.set_cart_item_quantity(session, cart_key, product_id, item_in.quantity)
+    return _cart_response(await cart_crud.get_cart_items(session, cart_key))
+
+@router.delete("/me/items/{product_id}", response_model=Cart)
+async def remove_cart_item(
+    product_id: UUID = Path(..., description="The ID of the product in the cart"),
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Remove a product from the caller's cart.
+    """
+    await cart_crud.set_cart_item_quantity(session, cart_key, product_id, 0)
+    return _cart_response(await cart_crud.get_cart_items(session, cart_key))
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_my_cart(
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Remove every item from the caller's cart.
+    """
+    await cart_crud.clear_cart(session, cart_key)
+    return None
+
+@router.post("/me/merge", response_model=Cart)
+async def merge_session_cart(
+    cart_session: str = Header(..., alias=CART_SESSION_HEADER),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Move the anonymous session cart into the signed-in user's cart.
+    Call once after sign-in; quantities of products in both carts add up.
+    """
+    items = await cart_crud.merge_carts(
+        session,
+        source_key=session_cart_key(_session_id(cart_session)),
+        target_key=user_cart_key(current_user.id)
+    )
+    return _cart_response(items)
+
+@router.post("/me/reservation", response_model=StockHold)
+async def hold_cart_stock(
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Hold stock for everything in the caller's cart (e.g. when checkout
+    starts), replacing any previous hold. The hold expires after
+    STOCK_HOLD_TTL seconds; fails with 409 if a product is short.
+    """
+    items = await cart_crud.get_cart_items(session, cart_key)
+    expires_at = await reservation_crud.hold_stock(
+        session,
+        cart_key,
+        {UUID(product_id): quantity for product_id, quantity in items.items()}
+    )
+    return {**_cart_response(items), "expires_at": expires_at}
+
+@router.delete("/me/reservation", status_code=status.HTTP_204_NO_CONTENT)
+async def release_cart_stock(
+    cart_key: str = Depends(get_cart_key),
+    session: AsyncSession = Depends(get_async_session)
+):
     """
-    Placeholder route for carts.
-    Will be implemented in the future.
+    Release the stock held for the caller's cart.
     """
-    return {"message": "Carts API - Not implemented yet"} 
\ No newline at end of file
+    await reservation_crud.release_hold(session, cart_key)
+    return None
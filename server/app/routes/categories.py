@@ -1,43 +1,70 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 import math
 
-from app.database import get_async_session
+from app.database import get_async_session, get_read_session, is_replica_session
 from app.crud import category as category_crud
 from app.schemas.category import (
     Category, CategoryCreate, CategoryUpdate, CategoryList,
     CategoryTree, CategoryTreeItem, CategorySimple
 )
 from app.middleware.authentication import verify_jwt_token
+from app.services.catalog import get_catalog_version
+from app.services.counts import DEFAULT_COUNT_STRATEGY, CountStrategy, TotalMode
+from app.utils.http_cache import make_etag, not_modified_response, set_catalog_cache_headers
 
 router = APIRouter()
 
+async def _catalog_etag(request: Request) -> Optional[str]:
+    """
+    Build an ETag for a category response from the catalog version and URL.
+    Only bodies read from the primary are sent with it, but a replica may
+    still answer a revalidation of the current ETag with a 304.
+    """
+    catalog_version = await get_catalog_version()
+    if not catalog_version:
+        return None
+    return make_etag(request.url.path, catalog_version, request.url.query)
+
 @router.get("/", response_model=CategoryList)
 async def get_categories(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Skip records"),
     limit: int = Query(100, ge=1, le=500, description="Limit records"),
     parent_id: Optional[UUID] = Query(None, description="Filter by parent category ID"),
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
-    session: AsyncSession = Depends(get_async_session)
+    total_mode: TotalMode = Query(TotalMode.EXACT, description="How to compute the total: exact, estimate or none"),
+    count_strategy: CountStrategy = Query(CountStrategy(DEFAULT_COUNT_STRATEGY), description="How to fetch the total: sequential, concurrent or window"),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get a list of categories with pagination.
     """
-    categories, total = await category_crud.get_categories(
+    etag = await _catalog_etag(request)
+    not_modified = not_modified_response(request, etag)
+    if not_modified:
+        return not_modified
+    
+    categories, total, total_is_exact = await category_crud.get_categories(
         session, 
         skip=skip, 
         limit=limit, 
         parent_id=parent_id,
-        is_active=is_active
+        is_active=is_active,
+        total_mode=total_mode,
+        count_strategy=count_strategy
     )
     
-    pages = math.ceil(total / limit) if limit else 1
+    pages = math.ceil(total / limit) if total is not None and limit else None
     
+    set_catalog_cache_headers(response, etag, is_replica_session(session))
     return {
         "items": categories,
         "total": total,
+        "total_is_exact": total_is_exact,
         "page": skip // limit + 1 if limit else 1,
         "size": limit,
         "pages": pages
@@ -45,68 +72,77 @@ async def get_categories(
 
 @router.get("/tree", response_model=CategoryTree)
 async def get_category_tree(
+    request: Request,
     parent_id: Optional[UUID] = Query(None, description="Parent category ID (None for root categories)"),
     is_active: Optional[bool] = Query(True, description="Filter by active status"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get categories in a hierarchical tree format.
     """
-    categories = await category_crud.get_category_tree(
+    etag = await _catalog_etag(request)
+    not_modified = not_modified_response(request, etag)
+    if not_modified:
+        return not_modified
+    
+    body = await category_crud.get_category_tree_json(
         session, 
         parent_id=parent_id,
         is_active=is_active
     )
     
-    # Convert to tree format
-    def convert_to_tree_item(category):
-        subcategories = [convert_to_tree_item(subcat) for subcat in category.subcategories 
-                         if is_active is None or subcat.is_active == is_active]
-        
-        return CategoryTreeItem(
-            id=category.id,
-            name=category.name,
-            slug=category.slug,
-            description=category.description,
-            image_url=category.image_url,
-            is_active=category.is_active,
-            children=subcategories
-        )
-    
-    tree_items = [convert_to_tree_item(category) for category in categories]
-    
-    return {"items": tree_items}
+    response = Response(content=body, media_type="application/json")
+    set_catalog_cache_headers(response, etag, is_replica_session(session))
+    return response
 
 @router.get("/{category_id}", response_model=Category)
 async def get_category(
+    request: Request,
+    response: Response,
     category_id: UUID = Path(..., description="The ID of the category to get"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get a specific category by ID.
     """
+    etag = await _catalog_etag(request)
+    not_modified = not_modified_response(request, etag)
+    if not_modified:
+        return not_modified
+    
     category = await category_crud.get_category(session, category_id=category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
+    
+    set_catalog_cache_headers(response, etag, is_replica_session(session))
     return category
 
 @router.get("/slug/{slug}", response_model=Category)
 async def get_category_by_slug(
+    request: Request,
+    response: Response,
     slug: str = Path(..., description="The slug of the category to get"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get a specific category by slug.
     """
+    etag = await _catalog_etag(request)
+    not_modified = not_modified_response(request, etag)
+    if not_modified:
+        return not_modified
+    
     category = await category_crud.get_category_by_slug(session, slug=slug)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
+    
+    set_catalog_cache_headers(response, etag, is_replica_session(session))
     return category
 
 @router.post("/", response_model=Category, status_code=status.HTTP_201_CREATED)
@@ -139,20 +175,12 @@ async def update_category(
     """
     Update a category.
     """
-    category = await category_crud.get_category(session, category_id=category_id)
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
-        )
-    
     try:
         updated_category = await category_crud.update_category(
             session, 
             category_id=category_id, 
             category_data=category_in.model_dump(exclude_unset=True)
         )
-        return updated_category
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -160,6 +188,13 @@ async def update_category(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Could not update category: {str(e)}"
         )
+    
+    if not updated_category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    return updated_category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_category(
@@ -170,15 +205,8 @@ async def delete_category(
     """
     Delete a category.
     """
-    category = await category_crud.get_category(session, category_id=category_id)
-    if not category:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Category not found"
-        )
-    
     try:
-        await category_crud.delete_category(session, category_id=category_id)
+        deleted = await category_crud.delete_category(session, category_id=category_id)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -187,4 +215,9 @@ async def delete_category(
             detail=f"Could not delete category: {str(e)}"
         )
     
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
     return None 
\ No newline at end of file
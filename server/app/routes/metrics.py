@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends
+
+from app.crud.cart import cart_flusher
+from app.crud.reservation import hold_sweeper
+from app.database import get_pool_status
+from app.services.cache import get_cache_stats
+from app.middleware.authentication import verify_jwt_token
+
+router = APIRouter()
+
+@router.get("/cache")
+async def get_cache_metrics(
+    token_data: dict = Depends(verify_jwt_token)
+):
+    """
+    Get hit/miss counters for every cache namespace.
+    """
+    return get_cache_stats()
+
+@router.get("/pool")
+async def get_pool_metrics(
+    token_data: dict = Depends(verify_jwt_token)
+):
+    """
+    Get database connection pool usage and acquire wait times.
+    """
+    return get_pool_status()
+
+@router.get("/carts")
+async def get_cart_metrics(
+    token_data: dict = Depends(verify_jwt_token)
+):
+    """
+    Get write-behind counters for the cart store.
+    """
+    return cart_flusher.stats()
+
+@router.get("/reservations")
+async def get_reservation_metrics(
+    token_data: dict = Depends(verify_jwt_token)
+):
+    """
+    Get counters for the expired stock hold sweeper.
+    """
+    return hold_sweeper.stats()
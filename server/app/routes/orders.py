@@ -1,11 +1,74 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+
+from app.database import get_async_session, get_read_session
+from app.crud import order as order_crud
+from app.schemas.order import CheckoutRequest, Order, OrderDetail, OrderList
+from app.schemas.user import User
+from app.middleware.authentication import get_current_user
+from app.services.cart_store import user_cart_key
 
 router = APIRouter()
 
-@router.get("/")
-async def get_orders():
+@router.get("/me", response_model=OrderList)
+async def get_my_orders(
+    limit: int = Query(20, ge=1, le=100, description="Limit records"),
+    cursor: Optional[str] = Query(None, description="Opaque keyset cursor from next_cursor"),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get the signed-in user's orders, newest first, with line and item
+    counts and a thumbnail. Pages with keyset pagination (cursor/limit).
+    """
+    orders, next_cursor = await order_crud.get_user_orders(
+        session,
+        user_id=current_user.id,
+        limit=limit,
+        cursor=cursor
+    )
+    return {"items": orders, "size": limit, "next_cursor": next_cursor}
+
+@router.get("/me/{order_id}", response_model=OrderDetail)
+async def get_my_order(
+    order_id: UUID = Path(..., description="The ID of the order to get"),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get one of the signed-in user's orders with its lines and shipping address.
+    """
+    order = await order_crud.get_user_order(session, user_id=current_user.id, order_id=order_id)
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return order
+
+@router.post("/checkout", response_model=Order, status_code=status.HTTP_201_CREATED)
+async def checkout(
+    checkout_in: CheckoutRequest,
+    response: Response,
+    idempotency_key: str = Header(..., alias="Idempotency-Key", min_length=1, max_length=255),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
     """
-    Placeholder route for orders.
-    Will be implemented in the future.
+    Place an order for everything in the signed-in user's cart.
+    Stock is reserved atomically; if any product is short the request
+    fails with 409 and nothing is reserved. Retrying with the same
+    Idempotency-Key returns the original order (200) instead of a new one.
     """
-    return {"message": "Orders API - Not implemented yet"} 
\ No newline at end of file
+    order, created = await order_crud.checkout(
+        session,
+        user_id=current_user.id,
+        cart_key=user_cart_key(current_user.id),
+        shipping_address_id=checkout_in.shipping_address_id,
+        idempotency_key=idempotency_key
+    )
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return order
@@ -1,22 +1,39 @@
-from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 import math
 
-from app.database import get_async_session
+from app.database import get_async_session, get_read_session, get_read_session_factory, is_replica_session
 from app.crud import product as product_crud
 from app.schemas.product import (
-    Product, ProductCreate, ProductUpdate, ProductList,
-    ProductImage, ProductImageCreate, ProductImageUpdate
+    Product, ProductCreate, ProductUpdate, ProductList, ProductSort,
+    ProductImage, ProductImageCreate, ProductImageUpdate, ProductImportResult,
+    ProductBatch, ProductBatchRequest
 )
 from app.middleware.authentication import verify_jwt_token
+from app.services.catalog import get_catalog_version
+from app.services.counts import DEFAULT_COUNT_STRATEGY, CountStrategy, TotalMode
+from app.services.product_io import ProductFileFormat, export_products, import_products
+from app.utils.http_cache import make_etag, not_modified_response, set_cache_headers, set_catalog_cache_headers
+from app.utils.pagination import PaginationMode
 
 router = APIRouter()
 
+def _product_validators(product: Dict[str, Any]) -> Tuple[str, datetime]:
+    """
+    Build the ETag and Last-Modified values for a serialized product.
+    """
+    last_modified = datetime.fromisoformat(product["updated_at"] or product["created_at"])
+    return make_etag(product["id"], last_modified.isoformat()), last_modified
+
 # Product routes
 @router.get("/", response_model=ProductList)
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Skip records"),
     limit: int = Query(10, ge=1, le=100, description="Limit records"),
     category_id: Optional[UUID] = Query(None, description="Filter by category ID"),
@@ -24,12 +41,35 @@ async def get_products(
     price_min: Optional[float] = Query(None, ge=0, description="Minimum price"),
     price_max: Optional[float] = Query(None, ge=0, description="Maximum price"),
     is_active: Optional[bool] = Query(True, description="Filter by active status"),
-    session: AsyncSession = Depends(get_async_session)
+    in_stock: Optional[bool] = Query(None, description="Filter by stock availability"),
+    sort: Optional[ProductSort] = Query(None, description="Sort by newest, price, -price or rating (default: relevance when searching, else newest)"),
+    facets: bool = Query(False, description="Include category, price bucket and stock facet counts"),
+    pagination: PaginationMode = Query(PaginationMode.OFFSET, description="offset (skip/limit) or keyset (cursor/limit)"),
+    cursor: Optional[str] = Query(None, description="Opaque keyset cursor from next_cursor (implies keyset pagination)"),
+    total_mode: TotalMode = Query(TotalMode.EXACT, description="How to compute the total: exact, estimate or none"),
+    count_strategy: CountStrategy = Query(CountStrategy(DEFAULT_COUNT_STRATEGY), description="How to fetch the total: sequential, concurrent or window"),
+    include_total: bool = Query(True, deprecated=True, description="Use total_mode=none instead"),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
-    Get a list of products with pagination and filtering options.
+    Get a list of products with pagination, filtering and sorting options.
+    Supports OFFSET pagination (skip/limit) and keyset pagination
+    (pagination=keyset, then cursor/limit). Keyset pages after the first
+    don't count the total again.
     """
-    products, total = await product_crud.get_products(
+    if cursor:
+        pagination = PaginationMode.KEYSET
+    
+    # The listing only changes when the catalog does. A client already
+    # holding the current ETag got it from the primary, so a replica can
+    # still answer its revalidation with a 304.
+    catalog_version = await get_catalog_version()
+    etag = make_etag("products", catalog_version, request.url.query) if catalog_version else None
+    not_modified = not_modified_response(request, etag)
+    if not_modified:
+        return not_modified
+    
+    products, total, total_is_exact, next_cursor = await product_crud.get_products(
         session, 
         skip=skip, 
         limit=limit, 
@@ -37,49 +77,145 @@ async def get_products(
         search=search,
         price_min=price_min,
         price_max=price_max,
-        is_active=is_active
+        is_active=is_active,
+        in_stock=in_stock,
+        sort=sort,
+        pagination=pagination,
+        cursor=cursor,
+        total_mode=total_mode if include_total else TotalMode.NONE,
+        count_strategy=count_strategy
     )
     
-    pages = math.ceil(total / limit) if limit else 1
+    pages = math.ceil(total / limit) if total is not None and limit else None
     
+    product_facets = None
+    if facets:
+        product_facets = await product_crud.get_product_facets(
+            session,
+            category_id=category_id,
+            search=search,
+            price_min=price_min,
+            price_max=price_max,
+            is_active=is_active,
+            in_stock=in_stock
+        )
+    
+    set_catalog_cache_headers(response, etag, is_replica_session(session))
     return {
         "items": products,
         "total": total,
-        "page": skip // limit + 1 if limit else 1,
+        "total_is_exact": total_is_exact,
+        "page": skip // limit + 1 if pagination == PaginationMode.OFFSET and limit else None,
         "size": limit,
-        "pages": pages
+        "pages": pages,
+        "next_cursor": next_cursor,
+        "facets": product_facets
     }
 
+@router.post("/batch", response_model=ProductBatch)
+async def get_products_batch(
+    batch_in: ProductBatchRequest,
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Get several products by id and/or slug in one request.
+    Products are returned in the requested order; unknown ids and slugs
+    are listed in missing_ids and missing_slugs.
+    """
+    products, missing_ids, missing_slugs = await product_crud.get_products_by_keys_cached(
+        session,
+        ids=batch_in.ids,
+        slugs=batch_in.slugs
+    )
+    return {"items": products, "missing_ids": missing_ids, "missing_slugs": missing_slugs}
+
+@router.get("/export")
+async def export_product_file(
+    request: Request,
+    format: ProductFileFormat = Query(ProductFileFormat.NDJSON, description="ndjson or csv"),
+    token_data: dict = Depends(verify_jwt_token)
+):
+    """
+    Stream every product as NDJSON or CSV, in the format the import takes.
+    """
+    return StreamingResponse(
+        export_products(get_read_session_factory(request), format),
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{format.value}"'}
+    )
+
+@router.post("/import", response_model=ProductImportResult)
+async def import_product_file(
+    request: Request,
+    format: Optional[ProductFileFormat] = Query(None, description="ndjson or csv (default: from Content-Type)"),
+    session: AsyncSession = Depends(get_async_session),
+    token_data: dict = Depends(verify_jwt_token)
+):
+    """
+    Create or update (by slug) products from an NDJSON or CSV request body.
+    The body is streamed and written in batches; rejected rows are reported
+    by line number.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = ProductFileFormat.CSV if "csv" in content_type else ProductFileFormat.NDJSON
+    
+    try:
+        return await import_products(session, request.stream(), format)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Import file must be UTF-8 encoded"
+        )
+
 @router.get("/{product_id}", response_model=Product)
 async def get_product(
+    request: Request,
+    response: Response,
     product_id: UUID = Path(..., description="The ID of the product to get"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get a specific product by ID.
     """
-    product = await product_crud.get_product(session, product_id=product_id)
+    product = await product_crud.get_product_cached(session, product_id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
+    
+    etag, last_modified = _product_validators(product)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+    
+    set_cache_headers(response, etag, last_modified)
     return product
 
 @router.get("/slug/{slug}", response_model=Product)
 async def get_product_by_slug(
+    request: Request,
+    response: Response,
     slug: str = Path(..., description="The slug of the product to get"),
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get a specific product by slug.
     """
-    product = await product_crud.get_product_by_slug(session, slug=slug)
+    product = await product_crud.get_product_by_slug_cached(session, slug=slug)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
+    
+    etag, last_modified = _product_validators(product)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified:
+        return not_modified
+    
+    set_cache_headers(response, etag, last_modified)
     return product
 
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
@@ -112,20 +248,12 @@ async def update_product(
     """
     Update a product.
     """
-    product = await product_crud.get_product(session, product_id=product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
-    
     try:
         updated_product = await product_crud.update_product(
             session, 
             product_id=product_id, 
             product_data=product_in.model_dump(exclude_unset=True)
         )
-        return updated_product
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -133,6 +261,13 @@ async def update_product(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Could not update product: {str(e)}"
         )
+    
+    if not updated_product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return updated_product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
@@ -143,34 +278,31 @@ async def delete_product(
     """
     Delete a product.
     """
-    product = await product_crud.get_product(session, product_id=product_id)
-    if not product:
+    if not await product_crud.delete_product(session, product_id=product_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    
-    await product_crud.delete_product(session, product_id=product_id)
     return None
 
 # Product Image routes
 @router.get("/{product_id}/images", response_model=List[ProductImage])
 async def get_product_images(
     product_id: UUID,
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Get all images for a product.
     """
-    product = await product_crud.get_product(session, product_id=product_id)
+    # The cached product already carries its images
+    product = await product_crud.get_product_cached(session, product_id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
-    images = await product_crud.get_product_images(session, product_id=product_id)
-    return images
+    return sorted(product["images"], key=lambda image: image["display_order"])
 
 @router.post("/images", response_model=ProductImage, status_code=status.HTTP_201_CREATED)
 async def create_product_image(
@@ -181,22 +313,20 @@ async def create_product_image(
     """
     Create a new product image.
     """
-    # Verify product exists
-    product = await product_crud.get_product(session, product_id=image_in.product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
-    
     try:
         image = await product_crud.create_product_image(session, image_in.model_dump())
-        return image
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Could not create product image: {str(e)}"
         )
+    
+    if not image:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return image
 
 @router.put("/images/{image_id}", response_model=ProductImage)
 async def update_product_image(
@@ -208,25 +338,24 @@ async def update_product_image(
     """
     Update a product image.
     """
-    image = await product_crud.get_product_image(session, image_id=image_id)
-    if not image:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product image not found"
-        )
-    
     try:
         updated_image = await product_crud.update_product_image(
             session, 
             image_id=image_id, 
             image_data=image_in.model_dump(exclude_unset=True)
         )
-        return updated_image
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Could not update product image: {str(e)}"
         )
+    
+    if not updated_image:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product image not found"
+        )
+    return updated_image
 
 @router.delete("/images/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product_image(
@@ -237,12 +366,9 @@ async def delete_product_image(
     """
     Delete a product image.
     """
-    image = await product_crud.get_product_image(session, image_id=image_id)
-    if not image:
+    if not await product_crud.delete_product_image(session, image_id=image_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product image not found"
         )
-    
-    await product_crud.delete_product_image(session, image_id=image_id)
     return None 
\ No newline at end of file
@@ -0,0 +1,60 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from uuid import UUID
+from decimal import Decimal
+from datetime import datetime
+
+# Largest quantity of one product a cart line can hold
+CART_MAX_ITEM_QUANTITY = 99
+
+# CartItem Schemas
+class CartItemAdd(BaseModel):
+    """Schema for adding a product to a cart."""
+    product_id: UUID
+    quantity: int = Field(1, ge=1, le=CART_MAX_ITEM_QUANTITY)
+
+class CartItemUpdate(BaseModel):
+    """Schema for setting a cart line's quantity (0 removes it)."""
+    quantity: int = Field(..., ge=0, le=CART_MAX_ITEM_QUANTITY)
+
+class CartItem(BaseModel):
+    """Schema for a cart line."""
+    product_id: UUID
+    quantity: int
+
+# Cart Schemas
+class Cart(BaseModel):
+    """Schema for cart response."""
+    items: List[CartItem] = []
+    item_count: int = 0
+
+# Priced cart Schemas
+class CartLine(BaseModel):
+    """Schema for a cart line priced against the current product."""
+    product_id: UUID
+    name: str
+    slug: str
+    image_url: Optional[str] = None
+    quantity: int
+    list_price: Decimal
+    unit_price: Decimal
+    line_total: Decimal
+    line_savings: Decimal
+    stock_quantity: int
+    in_stock: bool
+    is_active: bool
+
+class PricedCart(BaseModel):
+    """Schema for priced cart response."""
+    items: List[CartLine] = []
+    item_count: int = 0
+    subtotal: Decimal = Decimal("0.00")
+    savings: Decimal = Decimal("0.00")
+    all_in_stock: bool = True
+    missing_product_ids: List[UUID] = []
+
+# Stock hold Schemas
+class StockHold(BaseModel):
+    """Schema for the stock held for a cart."""
+    items: List[CartItem] = []
+    expires_at: datetime
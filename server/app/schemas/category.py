@@ -46,10 +46,11 @@ class Category(CategoryInDBBase):
 class CategoryList(BaseModel):
     """Schema for list of categories response."""
     items: List[CategorySimple]
-    total: int
+    total: Optional[int] = None
+    total_is_exact: Optional[bool] = None
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
 
 # Tree response schema
 class CategoryTreeItem(BaseModel):
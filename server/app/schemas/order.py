@@ -0,0 +1,78 @@
+from typing import Optional, List
+from pydantic import BaseModel, ConfigDict
+from decimal import Decimal
+from uuid import UUID
+from datetime import datetime
+
+from app.models.order import OrderStatus
+
+# Checkout Schemas
+class CheckoutRequest(BaseModel):
+    """Schema for checking out the current cart."""
+    shipping_address_id: UUID
+
+# OrderItem Schemas
+class OrderItem(BaseModel):
+    """Schema for order item response."""
+    id: UUID
+    product_id: UUID
+    quantity: int
+    price_at_purchase: Decimal
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Order Schemas
+class Order(BaseModel):
+    """Schema for order response."""
+    id: UUID
+    user_id: UUID
+    status: OrderStatus
+    total_amount: Decimal
+    shipping_address_id: UUID
+    tracking_number: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    items: List[OrderItem] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Order history Schemas
+class OrderSummary(BaseModel):
+    """Schema for an order in the order history."""
+    id: UUID
+    status: OrderStatus
+    total_amount: Decimal
+    created_at: datetime
+    line_count: int = 0
+    item_count: int = 0
+    thumbnail_url: Optional[str] = None
+
+class OrderList(BaseModel):
+    """Schema for the order history response."""
+    items: List[OrderSummary]
+    size: int
+    next_cursor: Optional[str] = None
+
+# Order detail Schemas
+class OrderAddress(BaseModel):
+    """Schema for an order's shipping address."""
+    id: UUID
+    address_line1: str
+    address_line2: Optional[str] = None
+    city: str
+    state: str
+    postal_code: str
+    country: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+class OrderLine(OrderItem):
+    """Schema for an order item with its product's name and image."""
+    name: Optional[str] = None
+    slug: Optional[str] = None
+    image_url: Optional[str] = None
+
+class OrderDetail(Order):
+    """Schema for order detail response."""
+    items: List[OrderLine] = []
+    shipping_address: OrderAddress
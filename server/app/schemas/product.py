@@ -1,8 +1,9 @@
 from typing import Optional, List, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator, validator
 from decimal import Decimal
 from uuid import UUID
 from datetime import datetime
+from enum import Enum
 
 # ProductImage Schemas
 class ProductImageBase(BaseModel):
@@ -87,11 +88,82 @@ class Product(ProductInDBBase):
     """Schema for product response."""
     images: List[ProductImage] = []
 
+class ProductSort(str, Enum):
+    """Sort orders for product listings."""
+    NEWEST = "newest"
+    PRICE = "price"
+    PRICE_DESC = "-price"
+    RATING = "rating"
+
+# Facet schemas
+class CategoryFacet(BaseModel):
+    """Number of matching products in a category."""
+    category_id: UUID
+    count: int
+
+class PriceBucketFacet(BaseModel):
+    """Number of matching products in a price range (max is exclusive)."""
+    min: Decimal
+    max: Optional[Decimal] = None
+    count: int
+
+class StockFacet(BaseModel):
+    """Number of matching products in and out of stock."""
+    in_stock: int = 0
+    out_of_stock: int = 0
+
+class ProductFacets(BaseModel):
+    """
+    Facet counts for a product listing. Each facet ignores its own filter,
+    so the counts show what selecting another value would return.
+    """
+    categories: List[CategoryFacet] = []
+    price_buckets: List[PriceBucketFacet] = []
+    stock: StockFacet = StockFacet()
+
+# Batch read schemas
+PRODUCT_BATCH_MAX_KEYS = 100
+
+class ProductBatchRequest(BaseModel):
+    """Schema for reading several products by id and/or slug."""
+    ids: List[UUID] = []
+    slugs: List[str] = []
+
+    @model_validator(mode='after')
+    def validate_key_count(self):
+        # Checked on the whole model so requests with only ids are limited too
+        if len(self.ids) + len(self.slugs) > PRODUCT_BATCH_MAX_KEYS:
+            raise ValueError(f'At most {PRODUCT_BATCH_MAX_KEYS} ids and slugs can be requested at once')
+        return self
+
+class ProductBatch(BaseModel):
+    """Schema for batch read response."""
+    items: List[Product]
+    missing_ids: List[UUID] = []
+    missing_slugs: List[str] = []
+
 # List response schema
 class ProductList(BaseModel):
     """Schema for list of products response."""
     items: List[Product]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_is_exact: Optional[bool] = None
+    page: Optional[int] = None
     size: int
-    pages: int 
\ No newline at end of file
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+    facets: Optional[ProductFacets] = None 
+
+# Bulk import schemas
+class ProductImportError(BaseModel):
+    """A row rejected by a product import."""
+    line: int
+    error: str
+
+class ProductImportResult(BaseModel):
+    """Schema for product import response."""
+    processed: int
+    written: int
+    unchanged: int
+    failed: int
+    errors: List[ProductImportError] = []
\ No newline at end of file
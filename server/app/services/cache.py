@@ -0,0 +1,358 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Backend selection: "memory" (per-process) or "redis" (shared across workers)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Bump when the shape of cached values changes so old entries are never read
+CACHE_KEY_VERSION = 1
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "mbm")
+
+
+class MemoryCacheBackend:
+    """
+    In-process cache with per-entry TTL and LRU eviction.
+    Values are stored as-is and must be treated as read-only by callers.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                values.append(None)
+                continue
+            if entry[0] <= now:
+                del self._entries[key]
+                values.append(None)
+                continue
+            self._entries.move_to_end(key)
+            values.append(entry[1])
+        return values
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def set_many(self, items: Dict[str, Any], ttl: float) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def set_many_if_counters(self, entries: List[Tuple[str, Any, str, int]], ttl: float) -> None:
+        # Nothing awaits between the check and the write, so they are atomic
+        for key, value, counter_key, expected in entries:
+            if self._counters.get(counter_key, 0) == expected:
+                await self.set(key, value, ttl)
+
+    async def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self, prefix: str) -> None:
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def incr_many(self, keys: List[str]) -> None:
+        for key in keys:
+            await self.incr(key)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def get_counters(self, keys: List[str]) -> List[int]:
+        return [self._counters.get(key, 0) for key in keys]
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Redis-backed cache shared by all workers. TTLs are enforced by Redis;
+    LRU eviction is left to the server's maxmemory-policy (allkeys-lru).
+    """
+
+    # Type markers so raw bytes and JSON values round-trip unchanged
+    _BYTES = b"b"
+    _JSON = b"j"
+
+    # SET KEYS[1] only while the counter KEYS[2] still equals ARGV[2]
+    _SET_IF_COUNTER_SCRIPT = """
+    if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[2]) then
+        return 0
+    end
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+    return 1
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.evictions = 0
+        self._client = redis.from_url(url)
+        self._set_if_counter = self._client.register_script(self._SET_IF_COUNTER_SCRIPT)
+
+    def _dump(self, value: Any) -> bytes:
+        if isinstance(value, bytes):
+            return self._BYTES + value
+        return self._JSON + json.dumps(value, separators=(",", ":")).encode()
+
+    def _load(self, raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            return None
+        if raw[:1] == self._BYTES:
+            return raw[1:]
+        return json.loads(raw[1:])
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        return [self._load(raw) for raw in await self._client.mget(keys)]
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(key, self._dump(value), px=int(ttl * 1000))
+
+    async def set_many(self, items: Dict[str, Any], ttl: float) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, self._dump(value), px=int(ttl * 1000))
+            await pipe.execute()
+
+    async def set_many_if_counters(self, entries: List[Tuple[str, Any, str, int]], ttl: float) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value, counter_key, expected in entries:
+                await self._set_if_counter(
+                    keys=[key, counter_key], args=[self._dump(value), expected, int(ttl * 1000)], client=pipe
+                )
+            await pipe.execute()
+
+    async def delete(self, keys: List[str]) -> None:
+        await self._client.unlink(*keys)
+
+    async def clear(self, prefix: str) -> None:
+        keys = [key async for key in self._client.scan_iter(match=f"{prefix}*")]
+        if keys:
+            await self._client.unlink(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def incr_many(self, keys: List[str]) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(key)
+            await pipe.execute()
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self._client.get(key) or 0)
+
+    async def get_counters(self, keys: List[str]) -> List[int]:
+        return [int(raw or 0) for raw in await self._client.mget(keys)]
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class Cache:
+    """
+    Namespaced read-through cache with hit/miss counters.
+    Backend errors are logged and treated as misses so the cache can never
+    take the API down.
+    """
+
+    def __init__(self, namespace: str, backend: Any, ttl: float):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._prefix = f"{CACHE_KEY_PREFIX}:{namespace}:v{CACHE_KEY_VERSION}:"
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    async def get(self, key: str) -> Optional[Any]:
+        return (await self.get_many([key]))[0]
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        try:
+            values = await self.backend.get_many([self._key(key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' read failed: {e}")
+            values = [None] * len(keys)
+
+        hits = sum(1 for value in values if value is not None)
+        self.hits += hits
+        self.misses += len(values) - hits
+        return values
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            await self.backend.set(self._key(key), value, ttl if ttl is not None else self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' write failed: {e}")
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """
+        Store several entries in one round trip.
+        """
+        if not items:
+            return
+        try:
+            await self.backend.set_many(
+                {self._key(key): value for key, value in items.items()},
+                ttl if ttl is not None else self.ttl
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' write failed: {e}")
+
+    async def set_many_if_counters(
+        self,
+        entries: List[Tuple[str, Any, str, int]],
+        ttl: Optional[float] = None
+    ) -> None:
+        """
+        Store (key, value, counter_key, expected) entries in one round trip,
+        each only while its counter still has the value read before the
+        value was loaded. A writer that bumps the counter after changing the
+        source data keeps a reader that loaded the old data from caching it.
+        """
+        if not entries:
+            return
+        try:
+            await self.backend.set_many_if_counters(
+                [(self._key(key), value, self._key(counter_key), expected) for key, value, counter_key, expected in entries],
+                ttl if ttl is not None else self.ttl
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' write failed: {e}")
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self.backend.delete([self._key(key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' delete failed: {e}")
+
+    async def clear(self) -> None:
+        try:
+            await self.backend.clear(self._prefix)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' clear failed: {e}")
+
+    async def incr(self, key: str) -> Optional[int]:
+        """
+        Atomically increment a counter that never expires or gets evicted.
+        """
+        try:
+            return await self.backend.incr(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' incr failed: {e}")
+            return None
+
+    async def incr_many(self, keys: List[str]) -> None:
+        """
+        Increment several counters in one round trip.
+        """
+        if not keys:
+            return
+        try:
+            await self.backend.incr_many([self._key(key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' incr failed: {e}")
+
+    async def get_counter(self, key: str) -> Optional[int]:
+        try:
+            return await self.backend.get_counter(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' counter read failed: {e}")
+            return None
+
+    async def get_counters(self, keys: List[str]) -> List[Optional[int]]:
+        if not keys:
+            return []
+        try:
+            return await self.backend.get_counters([self._key(key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache '{self.namespace}' counter read failed: {e}")
+            return [None] * len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "errors": self.errors,
+            "evictions": self.backend.evictions,
+            "size": self.backend.size(),
+        }
+
+
+_caches: Dict[str, Cache] = {}
+_redis_backend: Optional[RedisCacheBackend] = None
+
+
+def get_cache(namespace: str, ttl: float, max_entries: int = 10000, local: bool = False) -> Cache:
+    """
+    Get or create the cache for a namespace using the configured backend.
+    local=True always uses the in-process backend, for data that must
+    never leave the process or must be served without a network hop.
+    """
+    global _redis_backend
+    if namespace in _caches:
+        return _caches[namespace]
+
+    if CACHE_BACKEND == "redis" and not local:
+        # All namespaces share one connection pool
+        if _redis_backend is None:
+            _redis_backend = RedisCacheBackend(REDIS_URL)
+        backend = _redis_backend
+    else:
+        backend = MemoryCacheBackend(max_entries)
+
+    cache = Cache(namespace, backend, ttl)
+    _caches[namespace] = cache
+    return cache
+
+
+def get_cache_stats(namespaces: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Get hit/miss counters for all (or the given) cache namespaces.
+    """
+    names = namespaces if namespaces is not None else _caches.keys()
+    return {name: _caches[name].stats() for name in names if name in _caches}
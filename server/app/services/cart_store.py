@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.cache import CACHE_BACKEND, CACHE_KEY_PREFIX, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# Backend for live carts: "memory" (per-process) or "redis" (shared across workers)
+CART_STORE_BACKEND = os.getenv("CART_STORE_BACKEND", CACHE_BACKEND).lower()
+# Idle carts drop out of the store after this long; they are reloaded from the database
+CART_STORE_TTL = int(os.getenv("CART_STORE_TTL", str(30 * 24 * 3600)))
+# Carts kept by the memory store before the least recently used ones are dropped
+CART_STORE_MAX_ENTRIES = int(os.getenv("CART_STORE_MAX_ENTRIES", "100000"))
+# How often changed carts are written to the database, and how many per transaction
+CART_FLUSH_INTERVAL = float(os.getenv("CART_FLUSH_INTERVAL", "1"))
+CART_FLUSH_BATCH_SIZE = int(os.getenv("CART_FLUSH_BATCH_SIZE", "500"))
+
+# Marker field: the cart has been loaded from the database (it may be empty)
+_LOADED = "_"
+
+CartItems = Dict[str, int]
+
+
+def user_cart_key(user_id: uuid.UUID) -> str:
+    return f"user:{user_id}"
+
+
+def session_cart_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def parse_cart_key(key: str) -> Tuple[str, str]:
+    """
+    Split a cart key into ("user", user_id) or ("session", session_id).
+    """
+    kind, _, value = key.partition(":")
+    return kind, value
+
+
+class MemoryCartStore:
+    """
+    In-process cart store with an idle TTL and LRU eviction. Every
+    operation completes without awaiting, so each one is atomic with
+    respect to other requests on the event loop.
+    Only carts whose changes are in the database are dropped: carts that
+    are dirty or being flushed stay until the flush is done, even past the
+    TTL or max_entries.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._carts: "OrderedDict[str, Tuple[float, CartItems]]" = OrderedDict()
+        self._dirty: Dict[str, None] = {}
+        self._flushing: Dict[str, None] = {}
+
+    def _unsaved(self, key: str) -> bool:
+        return key in self._dirty or key in self._flushing
+
+    def _lookup(self, key: str) -> Optional[CartItems]:
+        entry = self._carts.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic() and not self._unsaved(key):
+            del self._carts[key]
+            return None
+        self._carts.move_to_end(key)
+        return entry[1]
+
+    def _cart(self, key: str) -> CartItems:
+        # A write refreshes the TTL, as EXPIRE does in the Redis store
+        cart = self._lookup(key)
+        if cart is None:
+            cart = {}
+        self._carts[key] = (time.monotonic() + self.ttl, cart)
+        self._carts.move_to_end(key)
+        self._evict(keep=key)
+        return cart
+
+    def _evict(self, keep: str) -> None:
+        excess = len(self._carts) - self.max_entries
+        if excess <= 0:
+            return
+        victims = []
+        for key in self._carts:
+            if key != keep and not self._unsaved(key):
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        for key in victims:
+            del self._carts[key]
+        self.evictions += len(victims)
+
+    async def get(self, key: str) -> Optional[CartItems]:
+        items = self._lookup(key)
+        return dict(items) if items is not None else None
+
+    async def load(self, key: str, items: CartItems) -> CartItems:
+        # Changes made since the caller read the database win
+        cart = self._cart(key)
+        for product_id, quantity in items.items():
+            cart.setdefault(product_id, quantity)
+        return dict(cart)
+
+    async def add(self, key: str, product_id: str, quantity: int) -> int:
+        self._dirty[key] = None
+        cart = self._cart(key)
+        cart[product_id] = cart.get(product_id, 0) + quantity
+        return cart[product_id]
+
+    async def set(self, key: str, product_id: str, quantity: int) -> None:
+        self._dirty[key] = None
+        cart = self._cart(key)
+        if quantity > 0:
+            cart[product_id] = quantity
+        else:
+            cart.pop(product_id, None)
+
+    async def clear(self, key: str) -> None:
+        self._dirty[key] = None
+        self._cart(key).clear()
+
+    async def merge(self, source: str, target: str) -> CartItems:
+        self._dirty[source] = None
+        self._dirty[target] = None
+        source_cart = self._cart(source)
+        cart = self._cart(target)
+        for product_id, quantity in source_cart.items():
+            cart[product_id] = cart.get(product_id, 0) + quantity
+        source_cart.clear()
+        return dict(cart)
+
+    async def pop_dirty(self, count: int) -> Dict[str, CartItems]:
+        keys = list(self._dirty)[:count]
+        for key in keys:
+            del self._dirty[key]
+            self._flushing[key] = None
+        return {key: dict(self._carts[key][1]) if key in self._carts else {} for key in keys}
+
+    async def mark_dirty(self, keys: List[str]) -> None:
+        for key in keys:
+            self._dirty[key] = None
+
+    async def acquire_flush_lock(self, ttl: float) -> bool:
+        return True
+
+    async def release_flush_lock(self) -> None:
+        # Carts from a failed batch were marked dirty again by now
+        self._flushing.clear()
+
+
+class RedisCartStore:
+    """
+    Redis cart store shared by all workers. A cart is a hash of
+    product_id -> quantity, so per-item changes are single atomic commands
+    (HINCRBY, HSET, HDEL) and merging runs as one Lua script.
+    """
+
+    _MERGE_SCRIPT = """
+    local items = redis.call('HGETALL', KEYS[1])
+    for i = 1, #items, 2 do
+        if items[i] ~= ARGV[1] then
+            redis.call('HINCRBY', KEYS[2], items[i], items[i + 1])
+        end
+    end
+    redis.call('DEL', KEYS[1])
+    redis.call('HSET', KEYS[1], ARGV[1], 1)
+    redis.call('HSET', KEYS[2], ARGV[1], 1)
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+    redis.call('SADD', KEYS[3], ARGV[3], ARGV[4])
+    return redis.call('HGETALL', KEYS[2])
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self._prefix = f"{CACHE_KEY_PREFIX}:cart:"
+        self._dirty_key = f"{self._prefix}dirty"
+        self._lock_key = f"{self._prefix}flush-lock"
+        self._lock_token = uuid.uuid4().hex
+        self._merge = self._client.register_script(self._MERGE_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return self._prefix + key
+
+    @staticmethod
+    def _items(raw: Dict[str, str]) -> CartItems:
+        return {product_id: int(quantity) for product_id, quantity in raw.items() if product_id != _LOADED}
+
+    async def get(self, key: str) -> Optional[CartItems]:
+        raw = await self._client.hgetall(self._key(key))
+        return self._items(raw) if _LOADED in raw else None
+
+    async def load(self, key: str, items: CartItems) -> CartItems:
+        async with self._client.pipeline(transaction=True) as pipe:
+            # HSETNX so changes made since the caller read the database win
+            for product_id, quantity in items.items():
+                pipe.hsetnx(self._key(key), product_id, quantity)
+            pipe.hset(self._key(key), _LOADED, 1)
+            pipe.expire(self._key(key), CART_STORE_TTL)
+            pipe.hgetall(self._key(key))
+            results = await pipe.execute()
+        return self._items(results[-1])
+
+    async def _write(self, key: str, command: Callable[[Any], Any]) -> List[Any]:
+        # The change, its TTL refresh and the dirty mark commit together
+        async with self._client.pipeline(transaction=True) as pipe:
+            command(pipe)
+            pipe.hset(self._key(key), _LOADED, 1)
+            pipe.expire(self._key(key), CART_STORE_TTL)
+            pipe.sadd(self._dirty_key, key)
+            return await pipe.execute()
+
+    async def add(self, key: str, product_id: str, quantity: int) -> int:
+        results = await self._write(key, lambda pipe: pipe.hincrby(self._key(key), product_id, quantity))
+        return int(results[0])
+
+    async def set(self, key: str, product_id: str, quantity: int) -> None:
+        if quantity > 0:
+            await self._write(key, lambda pipe: pipe.hset(self._key(key), product_id, quantity))
+        else:
+            await self._write(key, lambda pipe: pipe.hdel(self._key(key), product_id))
+
+    async def clear(self, key: str) -> None:
+        await self._write(key, lambda pipe: pipe.delete(self._key(key)))
+
+    async def merge(self, source: str, target: str) -> CartItems:
+        raw = await self._merge(
+            keys=[self._key(source), self._key(target), self._dirty_key],
+            args=[_LOADED, CART_STORE_TTL, source, target]
+        )
+        return self._items(dict(zip(raw[::2], raw[1::2])))
+
+    async def pop_dirty(self, count: int) -> Dict[str, CartItems]:
+        keys = await self._client.spop(self._dirty_key, count)
+        if not keys:
+            return {}
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(self._key(key))
+            carts = await pipe.execute()
+        # A cart that expired before it was flushed has nothing left to write
+        return {key: self._items(raw) for key, raw in zip(keys, carts) if _LOADED in raw}
+
+    async def mark_dirty(self, keys: List[str]) -> None:
+        if keys:
+            await self._client.sadd(self._dirty_key, *keys)
+
+    async def acquire_flush_lock(self, ttl: float) -> bool:
+        # One worker flushes at a time, so an older snapshot of a cart can
+        # never overwrite a newer one written by another worker
+        return bool(await self._client.set(self._lock_key, self._lock_token, nx=True, px=int(ttl * 1000)))
+
+    async def release_flush_lock(self) -> None:
+        if await self._client.get(self._lock_key) == self._lock_token:
+            await self._client.delete(self._lock_key)
+
+
+class CartFlusher:
+    """
+    Write-behind persistence for the cart store.
+    Changed carts are collected in batches of batch_size and handed to
+    persist, which writes each batch in one transaction. Carts in a batch
+    that fails are marked dirty again and retried on the next run.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        persist: Callable[[Dict[str, CartItems]], Awaitable[None]],
+        interval: float,
+        batch_size: int
+    ):
+        self.store = store
+        self.persist = persist
+        self.interval = interval
+        self.batch_size = batch_size
+        self.flushed = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def flush(self) -> int:
+        """
+        Persist every changed cart. Returns the number of carts written.
+        """
+        if not await self.store.acquire_flush_lock(max(self.interval * 10, 30)):
+            return 0
+
+        written = 0
+        try:
+            while True:
+                carts = await self.store.pop_dirty(self.batch_size)
+                if not carts:
+                    break
+                try:
+                    await self.persist(carts)
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning(f"Could not persist {len(carts)} carts: {e}")
+                    await self.store.mark_dirty(list(carts))
+                    break
+                written += len(carts)
+        finally:
+            await self.store.release_flush_lock()
+
+        self.flushed += written
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Cart flush failed: {e}")
+
+    async def start(self) -> None:
+        """
+        Start the background flush task.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """
+        Stop the background task and write out pending changes.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"flushed": self.flushed, "failures": self.failures}
+
+
+def _create_cart_store() -> Any:
+    if CART_STORE_BACKEND == "redis":
+        return RedisCartStore(REDIS_URL)
+    return MemoryCartStore(CART_STORE_MAX_ENTRIES, CART_STORE_TTL)
+
+
+cart_store = _create_cart_store()
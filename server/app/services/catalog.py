@@ -0,0 +1,40 @@
+import os
+import time
+import uuid
+from typing import Optional
+
+from app.services.cache import get_cache, CACHE_BACKEND
+
+# Counter bumped on every catalog mutation (products, images, categories).
+# List and tree ETags are derived from it, so a conditional request can be
+# answered without touching the database.
+catalog_cache = get_cache("catalog", ttl=0)
+
+# With the per-process backend each worker has its own counter, so the
+# version is scoped to this process to avoid false 304s across workers.
+_PROCESS_TOKEN = uuid.uuid4().hex[:8] if CACHE_BACKEND != "redis" else "shared"
+
+# A per-process counter never sees mutations made through other workers, so
+# without Redis the version also rolls over every CATALOG_VERSION_MAX_AGE
+# seconds. That bounds how long a worker can answer 304 for a changed
+# catalog.
+CATALOG_VERSION_MAX_AGE = int(os.getenv("CATALOG_VERSION_MAX_AGE", "60"))
+
+
+async def get_catalog_version() -> Optional[str]:
+    """
+    Get the current catalog version, or None if it can't be read.
+    """
+    counter = await catalog_cache.get_counter("version")
+    if counter is None:
+        return None
+    if CACHE_BACKEND != "redis":
+        return f"{_PROCESS_TOKEN}.{counter}.{int(time.time() // CATALOG_VERSION_MAX_AGE)}"
+    return f"{_PROCESS_TOKEN}.{counter}"
+
+
+async def bump_catalog_version() -> None:
+    """
+    Mark the catalog as changed.
+    """
+    await catalog_cache.incr("version")
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+from enum import Enum
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.database import is_replica_session
+from app.services.cache import get_cache
+from app.services.catalog import get_catalog_version
+
+# How long a counted total is reused for the same filters
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "60"))
+# Default for how the total and the page are fetched (see CountStrategy)
+DEFAULT_COUNT_STRATEGY = os.getenv("COUNT_STRATEGY", "sequential").lower()
+# Planner estimates below this are replaced by an exact count, which is
+# cheap at that size and avoids showing "~3" for a 5-row result
+COUNT_ESTIMATE_EXACT_THRESHOLD = int(os.getenv("COUNT_ESTIMATE_EXACT_THRESHOLD", "1000"))
+
+count_cache = get_cache("count", ttl=COUNT_CACHE_TTL, max_entries=10000)
+
+
+class TotalMode(str, Enum):
+    """How list endpoints compute their total."""
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class CountStrategy(str, Enum):
+    """
+    How list endpoints fetch the total alongside the page.
+    sequential: count, then page, on the request's connection.
+    concurrent: count on a second pooled connection while the page runs.
+    window: one query with count(*) OVER () (exact totals only).
+    """
+    SEQUENTIAL = "sequential"
+    CONCURRENT = "concurrent"
+    WINDOW = "window"
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) for a select, keeping its bound parameters.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_rows(session: AsyncSession, query) -> Optional[int]:
+    """
+    Get the planner's row estimate for a query (PostgreSQL only).
+    For an unfiltered table this is pg_class.reltuples; with filters the
+    planner applies its column statistics.
+    """
+    if session.bind.dialect.name != "postgresql":
+        return None
+
+    plan = (await session.execute(Explain(query))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+    session: AsyncSession,
+    model: Any,
+    filters: List[Any],
+    total_mode: TotalMode,
+    cache_key: str
+) -> Tuple[Optional[int], Optional[bool]]:
+    """
+    Count the rows of model matching filters according to total_mode.
+    cache_key must identify the filters. Estimates come from the count
+    cache (scoped to the catalog version), then the planner, and fall
+    back to an exact count for small results or other databases; either
+    way the result is cached for COUNT_CACHE_TTL unless it was read from a
+    replica.
+    Returns a tuple of (total, total_is_exact).
+    """
+    if total_mode == TotalMode.NONE:
+        return None, None
+
+    count_query = select(func.count()).select_from(model).where(*filters)
+    if total_mode == TotalMode.EXACT:
+        return (await session.execute(count_query)).scalar_one(), True
+
+    key = f"{await get_catalog_version()}:{cache_key}"
+    cached = await count_cache.get(key)
+    if cached is not None:
+        return cached[0], cached[1]
+
+    estimate = await estimate_rows(session, select(model.id).where(*filters))
+    if estimate is not None and estimate >= COUNT_ESTIMATE_EXACT_THRESHOLD:
+        total, is_exact = estimate, False
+    else:
+        total, is_exact = (await session.execute(count_query)).scalar_one(), True
+
+    # A replica may lag the catalog version the count would be cached under
+    if not is_replica_session(session):
+        await count_cache.set(key, [total, is_exact])
+    return total, is_exact
+
+
+async def _count_on_new_session(session: AsyncSession, *args: Any) -> Tuple[Optional[int], Optional[bool]]:
+    # Same engine (primary or replica) as the request, separate connection
+    async with AsyncSession(session.bind, expire_on_commit=False) as count_session:
+        return await count_rows(count_session, *args)
+
+
+async def fetch_page_and_count(
+    session: AsyncSession,
+    page_query: Any,
+    model: Any,
+    filters: List[Any],
+    total_mode: TotalMode,
+    cache_key: str,
+    strategy: CountStrategy = CountStrategy(DEFAULT_COUNT_STRATEGY)
+) -> Tuple[List[Any], Optional[int], Optional[bool]]:
+    """
+    Run a page query for model and count the rows matching filters.
+    page_query must select only model, filtered by filters, and may add
+    ordering and OFFSET/LIMIT. With the window strategy it must not narrow
+    the rows any further (e.g. a keyset condition), since the total is
+    counted over the same rows as the page.
+    Returns a tuple of (items, total, total_is_exact).
+    """
+    count_args = (model, filters, total_mode, cache_key)
+
+    if total_mode == TotalMode.NONE:
+        result = await session.execute(page_query)
+        return result.scalars().all(), None, None
+
+    if strategy == CountStrategy.WINDOW and total_mode == TotalMode.EXACT:
+        result = await session.execute(page_query.add_columns(func.count().over().label("total")))
+        rows = result.all()
+        if rows:
+            return [row[0] for row in rows], rows[0][1], True
+        # Past the last page there is no row to carry the total
+        total, total_is_exact = await count_rows(session, *count_args)
+        return [], total, total_is_exact
+
+    if strategy == CountStrategy.CONCURRENT:
+        (total, total_is_exact), result = await asyncio.gather(
+            _count_on_new_session(session, *count_args),
+            session.execute(page_query)
+        )
+        return result.scalars().all(), total, total_is_exact
+
+    total, total_is_exact = await count_rows(session, *count_args)
+    result = await session.execute(page_query)
+    return result.scalars().all(), total, total_is_exact
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY")
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", "https://api.clerk.com/v1/jwks")
+# Background refresh period for the key set
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "3600"))
+# Minimum time between refetches triggered by an unknown kid
+JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))
+
+# Shared pooled HTTP client for outbound calls
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client, creating it on first use.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared HTTP client on shutdown.
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def fetch_clerk_jwks() -> Dict[str, Any]:
+    """
+    Fetch the JSON Web Key Set (JWKS) from Clerk.
+    """
+    headers = {"Authorization": f"Bearer {CLERK_SECRET_KEY}"} if CLERK_SECRET_KEY else {}
+    response = await get_http_client().get(CLERK_JWKS_URL, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+class JWKSCache:
+    """
+    In-process JWKS keyed by kid.
+    Keys are refreshed in the background; a token signed with an unknown kid
+    triggers a refetch at most once per min_refetch_interval so a flood of
+    bad tokens can't hammer the key endpoint.
+    """
+
+    def __init__(self, fetch, refresh_interval: float, min_refetch_interval: float):
+        self._fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.keys: Dict[str, Dict[str, Any]] = {}
+        self.last_fetch_attempt = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> None:
+        """
+        Refetch the key set, keeping the previous keys if the fetch fails.
+        """
+        async with self._lock:
+            self.last_fetch_attempt = time.monotonic()
+            try:
+                jwks = await self._fetch()
+            except Exception as e:
+                logger.warning(f"Could not refresh JWKS: {e}")
+                return
+            self.keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+
+    async def get_key(self, kid: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the signing key for a kid, refetching once if it is unknown.
+        """
+        key = self.keys.get(kid)
+        if key is not None:
+            return key
+
+        if time.monotonic() - self.last_fetch_attempt < self.min_refetch_interval:
+            return None
+
+        # Another request may already be refetching
+        if self._lock.locked():
+            async with self._lock:
+                pass
+        else:
+            await self.refresh()
+        return self.keys.get(kid)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        """
+        Load the key set and start the background refresh task.
+        """
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+jwks_cache = JWKSCache(fetch_clerk_jwks, JWKS_REFRESH_INTERVAL, JWKS_MIN_REFETCH_INTERVAL)
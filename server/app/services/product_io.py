@@ -0,0 +1,174 @@
+import csv
+import io
+import os
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import product as product_crud
+from app.schemas.product import ProductCreate
+from app.utils.responses import dumps
+
+# Rows validated and written per transaction
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", "1000"))
+# Failed rows reported in the import result (all of them are counted)
+PRODUCT_IMPORT_MAX_ERRORS = int(os.getenv("PRODUCT_IMPORT_MAX_ERRORS", "1000"))
+PRODUCT_EXPORT_BATCH_SIZE = int(os.getenv("PRODUCT_EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_FIELDS = ["id", *ProductCreate.model_fields]
+
+
+class ProductFileFormat(str, Enum):
+    """Formats accepted by product import and produced by export."""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self == ProductFileFormat.NDJSON else "text/csv"
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Split a byte stream into (line number, line) pairs without buffering
+    more than one chunk.
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.decode("utf-8-sig" if line_number == 1 else "utf-8")
+    if buffer:
+        yield line_number + 1, buffer.decode("utf-8-sig" if line_number == 0 else "utf-8")
+
+
+async def _iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    async for line_number, line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, orjson.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+
+async def _iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    header = None
+    record, record_line = "", 0
+    async for line_number, line in _iter_lines(chunks):
+        if not record:
+            record_line = line_number
+        record += line + "\n"
+        # A quoted field may span lines; the record ends once quotes balance
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        # Empty cells are missing values, not empty strings
+        yield record_line, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield record_line, ValueError("Unterminated quoted field")
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+async def import_products(
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    file_format: ProductFileFormat
+) -> Dict[str, Any]:
+    """
+    Stream products from NDJSON or CSV into the catalog, upserting by slug.
+    Rows are validated with ProductCreate and written in batches of
+    PRODUCT_IMPORT_BATCH_SIZE, each batch in its own transaction, so memory
+    stays flat however large the upload is and a failed row only costs its
+    own line. Errors are reported by line number.
+    """
+    rows = _iter_ndjson(chunks) if file_format == ProductFileFormat.NDJSON else _iter_csv(chunks)
+    result = {"processed": 0, "written": 0, "failed": 0, "errors": []}
+
+    def add_error(line_number: int, message: str) -> None:
+        result["failed"] += 1
+        if len(result["errors"]) < PRODUCT_IMPORT_MAX_ERRORS:
+            result["errors"].append({"line": line_number, "error": message})
+
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    async def flush() -> None:
+        written, errors = await product_crud.upsert_products(session, [product_data for _, product_data in batch])
+        result["written"] += written
+        for index, message in sorted(errors.items()):
+            add_error(batch[index][0], message)
+        batch.clear()
+
+    async for line_number, row in rows:
+        result["processed"] += 1
+        if isinstance(row, Exception):
+            add_error(line_number, str(row))
+            continue
+        if not isinstance(row, dict):
+            add_error(line_number, "Expected an object")
+            continue
+        try:
+            product_in = ProductCreate.model_validate(row)
+        except ValidationError as e:
+            add_error(line_number, _validation_message(e))
+            continue
+
+        batch.append((line_number, product_in.model_dump()))
+        if len(batch) >= PRODUCT_IMPORT_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+    # Database errors are only known per batch, after the validation errors
+    result["errors"].sort(key=lambda error: error["line"])
+    result["unchanged"] = result["processed"] - result["written"] - result["failed"]
+    return result
+
+
+def _ndjson_batch(rows: List[Dict[str, Any]]) -> bytes:
+    return b"".join(dumps(row, newline=True) for row in rows)
+
+
+def _csv_batch(rows: List[Dict[str, Any]]) -> bytes:
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+    writer.writerows(rows)
+    return output.getvalue().encode()
+
+
+async def export_products(
+    session_factory: Callable[[], AsyncSession],
+    file_format: ProductFileFormat
+) -> AsyncIterator[bytes]:
+    """
+    Stream all products as NDJSON or CSV in the import format, one chunk
+    per PRODUCT_EXPORT_BATCH_SIZE rows. The export opens its own session
+    because the response body is sent after request dependencies close.
+    """
+    encode = _ndjson_batch if file_format == ProductFileFormat.NDJSON else _csv_batch
+    if file_format == ProductFileFormat.CSV:
+        yield (",".join(EXPORT_FIELDS) + "\n").encode()
+
+    async with session_factory() as session:
+        async for rows in product_crud.iter_product_rows(session, PRODUCT_EXPORT_BATCH_SIZE):
+            yield encode(rows)
@@ -0,0 +1,57 @@
+import re
+from typing import List, Tuple
+
+from sqlalchemy import case, false, func, literal, and_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.product import Product, PRODUCT_SEARCH_CONFIG, product_search_vector
+
+# Limit the number of terms so a pasted paragraph can't build a huge query
+MAX_SEARCH_TERMS = 8
+
+
+def tokenize_search(search: str) -> List[str]:
+    """
+    Split a free-text search string into lowercase word tokens.
+    """
+    return re.findall(r"\w+", search.lower())[:MAX_SEARCH_TERMS]
+
+
+def build_prefix_tsquery(tokens: List[str]) -> str:
+    """
+    Build a to_tsquery() string where every token is prefix-matched,
+    e.g. ["sony", "alp"] -> "sony:* & alp:*" for type-ahead search.
+    """
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def product_search_clause(
+    dialect_name: str,
+    search: str
+) -> Tuple[ColumnElement, ColumnElement]:
+    """
+    Build the (filter, rank) expressions for a product search.
+    PostgreSQL matches the stored search_vector through its GIN index and
+    ranks with ts_rank; other databases (the SQLite dev database) fall back
+    to LIKE token matching on the same column. A search string without any
+    searchable terms (e.g. only punctuation) matches nothing.
+    """
+    tokens = tokenize_search(search)
+    if not tokens:
+        return false(), literal(0)
+
+    if dialect_name == "postgresql":
+        tsquery = func.to_tsquery(PRODUCT_SEARCH_CONFIG, build_prefix_tsquery(tokens))
+        return product_search_vector.op("@@")(tsquery), func.ts_rank(product_search_vector, tsquery)
+
+    # Every token must appear in the name or description
+    search_filter = and_(*[product_search_vector.contains(token, autoescape=True) for token in tokens])
+
+    # Rank name prefix matches first, then name matches, then description matches
+    phrase = " ".join(tokens)
+    rank = case(
+        (Product.name.ilike(f"{phrase}%"), literal(2)),
+        (Product.name.ilike(f"%{phrase}%"), literal(1)),
+        else_=literal(0)
+    )
+    return search_filter, rank
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.cache import CACHE_BACKEND, CACHE_KEY_PREFIX, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+# Backend for available-stock counters: "memory" (per-process) or "redis" (shared across workers)
+STOCK_STORE_BACKEND = os.getenv("STOCK_STORE_BACKEND", CACHE_BACKEND).lower()
+# How long a cart's stock stays held before the sweeper releases it
+STOCK_HOLD_TTL = int(os.getenv("STOCK_HOLD_TTL", "600"))
+# How often expired holds are released, and how many per statement
+STOCK_SWEEP_INTERVAL = float(os.getenv("STOCK_SWEEP_INTERVAL", "5"))
+STOCK_SWEEP_BATCH_SIZE = int(os.getenv("STOCK_SWEEP_BATCH_SIZE", "1000"))
+
+# product_id -> quantity
+StockCounts = Dict[str, int]
+
+
+class MemoryStockStore:
+    """
+    In-process available-stock counters. Every operation completes without
+    awaiting, so each one is atomic with respect to other requests on the
+    event loop.
+    """
+
+    def __init__(self):
+        self._available: StockCounts = {}
+        self._holders: Dict[str, float] = {}
+
+    async def missing(self, product_ids: List[str]) -> List[str]:
+        return [product_id for product_id in product_ids if product_id not in self._available]
+
+    async def load(self, counts: StockCounts) -> None:
+        # A counter that already exists has seen holds the caller's read didn't
+        for product_id, available in counts.items():
+            self._available.setdefault(product_id, available)
+
+    async def take(self, counts: StockCounts) -> List[str]:
+        short = [
+            product_id for product_id, quantity in counts.items()
+            if self._available.get(product_id, 0) < quantity
+        ]
+        if short:
+            return short
+        for product_id, quantity in counts.items():
+            self._available[product_id] -= quantity
+        return []
+
+    async def give(self, counts: StockCounts) -> None:
+        for product_id, quantity in counts.items():
+            if product_id in self._available:
+                self._available[product_id] += quantity
+
+    async def forget(self, product_ids: List[str]) -> None:
+        for product_id in product_ids:
+            self._available.pop(product_id, None)
+
+    async def mark_holder(self, owner_key: str, ttl: float) -> None:
+        now = time.monotonic()
+        self._holders.pop(owner_key, None)
+        self._holders[owner_key] = now + ttl
+        # Entries are roughly in expiry order; drop the expired ones at the front
+        for key, expires in list(self._holders.items()):
+            if expires > now:
+                break
+            del self._holders[key]
+
+    async def is_holder(self, owner_key: str) -> bool:
+        return self._holders.get(owner_key, 0) > time.monotonic()
+
+
+class RedisStockStore:
+    """
+    Redis available-stock counters shared by all workers, one integer per
+    product. Taking stock for several products checks and decrements them
+    all in one Lua script, so it is all-or-nothing and never blocks on a
+    database row.
+    """
+
+    _TAKE_SCRIPT = """
+    local short = {}
+    for i = 1, #KEYS do
+        if tonumber(redis.call('GET', KEYS[i]) or '0') < tonumber(ARGV[i]) then
+            table.insert(short, i)
+        end
+    end
+    if #short > 0 then
+        return short
+    end
+    for i = 1, #KEYS do
+        redis.call('DECRBY', KEYS[i], ARGV[i])
+    end
+    return short
+    """
+
+    _GIVE_SCRIPT = """
+    for i = 1, #KEYS do
+        if redis.call('EXISTS', KEYS[i]) == 1 then
+            redis.call('INCRBY', KEYS[i], ARGV[i])
+        end
+    end
+    return 1
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self._prefix = f"{CACHE_KEY_PREFIX}:stock:"
+        self._take = self._client.register_script(self._TAKE_SCRIPT)
+        self._give = self._client.register_script(self._GIVE_SCRIPT)
+
+    def _key(self, product_id: str) -> str:
+        return self._prefix + product_id
+
+    async def missing(self, product_ids: List[str]) -> List[str]:
+        if not product_ids:
+            return []
+        values = await self._client.mget([self._key(product_id) for product_id in product_ids])
+        return [product_id for product_id, value in zip(product_ids, values) if value is None]
+
+    async def load(self, counts: StockCounts) -> None:
+        # SET NX so a counter another worker already loaded (and took from) wins
+        async with self._client.pipeline(transaction=False) as pipe:
+            for product_id, available in counts.items():
+                pipe.set(self._key(product_id), available, nx=True)
+            await pipe.execute()
+
+    async def take(self, counts: StockCounts) -> List[str]:
+        product_ids = list(counts)
+        short = await self._take(
+            keys=[self._key(product_id) for product_id in product_ids],
+            args=[counts[product_id] for product_id in product_ids]
+        )
+        return [product_ids[int(index) - 1] for index in short]
+
+    async def give(self, counts: StockCounts) -> None:
+        if counts:
+            product_ids = list(counts)
+            await self._give(
+                keys=[self._key(product_id) for product_id in product_ids],
+                args=[counts[product_id] for product_id in product_ids]
+            )
+
+    async def forget(self, product_ids: List[str]) -> None:
+        if product_ids:
+            await self._client.delete(*[self._key(product_id) for product_id in product_ids])
+
+    async def mark_holder(self, owner_key: str, ttl: float) -> None:
+        await self._client.set(f"{self._prefix}holder:{owner_key}", 1, px=max(int(ttl * 1000), 1))
+
+    async def is_holder(self, owner_key: str) -> bool:
+        return bool(await self._client.exists(f"{self._prefix}holder:{owner_key}"))
+
+
+class HoldSweeper:
+    """
+    Background release of expired stock holds.
+    sweep releases up to batch_size expired holds per call and returns how
+    many it released; it is called again until a batch comes back short.
+    """
+
+    def __init__(self, sweep: Callable[[int], Awaitable[int]], interval: float, batch_size: int):
+        self.sweep = sweep
+        self.interval = interval
+        self.batch_size = batch_size
+        self.released = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """
+        Release every hold that has expired. Returns the number released.
+        """
+        released = 0
+        while True:
+            count = await self.sweep(self.batch_size)
+            released += count
+            if count < self.batch_size:
+                break
+        self.released += released
+        return released
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Stock hold sweep failed: {e}")
+
+    async def start(self) -> None:
+        """
+        Start the background sweep task.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        """
+        Stop the background sweep task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"released": self.released, "failures": self.failures}
+
+
+def _create_stock_store() -> Any:
+    if STOCK_STORE_BACKEND == "redis":
+        return RedisStockStore(REDIS_URL)
+    return MemoryStockStore()
+
+
+stock_store = _create_stock_store()
@@ -0,0 +1,18 @@
+from typing import Dict
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+
+
+def integrity_error(error: IntegrityError, messages: Dict[str, str], default: str) -> HTTPException:
+    """
+    Turn a constraint violation into a 400 error.
+    messages maps a column or constraint name to the detail to report when
+    it appears in the database error, so uniqueness checks can be left to
+    the database instead of a select before every write.
+    """
+    text = str(error.orig)
+    for name, detail in messages.items():
+        if name in text:
+            return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=default)
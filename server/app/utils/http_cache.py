@@ -0,0 +1,106 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+# Anonymous catalog responses may be stored by browsers, CDNs and reverse proxies
+CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", "60"))
+CATALOG_STALE_WHILE_REVALIDATE = int(os.getenv("CATALOG_STALE_WHILE_REVALIDATE", "300"))
+CATALOG_CACHE_CONTROL = (
+    f"public, max-age={CATALOG_CACHE_MAX_AGE}, "
+    f"stale-while-revalidate={CATALOG_STALE_WHILE_REVALIDATE}"
+)
+# Bodies read from a lagging replica must not be stored under the catalog version
+REPLICA_CACHE_CONTROL = "private, no-store"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from the values that identify a representation.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # Timestamps are stored as naive UTC
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check whether the request's If-None-Match header matches the ETag.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def set_cache_headers(
+    response: Response,
+    etag: Optional[str],
+    last_modified: Optional[datetime] = None,
+    cache_control: str = CATALOG_CACHE_CONTROL
+) -> None:
+    """
+    Attach validator and caching headers to a response.
+    """
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers["Cache-Control"] = cache_control
+
+
+def set_catalog_cache_headers(response: Response, etag: Optional[str], from_replica: bool) -> None:
+    """
+    Attach the catalog ETag and caching headers to a listing response.
+    A replica may not have the writes behind the current catalog version
+    yet, so its bodies get no ETag and are not cached.
+    """
+    if from_replica:
+        set_cache_headers(response, None, cache_control=REPLICA_CACHE_CONTROL)
+    else:
+        set_cache_headers(response, etag)
+
+
+def not_modified_since(request: Request, last_modified: Optional[datetime]) -> bool:
+    """
+    Check If-Modified-Since; only used when the client sent no If-None-Match.
+    """
+    header = request.headers.get("if-modified-since")
+    if not header or not last_modified or request.headers.get("if-none-match"):
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have one-second resolution
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def not_modified_response(
+    request: Request,
+    etag: Optional[str],
+    last_modified: Optional[datetime] = None,
+    cache_control: str = CATALOG_CACHE_CONTROL
+) -> Optional[Response]:
+    """
+    Return a 304 response if the client's copy is still current, else None.
+    """
+    is_current = (etag and etag_matches(request, etag)) or not_modified_since(request, last_modified)
+    if not is_current:
+        return None
+
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, last_modified, cache_control)
+    return response
@@ -0,0 +1,73 @@
+import inspect
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# Default to debug output in development, info in production
+LOG_LEVEL = os.getenv(
+    "LOG_LEVEL",
+    "DEBUG" if os.getenv("DEBUG", "False").lower() == "true" else "INFO"
+).upper()
+# Emit one JSON object per line for log shippers
+LOG_JSON = os.getenv("LOG_JSON", "False").lower() == "true"
+
+# Stdlib loggers that would otherwise bypass loguru
+_INTERCEPTED_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi", "sqlalchemy")
+# With echo enabled SQLAlchemy gives the engine logger its own stdout
+# handler unless it already has one, so echoed SQL would be printed there
+# and again through the intercept handler
+_ECHO_LOGGERS = ("sqlalchemy.engine.Engine",)
+
+
+class InterceptHandler(logging.Handler):
+    """
+    Forward stdlib logging records (uvicorn, sqlalchemy, app modules) to loguru.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        # Report the caller of the stdlib logger, not this handler
+        frame, depth = inspect.currentframe(), 0
+        while frame is not None and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+def setup_logging() -> None:
+    """
+    Route all application logging through a single loguru sink.
+    Records below LOG_LEVEL are dropped before any formatting happens, and
+    the sink writes from a background thread (enqueue=True) so the event
+    loop never blocks on stderr.
+    """
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level=LOG_LEVEL,
+        serialize=LOG_JSON,
+        enqueue=True,
+        backtrace=False,
+        diagnose=False,
+    )
+
+    # Gate stdlib loggers at the same level so disabled calls return immediately
+    logging.basicConfig(handlers=[InterceptHandler()], level=LOG_LEVEL, force=True)
+    for name in _INTERCEPTED_LOGGERS:
+        std_logger = logging.getLogger(name)
+        std_logger.handlers = []
+        std_logger.propagate = True
+    for name in _ECHO_LOGGERS:
+        std_logger = logging.getLogger(name)
+        std_logger.handlers = [logging.NullHandler()]
+        std_logger.propagate = True
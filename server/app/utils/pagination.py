@@ -0,0 +1,44 @@
+import base64
+import json
+from enum import Enum
+from typing import Any, List
+
+from fastapi import HTTPException, status
+
+
+class PaginationMode(str, Enum):
+    """
+    How list endpoints page through results.
+    offset: skip/limit pages with a page number.
+    keyset: cursor/limit pages that cost the same however deep they are.
+    """
+    OFFSET = "offset"
+    KEYSET = "keyset"
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor.
+    """
+    raw = json.dumps([str(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    """
+    Decode a cursor produced by encode_cursor back into its raw string values.
+    Raises a 400 error if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+    return values
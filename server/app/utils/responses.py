@@ -0,0 +1,36 @@
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def json_default(value: Any) -> Any:
+    """
+    Serialize the types orjson doesn't handle natively the way Pydantic's
+    JSON mode does (Decimal as a string, so prices keep their precision).
+    UUID subclasses such as asyncpg's aren't handled natively either.
+    """
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any, newline: bool = False) -> bytes:
+    """
+    Serialize content to JSON bytes with orjson.
+    """
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_APPEND_NEWLINE if newline else 0)
+    return orjson.dumps(content, default=json_default, option=option)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, used as the app's default response
+    class. Response models are still validated and converted to JSON
+    types by FastAPI; only the final encoding step changes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,63 @@
+"""
+Per-request cost of verify_jwt_token for an RS256 token: a full decode
+and signature check on every call, against the verified-token cache.
+
+    python -m benchmarks.bench_auth
+"""
+import argparse
+import time
+
+from benchmarks.common import measure, print_table, run, summarize
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwk, jwt
+
+from app.middleware.authentication import token_cache, verify_jwt_token
+from app.services.jwks import jwks_cache
+
+
+def _install_key_set() -> bytes:
+    """
+    Put a freshly generated signing key in the JWKS cache and return its
+    private key.
+    """
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    jwks_cache.keys = {"bench": {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": "bench"}}
+    return pem
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    pem = _install_key_set()
+    token = jwt.encode(
+        {"sub": "user_bench", "email": "bench@example.com", "exp": int(time.time()) + 3600},
+        pem, algorithm="RS256", headers={"kid": "bench"}
+    )
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def uncached():
+        await token_cache.clear()
+        await verify_jwt_token(credentials)
+
+    async def cached():
+        await verify_jwt_token(credentials)
+
+    rows = []
+    for label, call in (("decode every request", uncached), ("verified-token cache", cached)):
+        latency = summarize(await measure(call, args.repeat, warmup=10))
+        rows.append([label, latency["p50"] * 1000, latency["p95"] * 1000, latency["p99"] * 1000])
+
+    print(f"verify_jwt_token, {args.repeat} calls, latency in microseconds")
+    print_table(["mode", "p50", "p95", "p99"], rows)
+    print(f"cache stats: {token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    run(main)
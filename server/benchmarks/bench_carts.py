@@ -0,0 +1,88 @@
+"""
+Add-to-cart throughput in ops/sec: the cart store with write-behind
+persistence against writing every add straight to cart_items with the
+ORM (read the line, update or insert it, commit). Adds run in concurrent
+waves spread over --carts anonymous carts; the time to flush the store's
+changes to the database afterwards is reported separately.
+
+    python -m benchmarks.bench_carts --ops 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+from uuid import UUID
+
+from benchmarks.common import create_categories, print_table, reset_schema, run, seed_products
+from sqlmodel import select
+
+from app.crud import cart as cart_crud
+from app.database import async_session_factory
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+from app.services.cart_store import session_cart_key
+
+
+def session_id(number: int) -> str:
+    return f"bench-session-{number:08d}"
+
+
+async def ops_per_second(add: Callable[[int], Awaitable[None]], ops: int, concurrency: int) -> float:
+    started = time.perf_counter()
+    for start in range(0, ops, concurrency):
+        await asyncio.gather(*[add(number) for number in range(start, min(start + concurrency, ops))])
+    return ops / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--carts", type=int, default=500)
+    parser.add_argument("--products", type=int, default=50)
+    args = parser.parse_args()
+
+    await reset_schema()
+    await seed_products(args.products, await create_categories())
+    async with async_session_factory() as session:
+        product_ids: List[UUID] = list(await session.scalars(select(Product.id).where(Product.is_active)))
+        carts = [Cart(session_id=session_id(number)) for number in range(args.carts)]
+        session.add_all(carts)
+        await session.commit()
+        cart_ids: Dict[int, UUID] = {number: cart.id for number, cart in enumerate(carts)}
+
+    def pick(number: int):
+        return number % args.carts, product_ids[number * 7 % len(product_ids)]
+
+    async def store_add(number: int) -> None:
+        cart, product_id = pick(number)
+        async with async_session_factory() as session:
+            await cart_crud.add_cart_item(session, session_cart_key(session_id(cart)), product_id, 1)
+
+    async def orm_add(number: int) -> None:
+        cart, product_id = pick(number)
+        async with async_session_factory() as session:
+            item = (await session.scalars(
+                select(CartItem).where(CartItem.cart_id == cart_ids[cart], CartItem.product_id == product_id)
+            )).first()
+            if item:
+                item.quantity += 1
+            else:
+                session.add(CartItem(cart_id=cart_ids[cart], product_id=product_id, quantity=1))
+            await session.commit()
+
+    rows = []
+    for label, add in (("cart store", store_add), ("direct ORM", orm_add)):
+        rows.append([label, round(await ops_per_second(add, args.ops, args.concurrency))])
+
+    started = time.perf_counter()
+    flushed = await cart_crud.cart_flusher.flush()
+    flush_seconds = time.perf_counter() - started
+
+    print(f"{args.ops} adds over {args.carts} carts, {args.concurrency} at a time")
+    print_table(["writes", "ops/sec"], rows)
+    print(f"write-behind flush: {flushed} carts in {flush_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run(main)
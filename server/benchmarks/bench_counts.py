@@ -0,0 +1,47 @@
+"""
+GET /api/products latency with an exact total for each count strategy:
+count then page (sequential), count on a second connection while the page
+runs (concurrent), and one query with count(*) OVER () (window).
+
+    python -m benchmarks.bench_counts --products 200000
+"""
+import argparse
+
+from benchmarks.common import client, create_categories, measure, print_table, reset_schema, run, seed_products, summarize
+
+import main as api
+
+STRATEGIES = ["sequential", "concurrent", "window"]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    await reset_schema()
+    category_ids = await create_categories()
+    await seed_products(args.products, category_ids)
+
+    listings = {
+        "category": {"category_id": str(category_ids[0])},
+        "category + price": {"category_id": str(category_ids[0]), "price_min": 100, "price_max": 500},
+        "search": {"search": "wireless"},
+    }
+
+    rows = []
+    async with client(api.app) as http:
+        for label, filters in listings.items():
+            for strategy in STRATEGIES:
+                params = {**filters, "limit": args.limit, "total_mode": "exact", "count_strategy": strategy}
+                latency = summarize(await measure(lambda: http.get("/api/products/", params=params), args.repeat))
+                rows.append([label, strategy, latency["p50"], latency["p99"]])
+
+    print(f"{args.products} products, {args.limit} per page, latency in ms")
+    print_table(["filters", "strategy", "p50", "p99"], rows)
+
+
+if __name__ == "__main__":
+    run(main)
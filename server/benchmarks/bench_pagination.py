@@ -0,0 +1,71 @@
+"""
+GET /api/products latency at page 1, 100 and 10,000: OFFSET pages with
+an exact total against keyset pages, which only count the total on the
+first page.
+
+    python -m benchmarks.bench_pagination --products 200000
+"""
+import argparse
+
+from benchmarks.common import (
+    client, create_categories, measure, print_table, reset_schema, run, seed_products, summarize
+)
+from sqlmodel import select
+
+import main as api
+from app.database import async_session_factory
+from app.models.product import Product
+from app.utils.pagination import encode_cursor
+
+
+async def _cursor_before(position: int) -> str:
+    """
+    The keyset cursor a client holds after reading the first position
+    products of the default (newest first) listing.
+    """
+    async with async_session_factory() as session:
+        row = (await session.execute(
+            select(Product.created_at, Product.id)
+            .where(Product.is_active)
+            .order_by(Product.created_at.desc(), Product.id.desc())
+            .offset(position - 1)
+            .limit(1)
+        )).one()
+    return encode_cursor("newest", row.created_at, row.id)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    await reset_schema()
+    await seed_products(args.products, await create_categories())
+    active = args.products - args.products // 10
+
+    rows = []
+    async with client(api.app) as http:
+        for page in args.pages:
+            position = (page - 1) * args.limit
+            if position >= active:
+                print(f"page {page} is past the {active} active products, skipped")
+                continue
+
+            offset_params = {"skip": position, "limit": args.limit}
+            keyset_params = {"pagination": "keyset", "limit": args.limit}
+            if position:
+                keyset_params = {"cursor": await _cursor_before(position), "limit": args.limit}
+
+            offset = summarize(await measure(lambda: http.get("/api/products/", params=offset_params), args.repeat))
+            keyset = summarize(await measure(lambda: http.get("/api/products/", params=keyset_params), args.repeat))
+            rows.append([page, offset["p50"], offset["p95"], keyset["p50"], keyset["p95"]])
+
+    print(f"{args.products} products, {args.limit} per page, latency in ms")
+    print_table(["page", "offset p50", "offset p95", "keyset p50", "keyset p95"], rows)
+
+
+if __name__ == "__main__":
+    run(main)
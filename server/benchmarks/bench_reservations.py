@@ -0,0 +1,110 @@
+"""
+Throughput of --buyers concurrent reservations of one unit of a single
+product with --stock units: holds through the available-stock counter and
+the stock_reservations ledger, against every buyer taking the product row
+lock (conditional stock UPDATE plus a ledger row in one transaction).
+
+    python -m benchmarks.bench_reservations --buyers 1000 --stock 100
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List
+
+from benchmarks.common import create_categories, percentile, print_table, reset_schema, run, seed_products, summarize
+from fastapi import HTTPException
+from sqlmodel import func, select
+
+from app.crud import product as product_crud
+from app.crud import reservation as reservation_crud
+from app.database import async_session_factory
+from app.models.product import Product
+from app.models.reservation import ReservationStatus, StockReservation
+from app.services.stock_store import STOCK_HOLD_TTL
+
+
+async def reset(product_id: uuid.UUID, stock: int) -> None:
+    async with async_session_factory() as session:
+        await session.execute(StockReservation.__table__.delete())
+        product = await session.get(Product, product_id)
+        product.stock_quantity = stock
+        await session.commit()
+    await reservation_crud.forget_available_stock([product_id])
+
+
+async def reserve_all(reserve: Callable[..., Awaitable[None]], buyers: int) -> List[float]:
+    """
+    Run every buyer's reservation at once, each in its own session.
+    Returns the latencies in milliseconds, negative for rejected buyers.
+    """
+    async def buyer(number: int) -> float:
+        started = time.perf_counter()
+        async with async_session_factory() as session:
+            try:
+                await reserve(session, f"session:bench-buyer-{number:06d}")
+                won = True
+            except HTTPException:
+                won = False
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed if won else -elapsed
+
+    return await asyncio.gather(*[buyer(number) for number in range(buyers)])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    await reset_schema()
+    await seed_products(1, await create_categories(1), start=1)
+    async with async_session_factory() as session:
+        product_id = await session.scalar(select(Product.id))
+
+    async def hold(session, owner_key: str) -> None:
+        await reservation_crud.hold_stock(session, owner_key, {product_id: 1})
+
+    async def row_lock(session, owner_key: str) -> None:
+        if not await product_crud.reserve_product_stock(session, {product_id: 1}):
+            await session.rollback()
+            raise HTTPException(status_code=409)
+        now = datetime.utcnow()
+        await session.execute(StockReservation.__table__.insert(), [{
+            "id": uuid.uuid4(), "product_id": product_id, "owner_key": owner_key, "quantity": 1,
+            "status": ReservationStatus.HELD, "expires_at": now + timedelta(seconds=STOCK_HOLD_TTL), "created_at": now
+        }])
+        await session.commit()
+
+    rows = []
+    for _ in range(args.rounds):
+        for label, reserve in (("hold (counter + ledger)", hold), ("row lock per buyer", row_lock)):
+            await reset(product_id, args.stock)
+            started = time.perf_counter()
+            samples = await reserve_all(reserve, args.buyers)
+            elapsed = time.perf_counter() - started
+
+            async with async_session_factory() as session:
+                held = await session.scalar(
+                    select(func.coalesce(func.sum(StockReservation.quantity), 0))
+                    .where(StockReservation.status == ReservationStatus.HELD)
+                )
+            won = sum(1 for sample in samples if sample >= 0)
+            if held != won or won > args.stock:
+                raise RuntimeError(f"{label}: {won} buyers won but {held} units are held")
+
+            latency = summarize([abs(sample) for sample in samples])
+            rows.append([
+                label, round(args.buyers / elapsed), won, args.buyers - won,
+                latency["p50"], percentile([abs(sample) for sample in samples], 0.99)
+            ])
+
+    print(f"{args.buyers} concurrent buyers, one product with {args.stock} units, latency in ms")
+    print_table(["reservation", "req/sec", "won", "rejected", "p50", "p99"], rows)
+
+
+if __name__ == "__main__":
+    run(main)
@@ -0,0 +1,49 @@
+"""
+GET /api/products?search= latency as the catalog grows from 10k to 1M
+products, for a selective term, a common term and a multi-term prefix
+(type-ahead) query. On PostgreSQL these are served by the GIN index on
+the generated search_vector column.
+
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+import argparse
+
+from benchmarks.common import client, create_categories, measure, print_table, reset_schema, run, seed_products, summarize
+
+import main as api
+
+QUERIES = {
+    "selective": "4242",
+    "common": "apple",
+    "prefix": "app pho wire",
+}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    await reset_schema()
+    category_ids = await create_categories()
+
+    rows = []
+    seeded = 0
+    async with client(api.app) as http:
+        for size in sorted(args.sizes):
+            await seed_products(size - seeded, category_ids, start=seeded)
+            seeded = size
+            for label, search in QUERIES.items():
+                params = {"search": search, "limit": args.limit}
+                total = (await http.get("/api/products/", params=params)).json()["total"]
+                latency = summarize(await measure(lambda: http.get("/api/products/", params=params), args.repeat))
+                rows.append([size, label, total, latency["p50"], latency["p95"]])
+
+    print(f"{args.limit} results per page, latency in ms")
+    print_table(["products", "query", "matches", "p50", "p95"], rows)
+
+
+if __name__ == "__main__":
+    run(main)
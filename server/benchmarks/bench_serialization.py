@@ -0,0 +1,137 @@
+"""
+JSON encoding throughput in items/sec and peak RSS: a 100-item product
+page encoded with json.dumps against orjson, and the full product export
+streamed in batches against materializing every row and encoding it in
+one go.
+
+    python -m benchmarks.bench_serialization --products 200000
+
+Each export runs in its own process (--export), since peak RSS only ever
+grows within a process and seeding the products would mask it.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Tuple
+
+from benchmarks.common import client, create_categories, print_table, reset_schema, run, seed_products
+
+import main as api
+from app.crud import product as product_crud
+from app.database import async_session_factory
+from app.schemas.product import ProductList
+from app.services.product_io import PRODUCT_EXPORT_BATCH_SIZE, ProductFileFormat, export_products
+from app.utils.responses import dumps
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    # Startup can peak above the resident size the export starts from
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return peak_rss_mb()
+
+
+async def timed(call: Callable[[], Awaitable[int]]) -> Tuple[float, float]:
+    """
+    Run call once. Returns a tuple of (items per second, peak RSS growth in MB).
+    """
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    items = await call()
+    return items / (time.perf_counter() - started), peak_rss_mb() - rss_before
+
+
+def encode_pages(page: Any, encode: Callable[[Any], bytes], repeat: int) -> float:
+    """
+    Validate and encode a page repeat times, as a response_model route does.
+    Returns the items encoded per second.
+    """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encode(ProductList.model_validate(page).model_dump(mode="json"))
+    return len(page["items"]) * repeat / (time.perf_counter() - started)
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    # What Starlette's JSONResponse does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+async def stream_export() -> int:
+    lines = 0
+    async for chunk in export_products(async_session_factory, ProductFileFormat.NDJSON):
+        lines += chunk.count(b"\n")
+    return lines
+
+
+async def materialize_export() -> int:
+    rows = []
+    async with async_session_factory() as session:
+        async for batch in product_crud.iter_product_rows(session, PRODUCT_EXPORT_BATCH_SIZE):
+            rows.extend(batch)
+    body = json.dumps(rows, default=str).encode()
+    del body
+    return len(rows)
+
+
+EXPORTS = {"streamed NDJSON": stream_export, "materialized json.dumps": materialize_export}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--export", choices=list(EXPORTS), help="only time this export of the seeded products")
+    args = parser.parse_args()
+
+    if args.export:
+        items_per_second, rss = await timed(EXPORTS[args.export])
+        print(json.dumps([args.export, round(items_per_second), rss]))
+        return
+
+    await reset_schema()
+    await seed_products(args.products, await create_categories(), images=args.images)
+
+    async with client(api.app) as http:
+        page = (await http.get("/api/products/", params={"limit": 100, "total_mode": "none"})).json()
+        started = time.perf_counter()
+        for _ in range(args.repeat // 10):
+            await http.get("/api/products/", params={"limit": 100, "total_mode": "none"})
+        endpoint = len(page["items"]) * (args.repeat // 10) / (time.perf_counter() - started)
+
+    print(f"{len(page['items'])}-item page with {args.images} images per product, items/sec")
+    print_table(["encoding", "items/sec"], [
+        ["validate + json.dumps", round(encode_pages(page, stdlib_dumps, args.repeat))],
+        ["validate + orjson", round(encode_pages(page, dumps, args.repeat))],
+        ["GET /api/products/ end to end", round(endpoint)],
+    ])
+
+    # The child processes read the database this one seeded
+    env = {**os.environ, "BENCH_DATABASE_URL": os.environ["DATABASE_URL"]}
+    rows = []
+    for label in EXPORTS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_serialization", "--export", label],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        rows.append(json.loads(output.splitlines()[-1]))
+
+    print()
+    print(f"export of {args.products} products")
+    print_table(["export", "items/sec", "peak RSS growth MB"], rows)
+
+
+if __name__ == "__main__":
+    run(main)
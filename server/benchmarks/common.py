@@ -0,0 +1,177 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run against BENCH_DATABASE_URL (default: a throwaway SQLite
+file) with tables created from the models, and call the app in-process.
+Import this module before anything from app, since the app reads its
+configuration at import time.
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCH_DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='mbm-bench-')}/bench.db"
+)
+os.environ.setdefault("DEBUG", "False")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from sqlmodel import SQLModel
+
+from app.database import async_engine, async_session_factory
+from app.models.category import Category
+from app.models.product import Product, ProductImage
+
+BRANDS = ["sony", "apple", "samsung", "lenovo", "asus", "dell", "canon", "nikon", "bose", "xiaomi"]
+NOUNS = ["phone", "laptop", "camera", "headphones", "tablet", "monitor", "speaker", "watch", "router", "drone"]
+FEATURES = ["bluetooth", "wireless", "waterproof", "oled", "noise cancelling", "fast charging", "4k", "usb-c"]
+
+
+def database_name() -> str:
+    return async_engine.dialect.name
+
+
+async def reset_schema() -> None:
+    """
+    Drop and recreate every table.
+    """
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+
+async def create_categories(count: int = 3) -> List[uuid.UUID]:
+    async with async_session_factory() as session:
+        categories = [Category(name=f"Category {number}", slug=f"category-{number}") for number in range(count)]
+        session.add_all(categories)
+        await session.commit()
+        return [category.id for category in categories]
+
+
+def product_rows(start: int, count: int, category_ids: Sequence[uuid.UUID]) -> List[Dict[str, Any]]:
+    """
+    Build deterministic product rows numbered from start. Every tenth
+    product is inactive and created_at increases with the number.
+    """
+    base = datetime(2024, 1, 1)
+    rows = []
+    for number in range(start, start + count):
+        brand, noun = BRANDS[number % len(BRANDS)], NOUNS[number // len(BRANDS) % len(NOUNS)]
+        rows.append({
+            "id": uuid.uuid4(),
+            "name": f"{brand.title()} {noun} {number}",
+            "slug": f"bench-{number}",
+            "description": f"{FEATURES[number % len(FEATURES)]} {noun} by {brand}, model {number}",
+            "price": Decimal(5 + number % 2000) + Decimal("0.99"),
+            "sale_price": None,
+            "stock_quantity": number % 7,
+            "category_id": category_ids[number % len(category_ids)],
+            "is_active": number % 10 != 0,
+            "created_at": base + timedelta(seconds=number),
+        })
+    return rows
+
+
+async def seed_products(
+    count: int,
+    category_ids: Sequence[uuid.UUID],
+    start: int = 0,
+    images: int = 0,
+    batch_size: int = 10000
+) -> None:
+    """
+    Insert count products (and images per product) in batches, with COPY
+    on PostgreSQL.
+    """
+    for offset in range(start, start + count, batch_size):
+        rows = product_rows(offset, min(batch_size, start + count - offset), category_ids)
+        image_rows = [
+            {
+                "id": uuid.uuid4(), "product_id": row["id"], "image_url": f"https://img.example.com/{row['slug']}/{index}.jpg",
+                "alt_text": None, "is_primary": index == 0, "display_order": index
+            }
+            for row in rows for index in range(images)
+        ]
+        async with async_session_factory() as session:
+            if database_name() == "postgresql":
+                connection = await (await session.connection()).get_raw_connection()
+                await _copy(connection.driver_connection, "products", rows)
+                await _copy(connection.driver_connection, "product_images", image_rows)
+            else:
+                await session.execute(Product.__table__.insert(), rows)
+                if image_rows:
+                    await session.execute(ProductImage.__table__.insert(), image_rows)
+            await session.commit()
+    await analyze()
+
+
+async def _copy(connection: Any, table: str, rows: List[Dict[str, Any]]) -> None:
+    if rows:
+        columns = list(rows[0])
+        await connection.copy_records_to_table(
+            table, records=[tuple(row[column] for column in columns) for row in rows], columns=columns
+        )
+
+
+async def analyze() -> None:
+    """
+    Refresh planner statistics after bulk loading.
+    """
+    async with async_engine.connect() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+        await conn.commit()
+
+
+def client(app: Any) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def measure(call: Callable[[], Awaitable[Any]], repeat: int, warmup: int = 2) -> List[float]:
+    """
+    Time repeat sequential calls, after warmup untimed ones.
+    Returns the latencies in milliseconds.
+    """
+    for _ in range(warmup):
+        await call()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50": statistics.median(samples),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+    }
+
+
+def print_table(headers: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+    cells = [[str(header) for header in headers]] + [
+        [f"{value:.2f}" if isinstance(value, float) else str(value) for value in row] for row in rows
+    ]
+    widths = [max(len(row[index]) for row in cells) for index in range(len(headers))]
+    for number, row in enumerate(cells):
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+        if number == 0:
+            print("  ".join("-" * width for width in widths))
+
+
+def run(main: Callable[[], Awaitable[None]]) -> None:
+    print(f"database: {database_name()}")
+    asyncio.run(main())
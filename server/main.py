@@ -2,23 +2,29 @@ import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
-import logging
+from loguru import logger
 
 # Import middleware
-from app.middleware import setup_cors_middleware, setup_error_handlers
+from app.middleware import setup_cors_middleware, setup_error_handlers, setup_read_your_writes_middleware
 
 # Import routes
-from app.routes import users, products, categories, carts, wishlists, orders, reviews
+from app.routes import users, products, categories, carts, wishlists, orders, reviews, metrics
 
 # Import database
 from app.database import create_db_and_tables
 
+# Import services
+from app.crud.cart import cart_flusher
+from app.crud.reservation import hold_sweeper
+from app.services.jwks import jwks_cache, close_http_client
+from app.utils.logger import setup_logging
+from app.utils.responses import ORJSONResponse
+
 # Load environment variables
 load_dotenv()
 
 # Cấu hình logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+setup_logging()
 
 # Flag để đảm bảo chỉ tạo DB một lần
 _is_db_initialized = False
@@ -37,12 +43,27 @@ async def lifespan(app: FastAPI):
             _is_db_initialized = True
             logger.info("Database tables initialized successfully")
         except Exception as e:
-            logger.error(f"Error initializing database: {e}")
+            logger.error("Error initializing database: {}", e)
+    
+    # Load Clerk signing keys so token verification never waits on the network
+    if os.getenv("DEBUG", "False").lower() != "true":
+        await jwks_cache.start()
+    
+    # Persist cart changes from the cart store in the background
+    await cart_flusher.start()
+    # Release expired stock holds in the background
+    await hold_sweeper.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down API...")
+    await hold_sweeper.stop()
+    await cart_flusher.stop()
+    await jwks_cache.stop()
+    await close_http_client()
+    # Flush queued log records before the process exits
+    await logger.complete()
 
 
 # Create FastAPI app
@@ -50,12 +71,14 @@ app = FastAPI(
     title="Modern Black Market API",
     description="API for Modern Black Market e-commerce platform",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Set up middleware
 setup_cors_middleware(app)
 setup_error_handlers(app)
+setup_read_your_writes_middleware(app)
 
 # Include routers
 app.include_router(users, prefix="/api/users", tags=["Users"])
@@ -65,6 +88,7 @@ app.include_router(carts, prefix="/api/carts", tags=["Carts"])
 app.include_router(wishlists, prefix="/api/wishlists", tags=["Wishlists"])
 app.include_router(orders, prefix="/api/orders", tags=["Orders"])
 app.include_router(reviews, prefix="/api/reviews", tags=["Reviews"])
+app.include_router(metrics, prefix="/api/metrics", tags=["Metrics"])
 
 # Root endpoint
 @app.get("/", tags=["Root"])
@@ -0,0 +1,205 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from typing import Any, Dict, List
+
+# The app reads its configuration at import time. Tests run against a
+# throwaway SQLite database with the in-process backends unless
+# TEST_DATABASE_URL points them at another database (e.g. PostgreSQL for
+# the EXPLAIN tests).
+_DB_DIR = tempfile.mkdtemp(prefix="mbm-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite+aiosqlite:///{_DB_DIR}/test.db")
+os.environ["DEBUG"] = "False"
+os.environ["CACHE_BACKEND"] = "memory"
+# The log sink writes from a background thread, after pytest may have
+# closed the captured stderr of the test that logged
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+
+import httpx
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import SQLModel
+
+import main
+from app.crud import cart as cart_crud
+from app.database import async_engine, async_session_factory
+from app.middleware.authentication import get_current_user, get_optional_current_user, verify_jwt_token
+from app.models.address import Address
+from app.models.category import Category
+from app.models.product import Product, ProductImage
+from app.models.user import User
+from app.services.cache import _caches
+from app.services.cart_store import MemoryCartStore
+from app.services.counts import Explain
+
+TEST_USER_EMAIL = "buyer@example.com"
+
+
+class QueryRecorder:
+    """
+    Records the SQL statements sent to the primary engine.
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+
+def pytest_runtest_setup(item):
+    if item.get_closest_marker("postgresql") and async_engine.dialect.name != "postgresql":
+        pytest.skip("needs TEST_DATABASE_URL to point at PostgreSQL")
+
+
+@pytest.fixture
+async def database():
+    """
+    Fresh tables and empty caches for every test.
+    """
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    for cache in _caches.values():
+        await cache.clear()
+    yield
+    main.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+async def session(database):
+    async with async_session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def claims() -> Dict[str, Any]:
+    """
+    Token claims returned for authenticated requests.
+    """
+    return {"sub": "user_test", "email": TEST_USER_EMAIL}
+
+
+@pytest.fixture
+async def client(database, claims):
+    main.app.dependency_overrides[verify_jwt_token] = lambda: claims
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app),
+        base_url="http://test",
+        headers={"Authorization": "Bearer test"}
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+async def user(session) -> User:
+    user = User(email=TEST_USER_EMAIL, first_name="Test", last_name="Buyer")
+    session.add(user)
+    await session.commit()
+    return user
+
+
+@pytest.fixture
+async def address(session, user) -> Address:
+    address = Address(
+        user_id=user.id, address_line1="1 Main St", city="Springfield", state="IL", postal_code="62701", country="US"
+    )
+    session.add(address)
+    await session.commit()
+    return address
+
+
+@pytest.fixture
+def cart_store(monkeypatch, user) -> MemoryCartStore:
+    """
+    An empty cart store for the test. Cart routes resolve the caller to
+    the test user until signed_out() is called.
+    """
+    store = MemoryCartStore(max_entries=1000, ttl=3600)
+    monkeypatch.setattr(cart_crud, "cart_store", store)
+    monkeypatch.setattr(cart_crud.cart_flusher, "store", store)
+    main.app.dependency_overrides[get_optional_current_user] = get_current_user
+    return store
+
+
+@pytest.fixture
+def signed_out():
+    """
+    Make the cart routes treat requests as anonymous.
+    """
+    def signed_out() -> None:
+        main.app.dependency_overrides[get_optional_current_user] = lambda: None
+
+    return signed_out
+
+
+@pytest.fixture
+def queries():
+    recorder = QueryRecorder()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", recorder)
+    yield recorder
+    event.remove(async_engine.sync_engine, "before_cursor_execute", recorder)
+
+
+@pytest.fixture
+async def category(session) -> Category:
+    category = Category(name="Phones", slug="phones")
+    session.add(category)
+    await session.commit()
+    return category
+
+
+@pytest.fixture
+def make_product(session, category):
+    """
+    Create a product (with a primary image unless images=0) and return it.
+    """
+    counter = iter(range(1_000_000))
+
+    async def make_product(images: int = 1, **fields: Any) -> Product:
+        number = next(counter)
+        values = {
+            "name": f"Product {number}",
+            "slug": f"product-{number}",
+            "description": f"Description of product {number}",
+            "price": Decimal("10.00") + number,
+            "stock_quantity": 10,
+            "category_id": category.id,
+            **fields
+        }
+        product = Product(**values)
+        session.add(product)
+        for index in range(images):
+            session.add(ProductImage(
+                product_id=product.id,
+                image_url=f"https://img.example.com/{values['slug']}/{index}.jpg",
+                is_primary=index == 0,
+                display_order=index
+            ))
+        await session.commit()
+        return product
+
+    return make_product
+
+
+@pytest.fixture
+def explain(session):
+    """
+    Return the JSON plan of a select with sequential scans disabled, so a
+    tiny test table still shows which indexes the query can use.
+    """
+    async def explain(statement) -> str:
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = (await session.execute(Explain(statement))).scalar_one()
+        await session.rollback()
+        return plan if isinstance(plan, str) else json.dumps(plan)
+
+    return explain
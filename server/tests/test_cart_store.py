@@ -0,0 +1,153 @@
+import fakeredis
+import pytest
+
+from app.services import cart_store as cart_store_module
+from app.services.cart_store import CartFlusher, MemoryCartStore, RedisCartStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cart_store_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def redis_store():
+    store = RedisCartStore("redis://localhost:6379/0")
+    store._client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    store._merge = store._client.register_script(RedisCartStore._MERGE_SCRIPT)
+    return store
+
+
+async def _flush_all(store) -> None:
+    await store.acquire_flush_lock(30)
+    await store.pop_dirty(100)
+    await store.release_flush_lock()
+
+
+async def test_memory_store_drops_idle_carts_once_flushed(clock):
+    store = MemoryCartStore(max_entries=10, ttl=60)
+    await store.load("user:a", {"p1": 1})
+    await store.add("user:b", "p1", 1)
+
+    clock.now += 60
+    # The unflushed change outlives the TTL
+    assert await store.get("user:a") is None
+    assert await store.get("user:b") == {"p1": 1}
+
+    await _flush_all(store)
+    clock.now += 60
+    assert await store.get("user:b") is None
+
+
+async def test_memory_store_writes_refresh_the_ttl(clock):
+    store = MemoryCartStore(max_entries=10, ttl=60)
+    await store.load("user:a", {})
+
+    clock.now += 59
+    await store.add("user:a", "p1", 2)
+    await _flush_all(store)
+    clock.now += 59
+
+    assert await store.get("user:a") == {"p1": 2}
+
+
+async def test_memory_store_evicts_least_recently_used_saved_carts():
+    store = MemoryCartStore(max_entries=3, ttl=60)
+    await store.add("user:dirty", "p1", 1)
+    await store.load("user:a", {})
+    await store.load("user:b", {})
+    await store.get("user:a")
+
+    await store.load("user:c", {})
+
+    assert await store.get("user:b") is None
+    assert await store.get("user:dirty") == {"p1": 1}
+    assert store.evictions == 1
+
+
+async def test_memory_store_keeps_carts_being_flushed():
+    store = MemoryCartStore(max_entries=1, ttl=60)
+    await store.add("user:a", "p1", 1)
+    assert await store.pop_dirty(10) == {"user:a": {"p1": 1}}
+
+    # Persisting the batch fails after other carts were loaded
+    await store.load("user:b", {})
+    await store.mark_dirty(["user:a"])
+    await store.release_flush_lock()
+
+    assert await store.pop_dirty(10) == {"user:a": {"p1": 1}}
+
+
+async def test_memory_store_merge_moves_items_into_the_target():
+    store = MemoryCartStore(max_entries=10, ttl=60)
+    await store.load("session:s", {"p1": 1, "p2": 2})
+    await store.load("user:a", {"p1": 3})
+
+    merged = await store.merge("session:s", "user:a")
+
+    assert merged == {"p1": 4, "p2": 2}
+    assert await store.get("session:s") == {}
+    assert await store.pop_dirty(10) == {"session:s": {}, "user:a": {"p1": 4, "p2": 2}}
+
+
+async def test_redis_store_operations(redis_store):
+    assert await redis_store.get("user:a") is None
+    assert await redis_store.load("user:a", {"p1": 1}) == {"p1": 1}
+    # Changes made after the database read win over the loaded items
+    assert await redis_store.load("user:a", {"p1": 5, "p2": 1}) == {"p1": 1, "p2": 1}
+
+    assert await redis_store.add("user:a", "p1", 2) == 3
+    await redis_store.set("user:a", "p2", 0)
+    await redis_store.load("session:s", {"p1": 1, "p3": 4})
+
+    assert await redis_store.merge("session:s", "user:a") == {"p1": 4, "p3": 4}
+    assert await redis_store.get("session:s") == {}
+    assert await redis_store.pop_dirty(10) == {"session:s": {}, "user:a": {"p1": 4, "p3": 4}}
+    assert await redis_store.pop_dirty(10) == {}
+
+
+async def test_redis_flush_lock_is_held_by_one_worker(redis_store):
+    other = RedisCartStore("redis://localhost:6379/0")
+    other._client = redis_store._client
+
+    assert await redis_store.acquire_flush_lock(30)
+    assert not await other.acquire_flush_lock(30)
+    await other.release_flush_lock()
+    assert not await other.acquire_flush_lock(30)
+
+    await redis_store.release_flush_lock()
+    assert await other.acquire_flush_lock(30)
+
+
+async def test_flusher_writes_batches_and_retries_failed_carts():
+    store = MemoryCartStore(max_entries=10, ttl=60)
+    for number in range(5):
+        await store.add(f"user:{number}", "p1", number + 1)
+    batches = []
+    fail = [True]
+
+    async def persist(carts):
+        if fail[0]:
+            fail[0] = False
+            raise RuntimeError("database is down")
+        batches.append(carts)
+
+    flusher = CartFlusher(store, persist, interval=1, batch_size=2)
+
+    assert await flusher.flush() == 0
+    assert flusher.failures == 1
+    assert await flusher.flush() == 5
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert {key: items["p1"] for batch in batches for key, items in batch.items()} == {
+        f"user:{number}": number + 1 for number in range(5)
+    }
@@ -0,0 +1,112 @@
+from sqlmodel import select
+
+from app.crud import cart as cart_crud
+from app.models.cart import Cart, CartItem
+from app.schemas.cart import CART_MAX_ITEM_QUANTITY
+
+SESSION_ID = "anonymous-session-0001"
+
+
+def _quantities(body):
+    return {item["product_id"]: item["quantity"] for item in body["items"]}
+
+
+async def _add(client, product, quantity=1, **headers):
+    return await client.post(
+        "/api/carts/me/items", json={"product_id": str(product.id), "quantity": quantity}, headers=headers
+    )
+
+
+async def _stored_items(session, **owner):
+    column, value = next(iter(owner.items()))
+    result = await session.execute(
+        select(CartItem.product_id, CartItem.quantity)
+        .join(Cart, Cart.id == CartItem.cart_id)
+        .where(getattr(Cart, column) == value)
+    )
+    return {str(product_id): quantity for product_id, quantity in result.all()}
+
+
+async def test_add_to_cart_adds_up_and_caps_quantities(client, cart_store, make_product):
+    product = await make_product()
+
+    await _add(client, product, 2)
+    response = await _add(client, product, 3)
+    assert response.json() == {"items": [{"product_id": str(product.id), "quantity": 5}], "item_count": 5}
+
+    response = await _add(client, product, CART_MAX_ITEM_QUANTITY)
+    assert _quantities(response.json()) == {str(product.id): CART_MAX_ITEM_QUANTITY}
+
+
+async def test_inactive_products_cannot_be_added(client, cart_store, make_product):
+    product = await make_product(is_active=False)
+
+    response = await _add(client, product)
+
+    assert response.status_code == 404
+
+
+async def test_anonymous_carts_need_a_valid_session_header(client, cart_store, make_product, signed_out):
+    product = await make_product()
+    signed_out()
+
+    assert (await _add(client, product)).status_code == 401
+    assert (await _add(client, product, **{"X-Cart-Session": "short"})).status_code == 400
+    response = await _add(client, product, **{"X-Cart-Session": SESSION_ID})
+    assert _quantities(response.json()) == {str(product.id): 1}
+
+
+async def test_update_and_remove_cart_items(client, cart_store, make_product):
+    first, second = await make_product(), await make_product()
+    await _add(client, first)
+    await _add(client, second)
+
+    response = await client.put(f"/api/carts/me/items/{first.id}", json={"quantity": 4})
+    assert _quantities(response.json()) == {str(first.id): 4, str(second.id): 1}
+
+    response = await client.delete(f"/api/carts/me/items/{second.id}")
+    assert _quantities(response.json()) == {str(first.id): 4}
+
+    assert (await client.delete("/api/carts/me")).status_code == 204
+    assert (await client.get("/api/carts/me")).json()["items"] == []
+
+
+async def test_flush_writes_carts_to_the_database(client, cart_store, make_product, session, user):
+    first, second = await make_product(), await make_product()
+    await _add(client, first, 2)
+    await _add(client, second)
+
+    assert await cart_crud.cart_flusher.flush() == 1
+    assert await _stored_items(session, user_id=user.id) == {str(first.id): 2, str(second.id): 1}
+
+    await client.delete(f"/api/carts/me/items/{second.id}")
+    await cart_crud.cart_flusher.flush()
+    assert await _stored_items(session, user_id=user.id) == {str(first.id): 2}
+
+
+async def test_flushed_carts_are_reloaded_after_leaving_the_store(client, cart_store, make_product):
+    product = await make_product()
+    await _add(client, product, 3)
+    await cart_crud.cart_flusher.flush()
+
+    cart_store._carts.clear()
+
+    response = await _add(client, product)
+    assert _quantities(response.json()) == {str(product.id): 4}
+
+
+async def test_merge_moves_the_session_cart_into_the_user_cart(client, cart_store, make_product, session, signed_out, user):
+    shared, anonymous_only = await make_product(), await make_product()
+    await _add(client, shared, 2)
+    signed_out()
+    await _add(client, shared, **{"X-Cart-Session": SESSION_ID})
+    await _add(client, anonymous_only, **{"X-Cart-Session": SESSION_ID})
+    await cart_crud.cart_flusher.flush()
+
+    response = await client.post("/api/carts/me/merge", headers={"X-Cart-Session": SESSION_ID})
+
+    assert _quantities(response.json()) == {str(shared.id): 3, str(anonymous_only.id): 1}
+    await cart_crud.cart_flusher.flush()
+    assert await _stored_items(session, user_id=user.id) == {str(shared.id): 3, str(anonymous_only.id): 1}
+    # The emptied anonymous cart is removed
+    assert await session.scalar(select(Cart.id).where(Cart.session_id == SESSION_ID)) is None
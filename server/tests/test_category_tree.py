@@ -0,0 +1,68 @@
+from app.models.category import Category
+
+
+async def _add_category(session, name, parent=None, **fields):
+    category = Category(name=name, slug=name.lower(), parent_id=parent.id if parent else None, **fields)
+    session.add(category)
+    await session.commit()
+    return category
+
+
+def _names(items):
+    return [(item["name"], _names(item["children"])) for item in items]
+
+
+async def test_tree_loads_every_level_in_one_query(client, session, queries):
+    electronics = await _add_category(session, "Electronics")
+    phones = await _add_category(session, "Phones", electronics)
+    await _add_category(session, "Android", phones)
+    await _add_category(session, "Books", None)
+    await _add_category(session, "Hidden", electronics, is_active=False)
+
+    queries.reset()
+    response = await client.get("/api/categories/tree")
+
+    assert response.status_code == 200
+    assert _names(response.json()["items"]) == [
+        ("Books", []),
+        ("Electronics", [("Phones", [("Android", [])])]),
+    ]
+    assert len(queries) == 1
+
+
+async def test_tree_of_a_subcategory(client, session):
+    electronics = await _add_category(session, "Electronics")
+    phones = await _add_category(session, "Phones", electronics)
+    await _add_category(session, "Android", phones)
+
+    response = await client.get("/api/categories/tree", params={"parent_id": str(electronics.id)})
+
+    assert _names(response.json()["items"]) == [("Phones", [("Android", [])])]
+
+
+async def test_cached_tree_skips_the_database(client, session, queries):
+    await _add_category(session, "Electronics")
+    first = await client.get("/api/categories/tree")
+
+    queries.reset()
+    second = await client.get("/api/categories/tree")
+
+    assert second.content == first.content
+    assert len(queries) == 0
+
+
+async def test_category_mutations_invalidate_the_tree(client):
+    await client.get("/api/categories/tree")
+
+    created = await client.post("/api/categories/", json={"name": "Phones", "slug": "phones"})
+    category_id = created.json()["id"]
+    tree = await client.get("/api/categories/tree")
+    assert _names(tree.json()["items"]) == [("Phones", [])]
+
+    await client.put(f"/api/categories/{category_id}", json={"name": "Mobiles"})
+    tree = await client.get("/api/categories/tree")
+    assert _names(tree.json()["items"]) == [("Mobiles", [])]
+
+    await client.delete(f"/api/categories/{category_id}")
+    tree = await client.get("/api/categories/tree")
+    assert tree.json()["items"] == []
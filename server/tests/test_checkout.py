@@ -0,0 +1,163 @@
+import asyncio
+from decimal import Decimal
+from typing import List, Tuple
+
+import pytest
+from fastapi import Request
+from sqlalchemy import update
+from sqlmodel import func, select
+
+import main
+from app.middleware.authentication import get_current_user
+from app.models.address import Address
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.reservation import ReservationStatus, StockReservation
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+from app.services.cart_store import user_cart_key
+
+
+async def _checkout(client, address, key="order-1", **headers):
+    return await client.post(
+        "/api/orders/checkout",
+        json={"shipping_address_id": str(address.id)},
+        headers={"Idempotency-Key": key, **headers}
+    )
+
+
+async def _fill_cart(cart_store, user_id, items):
+    cart_key = user_cart_key(user_id)
+    await cart_store.load(cart_key, {})
+    for product, quantity in items:
+        await cart_store.set(cart_key, str(product.id), quantity)
+
+
+async def _stock(session, product) -> int:
+    return await session.scalar(select(Product.stock_quantity).where(Product.id == product.id))
+
+
+@pytest.fixture
+async def shoppers(session) -> List[Tuple[UserSchema, Address]]:
+    """
+    Signed-in users with an address each; requests act as the user whose
+    id is sent in X-Test-User.
+    """
+    users = [User(email=f"shopper{number}@example.com", first_name="Shop", last_name=str(number)) for number in range(20)]
+    session.add_all(users)
+    await session.flush()
+    addresses = [
+        Address(user_id=user.id, address_line1="1 Main St", city="Springfield", state="IL", postal_code="62701", country="US")
+        for user in users
+    ]
+    session.add_all(addresses)
+    await session.commit()
+
+    by_id = {str(user.id): UserSchema.model_validate(user) for user in users}
+
+    def current_user(request: Request) -> UserSchema:
+        return by_id[request.headers["X-Test-User"]]
+
+    main.app.dependency_overrides[get_current_user] = current_user
+    return list(zip(by_id.values(), addresses))
+
+
+async def test_checkout_writes_the_order_at_purchase_prices(client, cart_store, make_product, address, session, user):
+    regular = await make_product(price=Decimal("10.00"), stock_quantity=5)
+    on_sale = await make_product(price=Decimal("20.00"), sale_price=Decimal("15.00"), stock_quantity=5)
+    await _fill_cart(cart_store, user.id, [(regular, 2), (on_sale, 1)])
+
+    response = await _checkout(client, address)
+
+    assert response.status_code == 201
+    body = response.json()
+    assert Decimal(body["total_amount"]) == Decimal("35.00")
+    assert {item["product_id"]: Decimal(item["price_at_purchase"]) for item in body["items"]} == {
+        str(regular.id): Decimal("10.00"), str(on_sale.id): Decimal("15.00")
+    }
+    assert (await _stock(session, regular), await _stock(session, on_sale)) == (3, 4)
+    assert await cart_store.get(user_cart_key(user.id)) == {}
+
+
+async def test_checkout_changes_the_product_etag(client, cart_store, make_product, address, user):
+    product = await make_product(stock_quantity=5)
+    before = await client.get(f"/api/products/{product.id}")
+    await _fill_cart(cart_store, user.id, [(product, 1)])
+
+    assert (await _checkout(client, address)).status_code == 201
+
+    after = await client.get(f"/api/products/{product.id}", headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert after.json()["stock_quantity"] == 4
+
+
+async def test_checkout_replays_the_order_for_the_same_idempotency_key(client, cart_store, make_product, address, session, user):
+    product = await make_product(stock_quantity=5)
+    await _fill_cart(cart_store, user.id, [(product, 1)])
+
+    first = await _checkout(client, address)
+    await _fill_cart(cart_store, user.id, [(product, 1)])
+    replay = await _checkout(client, address)
+
+    assert (first.status_code, replay.status_code) == (201, 200)
+    assert replay.json()["id"] == first.json()["id"]
+    assert await _stock(session, product) == 4
+
+
+async def test_checkout_errors(client, cart_store, make_product, address, session, user):
+    product = await make_product(stock_quantity=1)
+
+    assert (await _checkout(client, address)).status_code == 400
+
+    await _fill_cart(cart_store, user.id, [(product, 2)])
+    response = await _checkout(client, address)
+    assert response.status_code == 409
+    assert response.json()["detail"]["product_ids"] == [str(product.id)]
+    assert await _stock(session, product) == 1
+    assert await session.scalar(select(func.count()).select_from(Order)) == 0
+
+
+async def test_checkout_rejected_for_stock_releases_the_hold(client, cart_store, make_product, address, session, user):
+    product = await make_product(stock_quantity=5)
+    await _fill_cart(cart_store, user.id, [(product, 3)])
+    assert (await client.post("/api/carts/me/reservation")).status_code == 200
+    # Stock sold elsewhere without going through the holds
+    await session.execute(update(Product).where(Product.id == product.id).values(stock_quantity=2))
+    await session.commit()
+
+    response = await _checkout(client, address)
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["product_ids"] == [str(product.id)]
+    held = await session.scalar(
+        select(func.count()).select_from(StockReservation).where(StockReservation.status == ReservationStatus.HELD)
+    )
+    assert held == 0
+    # The available count is reloaded, so the cart can't be held again
+    assert (await client.post("/api/carts/me/reservation")).status_code == 409
+    await _fill_cart(cart_store, user.id, [(product, 2)])
+    assert (await _checkout(client, address, key="order-2")).status_code == 201
+
+
+@pytest.mark.parametrize("stock", [0, 5, 20])
+async def test_concurrent_checkouts_never_oversell(client, cart_store, make_product, shoppers, session, stock):
+    hot = await make_product(stock_quantity=stock)
+    plenty = await make_product(stock_quantity=1000)
+    for shopper, _ in shoppers:
+        await _fill_cart(cart_store, shopper.id, [(hot, 1), (plenty, 2)])
+
+    responses = await asyncio.gather(*[
+        _checkout(client, address, key=f"order-{shopper.id}", **{"X-Test-User": str(shopper.id)})
+        for shopper, address in shoppers
+    ])
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] * stock + [409] * (len(shoppers) - stock)
+    assert await _stock(session, hot) == 0
+    # Orders that failed on the hot product took none of the other one either
+    assert await _stock(session, plenty) == 1000 - 2 * stock
+    sold = await session.scalar(
+        select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.product_id == hot.id)
+    )
+    assert sold == stock
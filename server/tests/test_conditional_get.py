@@ -0,0 +1,46 @@
+from app.services import catalog
+
+
+async def test_product_detail_revalidates_with_etag(client, make_product, queries):
+    product = await make_product()
+    url = f"/api/products/{product.id}"
+    first = await client.get(url)
+    etag = first.headers["etag"]
+    assert "public" in first.headers["cache-control"]
+    assert first.headers["last-modified"]
+
+    queries.reset()
+    cached = await client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert len(queries) == 0
+
+    await client.put(url, json={"name": "Renamed"})
+    changed = await client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+async def test_list_etag_follows_the_catalog_version(client, make_product, monkeypatch):
+    # Stay inside one version time bucket
+    monkeypatch.setattr(catalog.time, "time", lambda: 0.0)
+    await make_product()
+    first = await client.get("/api/products/")
+    etag = first.headers["etag"]
+
+    assert (await client.get("/api/products/", headers={"If-None-Match": etag})).status_code == 304
+    assert (await client.get("/api/products/?limit=5", headers={"If-None-Match": etag})).status_code == 200
+
+    await client.post("/api/categories/", json={"name": "New", "slug": "new"})
+    assert (await client.get("/api/products/", headers={"If-None-Match": etag})).status_code == 200
+
+
+async def test_memory_catalog_version_expires(client, monkeypatch):
+    now = catalog.CATALOG_VERSION_MAX_AGE * 1000.0
+    monkeypatch.setattr(catalog.time, "time", lambda: now)
+    version = await catalog.get_catalog_version()
+
+    now += catalog.CATALOG_VERSION_MAX_AGE - 1
+    assert await catalog.get_catalog_version() == version
+    now += 1
+    assert await catalog.get_catalog_version() != version
@@ -0,0 +1,51 @@
+import pytest
+
+STRATEGIES = ["sequential", "concurrent", "window"]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+async def test_strategies_return_the_same_page_and_total(client, make_product, strategy):
+    for price in (5, 15, 25, 35, 45):
+        await make_product(price=price)
+    params = {"price_min": 10, "limit": 2, "skip": 2, "sort": "price"}
+
+    expected = (await client.get("/api/products/", params={**params, "count_strategy": "sequential"})).json()
+    body = (await client.get("/api/products/", params={**params, "count_strategy": strategy})).json()
+
+    assert [item["price"] for item in body["items"]] == ["35.00", "45.00"]
+    assert body == expected
+    assert (body["total"], body["total_is_exact"]) == (4, True)
+
+
+async def test_window_strategy_counts_in_the_page_query(client, make_product, queries):
+    for _ in range(3):
+        await make_product()
+
+    queries.reset()
+    body = (await client.get("/api/products/", params={"count_strategy": "window"})).json()
+
+    counts = [statement.lower() for statement in queries.statements if "count(" in statement.lower()]
+    assert body["total"] == 3
+    assert len(counts) == 1
+    assert "over ()" in counts[0]
+
+
+async def test_window_strategy_past_the_last_page(client, make_product):
+    for _ in range(3):
+        await make_product()
+
+    body = (await client.get("/api/products/", params={"count_strategy": "window", "skip": 10})).json()
+
+    assert body["items"] == []
+    assert body["total"] == 3
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+async def test_category_strategies(client, strategy):
+    for number in range(3):
+        await client.post("/api/categories/", json={"name": f"Category {number}", "slug": f"category-{number}"})
+
+    body = (await client.get("/api/categories/", params={"count_strategy": strategy, "limit": 2})).json()
+
+    assert len(body["items"]) == 2
+    assert body["total"] == 3
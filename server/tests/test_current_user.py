@@ -0,0 +1,55 @@
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.crud import user as user_crud
+from app.middleware.authentication import get_current_user, verify_jwt_token
+from app.schemas.user import User
+
+
+async def test_current_user_is_cached_across_requests(client, user, queries):
+    queries.reset()
+    first = await client.get("/api/users/me")
+    assert first.json()["id"] == str(user.id)
+    assert len(queries) == 1
+
+    queries.reset()
+    second = await client.get("/api/users/me")
+    assert second.json() == first.json()
+    assert len(queries) == 0
+
+
+async def test_current_user_is_resolved_once_per_request(user, claims, queries):
+    app = FastAPI()
+    app.dependency_overrides[verify_jwt_token] = lambda: claims
+
+    async def owner(current_user: User = Depends(get_current_user)) -> User:
+        return current_user
+
+    @app.get("/twice")
+    async def twice(current_user: User = Depends(get_current_user), other: User = Depends(owner)):
+        return {"same": current_user is other}
+
+    queries.reset()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/twice", headers={"Authorization": "Bearer test"})
+
+    assert response.json() == {"same": True}
+    assert len(queries) == 1
+
+
+async def test_user_writes_invalidate_the_identity_cache(client, user):
+    await client.get("/api/users/me")
+
+    await client.put(f"/api/users/{user.id}", json={"first_name": "Renamed"})
+    assert (await client.get("/api/users/me")).json()["first_name"] == "Renamed"
+
+    await client.delete(f"/api/users/{user.id}")
+    assert (await client.get("/api/users/me")).status_code == 404
+
+
+async def test_unknown_user_is_not_found(client, claims):
+    claims["email"] = "nobody@example.com"
+    claims["sub"] = "user_nobody"
+
+    assert (await client.get("/api/users/me")).status_code == 404
+    assert await user_crud.get_cached_user_by_identity("user_nobody") is None
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.database import InstrumentedNullPool, InstrumentedQueuePool, _async_engine_options, _pool_status
+
+PG_URL = "postgresql+asyncpg://shop@db/shop"
+
+
+def test_sqlite_keeps_sqlalchemy_pool_defaults():
+    assert _async_engine_options("sqlite+aiosqlite:///shop.db") == {}
+
+
+def test_postgresql_pool_comes_from_settings(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 5)
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 2000)
+
+    options = _async_engine_options(PG_URL)
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (20, 5)
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "2000"}}
+
+
+def test_pgbouncer_mode_disables_pooling_and_prepared_statements(monkeypatch):
+    monkeypatch.setattr(database, "DB_PGBOUNCER", True)
+
+    options = _async_engine_options(PG_URL)
+
+    assert options["poolclass"] is InstrumentedNullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    assert "pool_size" not in options
+
+
+async def test_pool_status_reports_usage_and_acquire_times(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1
+    )
+    acquired = database.pool_metrics.acquire_count
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            status = _pool_status(engine)
+            assert status["pool"] == "InstrumentedQueuePool"
+            assert status["size"] == 2
+            assert status["checked_out"] == 1
+        assert _pool_status(engine)["idle"] == 1
+        assert database.pool_metrics.acquire_count == acquired + 1
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.postgresql
+async def test_pool_metrics_endpoint(client, make_product):
+    await make_product()
+
+    body = (await client.get("/api/metrics/pool")).json()
+
+    assert body["pool"] == "InstrumentedQueuePool"
+    assert body["acquire_count"] > 0
+    assert {"checked_out", "idle", "overflow", "acquire_avg_ms", "acquire_max_ms"} <= body.keys()
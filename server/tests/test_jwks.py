@@ -0,0 +1,129 @@
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwk, jwt
+
+from app.middleware.authentication import token_cache, verify_jwt_token
+from app.services import jwks
+from app.services.jwks import jwks_cache
+
+
+def _signing_key(kid):
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+class KeySet:
+    """
+    Stand-in for the Clerk JWKS endpoint; counts the fetches.
+    """
+
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.fetches = 0
+
+    async def __call__(self):
+        self.fetches += 1
+        return {"keys": self.keys}
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return {kid: _signing_key(kid) for kid in ("key-1", "key-2")}
+
+
+@pytest.fixture
+async def key_set(keys, monkeypatch):
+    key_set = KeySet(keys["key-1"][1])
+    monkeypatch.setattr(jwks_cache, "_fetch", key_set)
+    monkeypatch.setattr(jwks_cache, "keys", {})
+    monkeypatch.setattr(jwks_cache, "last_fetch_attempt", 0.0)
+    await token_cache.clear()
+    await jwks_cache.refresh()
+    return key_set
+
+
+def _token(keys, kid, **claims):
+    claims = {"sub": "user_1", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(claims, keys[kid][0], algorithm="RS256", headers={"kid": kid})
+
+
+async def _verify(token):
+    return await verify_jwt_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+
+async def test_rs256_token_is_verified_against_the_cached_key_set(keys, key_set):
+    claims = await _verify(_token(keys, "key-1"))
+
+    assert claims["sub"] == "user_1"
+    assert key_set.fetches == 1
+
+
+async def test_unknown_kid_refetches_the_key_set_at_most_once_per_interval(keys, key_set, monkeypatch):
+    key_set.keys.append(keys["key-2"][1])
+    unknown = jwt.encode({"sub": "user_2"}, keys["key-1"][0], algorithm="RS256", headers={"kid": "key-3"})
+
+    # Within the interval after the last fetch, unknown kids are rejected as is
+    with pytest.raises(HTTPException) as error:
+        await _verify(_token(keys, "key-2"))
+    assert error.value.status_code == 401
+    assert key_set.fetches == 1
+
+    monkeypatch.setattr(jwks_cache, "last_fetch_attempt", time.monotonic() - jwks_cache.min_refetch_interval)
+    assert (await _verify(_token(keys, "key-2")))["sub"] == "user_1"
+    assert key_set.fetches == 2
+
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            await _verify(unknown)
+    assert key_set.fetches == 2
+
+
+async def test_expired_token_is_rejected(keys, key_set):
+    with pytest.raises(HTTPException) as error:
+        await _verify(_token(keys, "key-1", exp=int(time.time()) - 10))
+
+    assert error.value.status_code == 401
+
+
+async def test_token_signed_with_another_key_is_rejected(keys, key_set):
+    forged = jwt.encode({"sub": "user_1"}, keys["key-2"][0], algorithm="RS256", headers={"kid": "key-1"})
+
+    with pytest.raises(HTTPException) as error:
+        await _verify(forged)
+
+    assert error.value.status_code == 401
+
+
+async def test_failed_refresh_keeps_the_previous_keys(keys, key_set, monkeypatch):
+    async def unavailable():
+        raise httpx.ConnectError("down")
+
+    monkeypatch.setattr(jwks_cache, "_fetch", unavailable)
+    await jwks_cache.refresh()
+
+    assert set(jwks_cache.keys) == {"key-1"}
+
+
+async def test_key_set_is_fetched_with_the_shared_client(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"keys": []})
+
+    monkeypatch.setattr(jwks, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    assert await jwks.fetch_clerk_jwks() == {"keys": []}
+    assert await jwks.fetch_clerk_jwks() == {"keys": []}
+    assert jwks.get_http_client() is jwks._http_client
+    assert [str(request.url) for request in requests] == [jwks.CLERK_JWKS_URL] * 2
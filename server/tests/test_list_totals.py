@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from app.models.product import Product
+from app.services import counts
+
+
+def _counts(queries):
+    return [statement for statement in queries.statements if "count(" in statement.lower()]
+
+
+async def test_exact_total(client, make_product):
+    for _ in range(3):
+        await make_product()
+
+    body = (await client.get("/api/products/", params={"limit": 2})).json()
+
+    assert (body["total"], body["total_is_exact"], body["pages"]) == (3, True, 2)
+
+
+async def test_no_total(client, make_product, queries):
+    await make_product()
+
+    queries.reset()
+    body = (await client.get("/api/products/", params={"total_mode": "none"})).json()
+
+    assert (body["total"], body["total_is_exact"], body["pages"]) == (None, None, None)
+    assert len(body["items"]) == 1
+    assert _counts(queries) == []
+
+
+async def test_estimated_total_is_cached_per_filter(client, make_product, queries):
+    for _ in range(3):
+        await make_product()
+    await make_product(is_active=False)
+    params = {"total_mode": "estimate"}
+
+    first = (await client.get("/api/products/", params=params)).json()
+    queries.reset()
+    second = (await client.get("/api/products/", params=params)).json()
+    assert _counts(queries) == []
+    assert (first["total"], second["total"]) == (3, 3)
+    # Small results are counted exactly
+    assert first["total_is_exact"] is True
+
+    inactive = (await client.get("/api/products/", params={**params, "is_active": "false"})).json()
+    assert inactive["total"] == 1
+
+
+async def test_estimated_total_follows_catalog_changes(client, make_product, category):
+    await make_product()
+    params = {"total_mode": "estimate"}
+    assert (await client.get("/api/products/", params=params)).json()["total"] == 1
+
+    await client.post("/api/products/", json={
+        "name": "New", "slug": "new", "description": "", "price": "1.00",
+        "stock_quantity": 1, "category_id": str(category.id)
+    })
+
+    assert (await client.get("/api/products/", params=params)).json()["total"] == 2
+
+
+async def test_category_totals(client):
+    for number in range(3):
+        await client.post("/api/categories/", json={"name": f"Category {number}", "slug": f"category-{number}"})
+
+    for mode, expected in (("exact", (3, True)), ("estimate", (3, True)), ("none", (None, None))):
+        body = (await client.get("/api/categories/", params={"total_mode": mode})).json()
+        assert (body["total"], body["total_is_exact"]) == expected
+
+
+@pytest.mark.postgresql
+async def test_large_totals_are_estimated_by_the_planner(client, session, category):
+    rows = counts.COUNT_ESTIMATE_EXACT_THRESHOLD * 3
+    now = datetime.utcnow()
+    await session.execute(Product.__table__.insert(), [
+        {
+            "id": uuid.uuid4(), "name": f"Bulk {number}", "slug": f"bulk-{number}", "description": "",
+            "price": Decimal("1.00"), "stock_quantity": 1, "category_id": category.id,
+            "is_active": True, "created_at": now
+        }
+        for number in range(rows)
+    ])
+    await session.commit()
+    await session.execute(text("ANALYZE products"))
+    await session.commit()
+
+    body = (await client.get("/api/products/", params={"total_mode": "estimate"})).json()
+
+    assert body["total_is_exact"] is False
+    assert abs(body["total"] - rows) <= rows * 0.1
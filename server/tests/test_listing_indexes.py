@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text, tuple_
+from sqlmodel import select
+
+from app.models.category import Category
+from app.models.product import Product
+
+pytestmark = pytest.mark.postgresql
+
+CATEGORY_ID = uuid.uuid4()
+ACTIVE = Product.is_active == True  # noqa: E712 - the listing filter as the API sends it
+NEWEST = (Product.created_at.desc(), Product.id.desc())
+
+
+
+
+@pytest.fixture
+async def catalog(session):
+    """
+    Enough products over enough categories for the planner to prefer the
+    composite indexes over single-column ones.
+    """
+    category_ids = [CATEGORY_ID] + [uuid.uuid4() for _ in range(49)]
+    session.add_all([Category(id=category_id, name=f"Category {number}", slug=f"category-{number}")
+                     for number, category_id in enumerate(category_ids)])
+    await session.commit()
+    start = datetime(2024, 1, 1)
+    await session.execute(Product.__table__.insert(), [
+        {
+            "id": uuid.uuid4(), "name": f"Product {number}", "slug": f"product-{number}", "description": "",
+            "price": Decimal(number % 1000), "stock_quantity": number % 5,
+            "category_id": category_ids[number % len(category_ids)], "is_active": number % 10 != 0,
+            "created_at": start + timedelta(minutes=number)
+        }
+        for number in range(5000)
+    ])
+    await session.commit()
+    await session.execute(text("ANALYZE products"))
+    await session.commit()
+
+
+@pytest.mark.parametrize("query, index", [
+    (
+        select(Product).where(ACTIVE).order_by(*NEWEST).limit(20),
+        "ix_products_active_created_at_id",
+    ),
+    (
+        select(Product).where(ACTIVE, tuple_(Product.created_at, Product.id) < tuple_(datetime(2024, 1, 1), uuid.uuid4()))
+        .order_by(*NEWEST).limit(20),
+        "ix_products_active_created_at_id",
+    ),
+    (
+        select(Product).where(ACTIVE, Product.category_id == CATEGORY_ID).order_by(*NEWEST).limit(20),
+        "ix_products_active_category_created_at_id",
+    ),
+    (
+        select(Product).where(ACTIVE, Product.category_id == CATEGORY_ID, Product.price >= 10, Product.price <= 50)
+        .order_by(Product.price, Product.id).limit(20),
+        "ix_products_active_category_price",
+    ),
+    (
+        select(Product).where(ACTIVE, Product.price >= 10, Product.price <= 50).order_by(Product.price, Product.id).limit(20),
+        "ix_products_active_price",
+    ),
+], ids=["newest", "newest keyset page", "category newest", "category price range", "price range"])
+async def test_listing_queries_use_the_partial_indexes(catalog, explain, query, index):
+    plan = await explain(query)
+
+    assert f'"Index Name": "{index}"' in plan
+    assert "Seq Scan" not in plan
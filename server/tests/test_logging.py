@@ -0,0 +1,32 @@
+import pytest
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+from app.utils.logger import setup_logging
+
+
+@pytest.fixture
+def logged():
+    messages = []
+    sink = logger.add(lambda message: messages.append(message.record["message"]), level="INFO")
+    yield messages
+    logger.remove(sink)
+
+
+def _run_echoed_query(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 42"))
+    engine.dispose()
+
+
+@pytest.mark.parametrize("engine_first", [True, False])
+def test_echoed_sql_is_logged_once_through_loguru(engine_first, capsys, request):
+    engine = create_engine("sqlite://", echo=True) if engine_first else None
+    setup_logging()
+    messages = request.getfixturevalue("logged")
+    engine = engine or create_engine("sqlite://", echo=True)
+
+    _run_echoed_query(engine)
+
+    assert [message for message in messages if "SELECT 42" in message] == ["SELECT 42"]
+    assert "SELECT 42" not in capsys.readouterr().out
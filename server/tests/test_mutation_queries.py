@@ -0,0 +1,106 @@
+import pytest
+from sqlmodel import select
+
+from app.models.product import ProductImage
+
+
+async def _statements(queries, request):
+    queries.reset()
+    response = await request
+    assert response.status_code < 300, response.text
+    return [statement.split()[0].upper() for statement in queries.statements]
+
+
+async def _images(session, product):
+    query = select(ProductImage).where(ProductImage.product_id == product.id).order_by(ProductImage.display_order)
+    return (await session.scalars(query)).all()
+
+
+@pytest.fixture
+def new_product(category):
+    return {
+        "name": "New", "slug": "new", "description": "New product", "price": "9.99",
+        "stock_quantity": 5, "category_id": str(category.id)
+    }
+
+
+async def test_create_product(client, new_product, queries):
+    assert await _statements(queries, client.post("/api/products/", json=new_product)) == ["INSERT"]
+
+
+async def test_update_product(client, make_product, queries):
+    product = await make_product()
+
+    # UPDATE ... RETURNING, then the images for the response
+    assert await _statements(queries, client.put(f"/api/products/{product.id}", json={"name": "Renamed"})) == [
+        "UPDATE", "SELECT"
+    ]
+
+
+async def test_update_missing_product(client, category, queries):
+    queries.reset()
+    response = await client.put(f"/api/products/{category.id}", json={"name": "Renamed"})
+
+    assert response.status_code == 404
+    assert len(queries) == 1
+
+
+async def test_delete_product(client, make_product, queries):
+    product = await make_product(images=2)
+
+    assert await _statements(queries, client.delete(f"/api/products/{product.id}")) == ["DELETE", "DELETE"]
+
+
+async def test_create_product_image(client, make_product, queries):
+    product = await make_product(images=0)
+    image = {"product_id": str(product.id), "image_url": "https://img.example.com/new.jpg"}
+
+    # Touching the product doubles as its existence check
+    assert await _statements(queries, client.post("/api/products/images", json=image)) == ["UPDATE", "INSERT"]
+    # A new primary image also clears the previous one
+    assert await _statements(queries, client.post("/api/products/images", json={**image, "is_primary": True})) == [
+        "UPDATE", "INSERT", "UPDATE"
+    ]
+
+
+async def test_update_product_image(client, session, make_product, queries):
+    product = await make_product(images=2)
+    image_id = (await _images(session, product))[1].id
+
+    assert await _statements(queries, client.put(f"/api/products/images/{image_id}", json={"alt_text": "Side"})) == [
+        "UPDATE", "UPDATE"
+    ]
+    assert await _statements(queries, client.put(f"/api/products/images/{image_id}", json={"is_primary": True})) == [
+        "UPDATE", "UPDATE", "UPDATE"
+    ]
+
+
+async def test_delete_product_image(client, session, make_product, queries):
+    product = await make_product(images=2)
+    primary, other = await _images(session, product)
+
+    # DELETE ... RETURNING, then touch the product
+    assert await _statements(queries, client.delete(f"/api/products/images/{other.id}")) == ["DELETE", "UPDATE"]
+    # Deleting the primary image also promotes the next one
+    assert len(await _statements(queries, client.delete(f"/api/products/images/{primary.id}"))) == 3
+
+
+async def test_category_writes(client, queries):
+    created = await client.post("/api/categories/", json={"name": "Phones", "slug": "phones"})
+    category_id = created.json()["id"]
+
+    assert await _statements(queries, client.put(f"/api/categories/{category_id}", json={"name": "Mobiles"})) == [
+        "UPDATE", "SELECT"
+    ]
+    assert await _statements(queries, client.delete(f"/api/categories/{category_id}")) == ["DELETE"]
+    assert await _statements(queries, client.post("/api/categories/", json={"name": "Tablets", "slug": "tablets"})) == [
+        "INSERT"
+    ]
+
+
+async def test_user_writes(client, user, queries):
+    assert await _statements(queries, client.put(f"/api/users/{user.id}", json={"first_name": "Renamed"})) == ["UPDATE"]
+    assert await _statements(queries, client.delete(f"/api/users/{user.id}")) == ["DELETE"]
+    assert await _statements(queries, client.post("/api/users/", json={
+        "email": "new@example.com", "first_name": "New", "last_name": "User"
+    })) == ["INSERT"]
@@ -0,0 +1,123 @@
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlmodel import select
+
+from app.models.order import Order, OrderItem
+from app.models.product import ProductImage
+from app.models.user import User
+
+
+@pytest.fixture
+def make_order(session, user, address):
+    """
+    Create an order for the test user from (product, quantity, price) lines.
+    """
+    started = datetime(2024, 1, 1)
+    counter = iter(range(1_000_000))
+
+    async def make_order(*lines, user_id=None, shipping_address_id=None) -> Order:
+        order = Order(
+            user_id=user_id or user.id,
+            shipping_address_id=shipping_address_id or address.id,
+            total_amount=sum(Decimal(price) * quantity for _, quantity, price in lines),
+            created_at=started + timedelta(minutes=next(counter))
+        )
+        session.add(order)
+        for product, quantity, price in lines:
+            session.add(OrderItem(order_id=order.id, product_id=product.id, quantity=quantity, price_at_purchase=Decimal(price)))
+        await session.commit()
+        return order
+
+    return make_order
+
+
+async def test_order_history_pages_newest_first(client, make_order, make_product):
+    product = await make_product()
+    orders = [await make_order((product, 1, "10.00")) for _ in range(5)]
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        body = (await client.get("/api/orders/me", params=params)).json()
+        seen += [order["id"] for order in body["items"]]
+        if not body["next_cursor"]:
+            break
+        params = {"limit": 2, "cursor": body["next_cursor"]}
+
+    assert seen == [str(order.id) for order in reversed(orders)]
+
+
+async def test_order_history_summarizes_lines_in_one_query(client, make_order, make_product, queries):
+    cheap, dear, bare = await make_product(), await make_product(), await make_product(images=0)
+    await make_order((cheap, 3, "5.00"), (dear, 1, "50.00"), (bare, 2, "1.00"))
+    for _ in range(10):
+        await make_order((cheap, 1, "5.00"))
+    await client.get("/api/orders/me")
+
+    queries.reset()
+    body = (await client.get("/api/orders/me", params={"limit": 20})).json()
+
+    # The current user and the page of orders
+    assert len(queries) <= 2, queries.statements
+    oldest = body["items"][-1]
+    assert (oldest["line_count"], oldest["item_count"]) == (3, 6)
+    assert oldest["thumbnail_url"] == f"https://img.example.com/{dear.slug}/0.jpg"
+
+
+async def test_order_history_rejects_bad_cursors(client, user):
+    response = await client.get("/api/orders/me", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+async def test_order_detail_has_one_line_per_item_with_several_primary_images(client, make_order, make_product, session, queries):
+    product = await make_product(images=0)
+    other = await make_product()
+    for order in (2, 1):
+        session.add(ProductImage(
+            product_id=product.id, image_url=f"https://img.example.com/{order}.jpg", is_primary=True, display_order=order
+        ))
+    await session.commit()
+    order = await make_order((product, 2, "12.00"), (other, 1, "3.00"))
+    await client.get(f"/api/orders/me/{order.id}")
+
+    queries.reset()
+    response = await client.get(f"/api/orders/me/{order.id}")
+
+    assert response.status_code == 200
+    assert len(queries) <= 3, queries.statements
+    body = response.json()
+    assert [(line["product_id"], line["image_url"]) for line in body["items"]] == [
+        (str(product.id), "https://img.example.com/1.jpg"),
+        (str(other.id), f"https://img.example.com/{other.slug}/0.jpg"),
+    ]
+    assert body["shipping_address"]["city"] == "Springfield"
+
+
+async def test_order_detail_is_only_shown_to_its_owner(client, make_order, make_product, session, address):
+    stranger = User(email="stranger@example.com", first_name="Some", last_name="One")
+    session.add(stranger)
+    await session.commit()
+    order = await make_order((await make_product(), 1, "1.00"), user_id=stranger.id)
+
+    assert (await client.get(f"/api/orders/me/{order.id}")).status_code == 404
+    assert (await client.get(f"/api/orders/me/{uuid.uuid4()}")).status_code == 404
+    assert (await client.get("/api/orders/me")).json()["items"] == []
+
+
+@pytest.mark.postgresql
+async def test_order_history_uses_the_composite_index(explain, user):
+    page = (
+        select(Order.id)
+        .where(Order.user_id == user.id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(21)
+    )
+
+    plan = await explain(page)
+
+    assert '"Index Name": "ix_orders_user_id_created_at_id"' in plan
+    assert '"Node Type": "Sort"' not in plan
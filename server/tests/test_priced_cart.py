@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+
+from app.models.product import ProductImage
+
+
+async def _fill_cart(client, products):
+    for product in products:
+        response = await client.post("/api/carts/me/items", json={"product_id": str(product.id), "quantity": 2})
+        assert response.status_code == 200
+
+
+@pytest.mark.parametrize("size", [1, 20])
+async def test_priced_cart_takes_two_statements_whatever_its_size(client, cart_store, make_product, queries, size):
+    await _fill_cart(client, [await make_product() for _ in range(size)])
+
+    queries.reset()
+    response = await client.get("/api/carts/me")
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == size
+    # The current user and the cart's products
+    assert len(queries) <= 2, queries.statements
+
+
+async def test_priced_cart_totals(client, cart_store, make_product, session):
+    regular = await make_product(price=Decimal("10.00"))
+    on_sale = await make_product(price=Decimal("20.00"), sale_price=Decimal("15.50"))
+    short = await make_product(price=Decimal("5.00"), stock_quantity=1)
+    inactive = await make_product(price=Decimal("7.00"))
+    await _fill_cart(client, [regular, on_sale, short, inactive])
+    inactive.is_active = False
+    await session.commit()
+
+    body = (await client.get("/api/carts/me")).json()
+
+    assert Decimal(body["subtotal"]) == Decimal("61.00")
+    assert Decimal(body["savings"]) == Decimal("9.00")
+    assert body["item_count"] == 6
+    assert body["all_in_stock"] is False
+    lines = {line["product_id"]: line for line in body["items"]}
+    assert lines[str(short.id)]["in_stock"] is False
+    assert lines[str(inactive.id)]["is_active"] is False
+
+
+async def test_priced_cart_shows_one_line_per_product_with_several_primary_images(client, cart_store, make_product, session):
+    product = await make_product(images=0)
+    for order in (2, 1):
+        session.add(ProductImage(
+            product_id=product.id, image_url=f"https://img.example.com/{order}.jpg", is_primary=True, display_order=order
+        ))
+    await session.commit()
+    await _fill_cart(client, [product])
+
+    body = (await client.get("/api/carts/me")).json()
+
+    assert [(line["product_id"], line["image_url"]) for line in body["items"]] == [
+        (str(product.id), "https://img.example.com/1.jpg")
+    ]
+    assert body["item_count"] == 2
+
+
+async def test_priced_cart_without_images(client, cart_store, make_product):
+    await _fill_cart(client, [await make_product(images=0)])
+
+    body = (await client.get("/api/carts/me")).json()
+
+    assert body["items"][0]["image_url"] is None
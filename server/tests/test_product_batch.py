@@ -0,0 +1,53 @@
+import uuid
+
+import pytest
+
+from app.schemas.product import PRODUCT_BATCH_MAX_KEYS
+
+
+async def _batch(client, **keys):
+    return await client.post("/api/products/batch", json=keys)
+
+
+async def test_batch_keeps_the_requested_order_and_reports_missing_keys(client, make_product):
+    first, second = await make_product(), await make_product()
+    unknown = uuid.uuid4()
+
+    response = await _batch(client, ids=[str(second.id), str(unknown)], slugs=["no-such-product", first.slug])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [str(second.id), str(first.id)]
+    assert body["missing_ids"] == [str(unknown)]
+    assert body["missing_slugs"] == ["no-such-product"]
+
+
+async def test_cached_batch_needs_no_queries(client, make_product, queries):
+    product = await make_product()
+    await _batch(client, ids=[str(product.id)], slugs=[product.slug])
+
+    queries.reset()
+    response = await _batch(client, ids=[str(product.id)], slugs=[product.slug])
+
+    assert response.status_code == 200
+    assert len(queries) == 0
+
+
+@pytest.mark.parametrize("ids, slugs", [
+    (PRODUCT_BATCH_MAX_KEYS + 1, 0),
+    (0, PRODUCT_BATCH_MAX_KEYS + 1),
+    (PRODUCT_BATCH_MAX_KEYS, 1),
+])
+async def test_batch_rejects_too_many_keys(client, ids, slugs):
+    response = await _batch(
+        client, ids=[str(uuid.uuid4()) for _ in range(ids)], slugs=[f"slug-{number}" for number in range(slugs)]
+    )
+
+    assert response.status_code == 422
+
+
+async def test_batch_accepts_the_key_limit(client):
+    response = await _batch(client, ids=[str(uuid.uuid4()) for _ in range(PRODUCT_BATCH_MAX_KEYS)])
+
+    assert response.status_code == 200
+    assert len(response.json()["missing_ids"]) == PRODUCT_BATCH_MAX_KEYS
@@ -0,0 +1,162 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.crud import product as product_crud
+from app.database import async_session_factory
+from app.services import cache as cache_module
+from app.services.cache import Cache, MemoryCacheBackend, RedisCacheBackend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+async def test_memory_backend_expires_entries(clock):
+    cache = Cache("test", MemoryCacheBackend(max_entries=10), ttl=60)
+    await cache.set("a", 1)
+
+    clock.now += 59
+    assert await cache.get("a") == 1
+    clock.now += 1
+    assert await cache.get("a") is None
+
+
+async def test_memory_backend_evicts_least_recently_used(clock):
+    cache = Cache("test", MemoryCacheBackend(max_entries=2), ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")
+    await cache.set("c", 3)
+
+    assert await cache.get_many(["a", "b", "c"]) == [1, None, 3]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+async def test_redis_backend_round_trips_values():
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisCacheBackend("redis://localhost:6379/0")
+    backend._client = fakeredis.FakeAsyncRedis()
+    cache = Cache("test", backend, ttl=60)
+
+    await cache.set_many({"json": {"id": "p1", "tags": [1, 2]}, "raw": b"{}"})
+    assert await cache.get_many(["json", "raw", "missing"]) == [{"id": "p1", "tags": [1, 2]}, b"{}", None]
+    assert 0 < await backend._client.pttl(cache._key("json")) <= 60000
+
+    await cache.delete("json")
+    assert await cache.get("json") is None
+    await cache.clear()
+    assert await cache.get("raw") is None
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_guarded_writes_skip_entries_whose_counter_moved(backend):
+    if backend == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisCacheBackend("redis://localhost:6379/0")
+        backend._client = fakeredis.FakeAsyncRedis()
+        backend._set_if_counter = backend._client.register_script(RedisCacheBackend._SET_IF_COUNTER_SCRIPT)
+    else:
+        backend = MemoryCacheBackend(max_entries=10)
+    cache = Cache("test", backend, ttl=60)
+    await cache.incr_many(["generation:a", "generation:b"])
+    read = await cache.get_counters(["generation:a", "generation:b", "generation:c"])
+
+    await cache.incr("generation:b")
+    await cache.set_many_if_counters([
+        ("a", 1, "generation:a", read[0]), ("b", 2, "generation:b", read[1]), ("c", 3, "generation:c", read[2])
+    ])
+
+    assert read == [1, 1, 0]
+    assert await cache.get_many(["a", "b", "c"]) == [1, None, 3]
+
+
+@pytest.fixture
+def rename_during_load(monkeypatch):
+    """
+    Rename a product and invalidate it right after the next primary read,
+    before that read's result is cached.
+    """
+    def rename_during_load(product, name):
+        original = product_crud.primary_session
+
+        @asynccontextmanager
+        async def primary_session(session):
+            async with original(session) as primary:
+                yield primary
+            monkeypatch.setattr(product_crud, "primary_session", original)
+            async with async_session_factory() as writer:
+                await product_crud.update_product(writer, product.id, {"name": name})
+
+        monkeypatch.setattr(product_crud, "primary_session", primary_session)
+
+    return rename_during_load
+
+
+@pytest.mark.parametrize("lookup", ["id", "slug", "batch"])
+async def test_a_miss_racing_an_update_does_not_cache_the_old_row(client, make_product, rename_during_load, lookup):
+    product = await make_product(name="Old")
+    url = {"id": f"/api/products/{product.id}", "slug": f"/api/products/slug/{product.slug}"}.get(lookup)
+    if lookup == "slug":
+        # The slug is mapped to its id, so the next miss knows which generation to read
+        await client.get(url)
+        await product_crud.invalidate_product_cache(product.id)
+
+    async def name():
+        if lookup == "batch":
+            return (await client.post("/api/products/batch", json={"ids": [str(product.id)]})).json()["items"][0]["name"]
+        return (await client.get(url)).json()["name"]
+
+    rename_during_load(product, "New")
+    assert await name() == "Old"
+    assert await name() == "New"
+
+
+async def test_product_detail_is_served_from_the_cache(client, make_product, queries):
+    product = await make_product()
+    await client.get(f"/api/products/{product.id}")
+
+    queries.reset()
+    by_id = await client.get(f"/api/products/{product.id}")
+    by_slug = await client.get(f"/api/products/slug/{product.slug}")
+
+    assert by_id.json()["name"] == by_slug.json()["name"] == product.name
+    assert len(queries) == 0
+    stats = (await client.get("/api/metrics/cache")).json()["product"]
+    assert stats["hits"] >= 2
+
+
+async def test_product_mutations_invalidate_the_cache(client, make_product):
+    product = await make_product(images=0)
+    url = f"/api/products/{product.id}"
+    await client.get(url)
+
+    await client.put(url, json={"name": "Renamed"})
+    assert (await client.get(url)).json()["name"] == "Renamed"
+
+    image = (await client.post("/api/products/images", json={
+        "product_id": str(product.id), "image_url": "https://img.example.com/a.jpg", "is_primary": True
+    })).json()
+    assert [item["id"] for item in (await client.get(url)).json()["images"]] == [image["id"]]
+
+    await client.put(f"/api/products/images/{image['id']}", json={"alt_text": "Front"})
+    assert (await client.get(url)).json()["images"][0]["alt_text"] == "Front"
+
+    await client.delete(f"/api/products/images/{image['id']}")
+    assert (await client.get(url)).json()["images"] == []
+
+    await client.delete(url)
+    assert (await client.get(url)).status_code == 404
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+from sqlmodel import func, select
+
+from app.models.product import Product
+from app.services import product_io
+
+
+def _product(category, number, **fields):
+    return {
+        "name": f"Imported {number}", "slug": f"imported-{number}", "description": "From a file",
+        "price": "12.50", "stock_quantity": 3, "category_id": str(category.id), **fields
+    }
+
+
+def _ndjson(*rows):
+    return "".join((row if isinstance(row, str) else json.dumps(row)) + "\n" for row in rows).encode()
+
+
+async def _import(client, body, file_format="ndjson"):
+    response = await client.post("/api/products/import", params={"format": file_format}, content=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_import_reports_failed_rows_by_line(client, category, session, monkeypatch):
+    monkeypatch.setattr(product_io, "PRODUCT_IMPORT_BATCH_SIZE", 2)
+    body = _ndjson(
+        _product(category, 1),
+        "{not json",
+        _product(category, 2, price="-1"),
+        _product(category, 3, category_id="00000000-0000-0000-0000-000000000000"),
+        _product(category, 4),
+        "[1, 2]",
+        _product(category, 5),
+    )
+
+    result = await _import(client, body)
+
+    assert (result["processed"], result["written"], result["failed"], result["unchanged"]) == (7, 3, 4, 0)
+    assert [error["line"] for error in result["errors"]] == [2, 3, 4, 6]
+    assert await session.scalar(select(func.count()).select_from(Product)) == 3
+
+
+async def test_reimport_updates_by_slug_and_skips_unchanged_rows(client, category, session):
+    await _import(client, _ndjson(_product(category, 1), _product(category, 2)))
+
+    result = await _import(client, _ndjson(_product(category, 1), _product(category, 2, price="20.00")))
+
+    assert (result["written"], result["unchanged"]) == (1, 1)
+    prices = dict((await session.execute(select(Product.slug, Product.price))).all())
+    assert {slug: str(price) for slug, price in prices.items()} == {"imported-1": "12.50", "imported-2": "20.00"}
+
+
+async def test_csv_import_with_a_multiline_field(client, category, session):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(_product(category, 1)))
+    writer.writeheader()
+    writer.writerow(_product(category, 1, description="Line one\nline two, \"quoted\""))
+    writer.writerow(_product(category, 2))
+
+    result = await _import(client, output.getvalue().encode(), "csv")
+
+    assert (result["written"], result["failed"]) == (2, 0)
+    description = await session.scalar(select(Product.description).where(Product.slug == "imported-1"))
+    assert description == 'Line one\nline two, "quoted"'
+
+
+async def test_export_round_trips_through_import(client, make_product):
+    for _ in range(3):
+        await make_product()
+
+    for file_format in ("ndjson", "csv"):
+        exported = await client.get("/api/products/export", params={"format": file_format})
+        assert exported.status_code == 200
+        assert exported.headers["content-disposition"] == f'attachment; filename="products.{file_format}"'
+
+        result = await _import(client, exported.content, file_format)
+        assert (result["processed"], result["written"], result["unchanged"]) == (3, 0, 3)
+
+
+async def test_import_rejects_non_utf8(client):
+    response = await client.post("/api/products/import", content="name\n\xe9".encode("latin-1"), params={"format": "csv"})
+
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+async def _keyset_pages(client, **params):
+    pages = []
+    response = await client.get("/api/products/", params={"pagination": "keyset", **params})
+    while True:
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = pages[-1]["next_cursor"]
+        if not cursor:
+            return pages
+        response = await client.get("/api/products/", params={"cursor": cursor, **params})
+
+
+async def test_keyset_pages_cover_the_listing_once(client, make_product):
+    for _ in range(7):
+        await make_product()
+
+    offset = await client.get("/api/products/", params={"limit": 100})
+    pages = await _keyset_pages(client, limit=3)
+
+    assert [len(page["items"]) for page in pages] == [3, 3, 1]
+    keyset_ids = [item["id"] for page in pages for item in page["items"]]
+    assert keyset_ids == [item["id"] for item in offset.json()["items"]]
+
+
+async def test_keyset_counts_the_total_on_the_first_page_only(client, make_product, queries):
+    for _ in range(5):
+        await make_product()
+
+    queries.reset()
+    pages = await _keyset_pages(client, limit=2)
+
+    assert [page["total"] for page in pages] == [5, None, None]
+    assert all(page["page"] is None for page in pages)
+    counts = [statement for statement in queries.statements if "count(" in statement.lower()]
+    assert len(counts) == 1
+
+
+async def test_keyset_pages_follow_the_sort(client, make_product):
+    for price in (30, 10, 20, 10):
+        await make_product(price=price)
+
+    pages = await _keyset_pages(client, limit=1, sort="price")
+
+    assert [page["items"][0]["price"] for page in pages] == ["10.00", "10.00", "20.00", "30.00"]
+
+
+async def test_empty_cursor_keeps_offset_pagination(client, make_product):
+    for _ in range(3):
+        await make_product()
+
+    response = await client.get("/api/products/", params={"cursor": "", "limit": 2, "skip": 2})
+
+    body = response.json()
+    assert body["page"] == 2
+    assert body["total"] == 3
+    assert len(body["items"]) == 1
+
+
+async def test_invalid_cursor_is_rejected(client, make_product):
+    response = await client.get("/api/products/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
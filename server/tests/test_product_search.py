@@ -0,0 +1,59 @@
+import pytest
+from sqlmodel import select
+
+from app.crud.product import _product_filters
+from app.database import async_engine
+from app.models.product import Product
+
+
+async def _search(client, search, **params):
+    response = await client.get("/api/products/", params={"search": search, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_search_matches_name_and_description(client, make_product):
+    await make_product(name="Sony Alpha camera", description="Mirrorless body")
+    await make_product(name="Canon camera", description="Sony compatible lens mount")
+    await make_product(name="Bose speaker", description="Portable")
+
+    body = await _search(client, "sony")
+
+    assert body["total"] == 2
+    assert {item["name"] for item in body["items"]} == {"Sony Alpha camera", "Canon camera"}
+
+
+async def test_search_requires_every_term_and_matches_prefixes(client, make_product):
+    await make_product(name="Sony Alpha camera")
+    await make_product(name="Sony headphones")
+
+    body = await _search(client, "son alp")
+
+    assert [item["name"] for item in body["items"]] == ["Sony Alpha camera"]
+
+
+async def test_punctuation_only_search_returns_nothing(client, make_product):
+    await make_product()
+
+    for search in ("!!!", "-", "&|:*"):
+        body = await _search(client, search)
+        assert body["total"] == 0
+        assert body["items"] == []
+
+
+async def test_blank_search_does_not_filter(client, make_product):
+    await make_product()
+    await make_product()
+
+    body = await _search(client, "   ")
+
+    assert body["total"] == 2
+
+
+@pytest.mark.postgresql
+async def test_search_uses_the_search_vector_index(database, explain):
+    filters, _ = _product_filters(async_engine.dialect.name, "sony camera", None)
+
+    plan = await explain(select(Product.id).where(*filters))
+
+    assert "ix_products_search_vector" in plan
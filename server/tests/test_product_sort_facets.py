@@ -0,0 +1,82 @@
+from app.models.category import Category
+from app.models.review import Review
+
+
+async def _names(client, **params):
+    response = await client.get("/api/products/", params=params)
+    assert response.status_code == 200
+    return [item["name"] for item in response.json()["items"]]
+
+
+async def test_sort_orders(client, make_product, session, user):
+    cheap = await make_product(name="Cheap", price=5)
+    await make_product(name="Pricey", price=50)
+    rated = await make_product(name="Rated", price=20)
+    session.add_all([
+        Review(product_id=rated.id, user_id=user.id, rating=5),
+        Review(product_id=cheap.id, user_id=user.id, rating=2),
+    ])
+    await session.commit()
+
+    assert await _names(client, sort="price") == ["Cheap", "Rated", "Pricey"]
+    assert await _names(client, sort="-price") == ["Pricey", "Rated", "Cheap"]
+    assert await _names(client, sort="newest") == ["Rated", "Pricey", "Cheap"]
+    assert await _names(client) == ["Rated", "Pricey", "Cheap"]
+    assert await _names(client, sort="rating") == ["Rated", "Cheap", "Pricey"]
+
+
+async def test_in_stock_filter(client, make_product):
+    await make_product(name="Available", stock_quantity=3)
+    await make_product(name="Sold out", stock_quantity=0)
+
+    assert await _names(client, in_stock="true") == ["Available"]
+    assert await _names(client, in_stock="false") == ["Sold out"]
+
+
+async def test_facets_come_from_one_grouped_query(client, make_product, session, category, queries):
+    other = Category(name="Laptops", slug="laptops")
+    session.add(other)
+    await session.commit()
+    await make_product(price=10, stock_quantity=0)
+    await make_product(price=30)
+    await make_product(price=120, category_id=other.id)
+    await make_product(price=600, is_active=False)
+
+    queries.reset()
+    body = (await client.get("/api/products/", params={
+        "facets": "true", "category_id": str(category.id), "total_mode": "none"
+    })).json()
+    facets = body["facets"]
+
+    # Each facet ignores its own filter: all active categories are counted
+    assert {item["category_id"]: item["count"] for item in facets["categories"]} == {
+        str(category.id): 2, str(other.id): 1
+    }
+    assert {bucket["min"]: bucket["count"] for bucket in facets["price_buckets"] if bucket["count"]} == {
+        "0": 1, "25": 1
+    }
+    assert facets["stock"] == {"in_stock": 1, "out_of_stock": 1}
+    assert len([statement for statement in queries.statements if "GROUP BY" in statement]) == 1
+
+
+async def test_facets_respect_the_other_filters(client, make_product):
+    await make_product(price=10, stock_quantity=0)
+    await make_product(price=30)
+    await make_product(price=40)
+
+    facets = (await client.get("/api/products/", params={
+        "facets": "true", "in_stock": "true", "price_min": 20
+    })).json()["facets"]
+
+    assert [item["count"] for item in facets["categories"]] == [2]
+    assert facets["stock"] == {"in_stock": 2, "out_of_stock": 0}
+
+
+async def test_facets_are_cached_per_catalog_version(client, make_product, queries):
+    await make_product()
+    await client.get("/api/products/", params={"facets": "true"})
+
+    queries.reset()
+    await client.get("/api/products/", params={"facets": "true"})
+
+    assert not [statement for statement in queries.statements if "GROUP BY" in statement]
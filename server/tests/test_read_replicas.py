@@ -0,0 +1,135 @@
+import itertools
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from app import database as db
+from app.middleware import read_your_writes
+from app.models.category import Category
+from app.models.product import Product
+from app.services.catalog import bump_catalog_version
+from app.services.counts import count_cache
+from app.utils.http_cache import REPLICA_CACHE_CONTROL
+
+
+@pytest.fixture
+async def replicas(database, session, tmp_path, monkeypatch):
+    """
+    Two SQLite stand-in replicas, each holding one category named after it,
+    while the primary holds a "Primary" category.
+    """
+    session.add(Category(name="Primary", slug="primary"))
+    await session.commit()
+
+    engines = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica-{number}.db") for number in range(2)]
+    for number, engine in enumerate(engines):
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        await _add(engine, Category(name=f"Replica {number}", slug=f"replica-{number}"))
+
+    monkeypatch.setattr(db, "replica_engines", engines)
+    monkeypatch.setattr(db, "replica_session_factories", [db._create_session_factory(engine) for engine in engines])
+    monkeypatch.setattr(db, "_replica_cycle", itertools.cycle(range(len(engines))))
+    yield engines
+    for engine in engines:
+        await engine.dispose()
+
+
+async def _add(engine, *objects):
+    async with db._create_session_factory(engine)() as session:
+        session.add_all(objects)
+        await session.commit()
+
+
+async def _category_names(client, **headers):
+    response = await client.get("/api/categories/", headers=headers)
+    return [item["name"] for item in response.json()["items"]]
+
+
+async def test_reads_rotate_over_the_replicas(client, replicas):
+    assert [await _category_names(client) for _ in range(3)] == [["Replica 0"], ["Replica 1"], ["Replica 0"]]
+
+
+async def test_least_loaded_picks_the_idle_replica(client, replicas, monkeypatch):
+    monkeypatch.setattr(db, "DB_REPLICA_SELECTION", "least_loaded")
+
+    async with replicas[0].connect():
+        assert await _category_names(client) == ["Replica 1"]
+    async with replicas[1].connect():
+        assert await _category_names(client) == ["Replica 0"]
+
+
+async def test_recent_writers_read_from_the_primary(client, replicas):
+    pinned = {db.READ_PRIMARY_HEADER: f"{time.time() + 5:.3f}"}
+    expired = {db.READ_PRIMARY_HEADER: f"{time.time() - 1:.3f}"}
+
+    assert await _category_names(client, **pinned) == ["Primary"]
+    assert await _category_names(client, **expired) == ["Replica 0"]
+
+
+async def test_writes_pin_reads_to_the_primary(monkeypatch):
+    monkeypatch.setattr(read_your_writes, "replica_engines", [object()])
+    app = FastAPI()
+    app.post("/items")(lambda: {})
+    app.get("/items")(lambda: {})
+    read_your_writes.setup_read_your_writes_middleware(app)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        write = await client.post("/items")
+        read = await client.get("/items")
+
+    until = float(write.headers[db.READ_PRIMARY_HEADER])
+    assert time.time() < until <= time.time() + db.DB_READ_YOUR_WRITES_SECONDS
+    assert write.cookies[db.READ_PRIMARY_COOKIE] == write.headers[db.READ_PRIMARY_HEADER]
+    assert db.READ_PRIMARY_HEADER not in read.headers
+
+
+async def test_caches_are_filled_from_the_primary(client, replicas, make_product):
+    product = await make_product(name="Fresh")
+    for engine in replicas:
+        await _add(engine, Product(
+            id=product.id, name="Stale", slug=product.slug, description="", price=product.price,
+            stock_quantity=product.stock_quantity, category_id=product.category_id
+        ))
+
+    assert (await client.get(f"/api/products/{product.id}")).json()["name"] == "Fresh"
+    assert (await client.get(f"/api/products/slug/{product.slug}")).json()["name"] == "Fresh"
+    batch = await client.post("/api/products/batch", json={"ids": [str(product.id)]})
+    assert [item["name"] for item in batch.json()["items"]] == ["Fresh"]
+
+    tree = await client.get("/api/categories/tree")
+    assert [item["name"] for item in tree.json()["items"]] == ["Phones", "Primary"]
+
+
+async def test_counts_read_from_a_replica_are_not_cached(client, replicas):
+    cached = count_cache.backend.size()
+
+    response = await client.get("/api/categories/", params={"total_mode": "estimate"})
+    facets = await client.get("/api/products/", params={"facets": "true"})
+
+    assert response.json()["total"] == 1
+    assert facets.status_code == 200
+    assert count_cache.backend.size() == cached
+
+
+async def test_listings_read_from_a_lagging_replica_get_no_catalog_etag(client, replicas, session):
+    pinned = {db.READ_PRIMARY_HEADER: f"{time.time() + 5:.3f}"}
+    session.add(Category(name="Added", slug="added"))
+    await session.commit()
+    await bump_catalog_version()
+
+    primary = await client.get("/api/categories/", headers=pinned)
+    lagging = await client.get("/api/categories/")
+    products = await client.get("/api/products/")
+    revalidated = await client.get("/api/categories/", headers={"If-None-Match": primary.headers["etag"]})
+
+    assert sorted(item["name"] for item in primary.json()["items"]) == ["Added", "Primary"]
+    assert [item["name"] for item in lagging.json()["items"]] == ["Replica 0"]
+    for response in (lagging, products):
+        assert "etag" not in response.headers
+        assert response.headers["cache-control"] == REPLICA_CACHE_CONTROL
+    assert revalidated.status_code == 304
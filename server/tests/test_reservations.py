@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import func, select
+
+from app.crud import reservation as reservation_crud
+from app.database import async_session_factory
+from app.models.reservation import ReservationStatus, StockReservation
+from app.services.stock_store import HoldSweeper, MemoryStockStore, RedisStockStore
+
+
+@pytest.fixture
+def stock_store(monkeypatch) -> MemoryStockStore:
+    store = MemoryStockStore()
+    monkeypatch.setattr(reservation_crud, "stock_store", store)
+    return store
+
+
+async def _available(store, product) -> int:
+    return store._available[str(product.id)]
+
+
+async def _held(session, product) -> int:
+    return await session.scalar(
+        select(func.coalesce(func.sum(StockReservation.quantity), 0))
+        .where(StockReservation.product_id == product.id, StockReservation.status == ReservationStatus.HELD)
+    )
+
+
+async def _hold(owner_key, quantities):
+    async with async_session_factory() as session:
+        return await reservation_crud.hold_stock(session, owner_key, quantities)
+
+
+async def test_holding_a_cart_takes_its_stock_once(client, cart_store, stock_store, make_product, session):
+    product = await make_product(stock_quantity=5)
+    await client.post("/api/carts/me/items", json={"product_id": str(product.id), "quantity": 2})
+
+    first = await client.post("/api/carts/me/reservation")
+    again = await client.post("/api/carts/me/reservation")
+
+    assert (first.status_code, again.status_code) == (200, 200)
+    assert first.json()["items"] == [{"product_id": str(product.id), "quantity": 2}]
+    assert await _available(stock_store, product) == 3
+    assert await _held(session, product) == 2
+
+    await client.put(f"/api/carts/me/items/{product.id}", json={"quantity": 1})
+    await client.post("/api/carts/me/reservation")
+    assert await _available(stock_store, product) == 4
+
+    assert (await client.delete("/api/carts/me/reservation")).status_code == 204
+    assert await _available(stock_store, product) == 5
+    assert await _held(session, product) == 0
+
+
+async def test_short_holds_take_nothing(stock_store, make_product, session):
+    scarce, plenty = await make_product(stock_quantity=1), await make_product(stock_quantity=10)
+
+    with pytest.raises(HTTPException) as error:
+        await _hold("session:buyer-0000000001", {scarce.id: 2, plenty.id: 1})
+
+    assert error.value.status_code == 409
+    assert error.value.detail["product_ids"] == [str(scarce.id)]
+    assert (await _available(stock_store, scarce), await _available(stock_store, plenty)) == (1, 10)
+    assert await _held(session, plenty) == 0
+
+
+async def test_counters_are_loaded_net_of_open_holds(stock_store, make_product):
+    product = await make_product(stock_quantity=5)
+    await _hold("session:buyer-0000000001", {product.id: 2})
+
+    await reservation_crud.forget_available_stock([product.id])
+    await _hold("session:buyer-0000000002", {product.id: 1})
+
+    assert await _available(stock_store, product) == 2
+
+
+async def test_sweeper_releases_expired_holds(stock_store, make_product, session):
+    product = await make_product(stock_quantity=5)
+    await _hold("session:buyer-0000000001", {product.id: 2})
+    await _hold("session:buyer-0000000002", {product.id: 1})
+    await session.execute(
+        update(StockReservation)
+        .where(StockReservation.owner_key == "session:buyer-0000000001")
+        .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    await session.commit()
+
+    sweeper = HoldSweeper(reservation_crud.release_expired_holds, interval=1, batch_size=1)
+
+    assert await sweeper.run_once() == 1
+    assert await _available(stock_store, product) == 4
+    assert await _held(session, product) == 1
+    assert await sweeper.run_once() == 0
+
+
+async def test_concurrent_holds_never_exceed_stock(stock_store, make_product, session):
+    product = await make_product(stock_quantity=10)
+
+    async def hold(number):
+        try:
+            await _hold(f"session:buyer-{number:010d}", {product.id: 1})
+            return True
+        except HTTPException:
+            return False
+
+    results = await asyncio.gather(*[hold(number) for number in range(30)])
+
+    assert sum(results) == 10
+    assert await _held(session, product) == 10
+    assert await _available(stock_store, product) == 0
+
+
+async def test_redis_stock_store_takes_all_or_nothing():
+    store = RedisStockStore("redis://localhost:6379/0")
+    store._client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    store._take = store._client.register_script(RedisStockStore._TAKE_SCRIPT)
+    store._give = store._client.register_script(RedisStockStore._GIVE_SCRIPT)
+
+    await store.load({"a": 2, "b": 1})
+    await store.load({"a": 9})
+    assert await store.missing(["a", "b", "c"]) == ["c"]
+
+    assert await store.take({"a": 1, "b": 2}) == ["b"]
+    assert await store.take({"a": 2, "b": 1}) == []
+    await store.give({"a": 1, "c": 5})
+
+    assert await store.take({"a": 1}) == []
+    assert await store.take({"a": 1}) == ["a"]
+    assert await store.missing(["c"]) == ["c"]
+
+    await store.mark_holder("session:s", 60)
+    assert await store.is_holder("session:s")
+    assert not await store.is_holder("session:t")
@@ -0,0 +1,45 @@
+import json
+import uuid
+from decimal import Decimal
+
+import orjson
+
+from app.database import async_session_factory
+from app.services import product_io
+from app.services.product_io import ProductFileFormat, export_products
+from app.utils.responses import dumps
+
+
+class DriverUUID(uuid.UUID):
+    """A UUID subclass, like the ones asyncpg returns."""
+
+
+def test_dumps_renders_decimals_and_uuid_subclasses_as_strings():
+    value = DriverUUID(str(uuid.uuid4()))
+
+    encoded = dumps({"price": Decimal("10.10"), "id": value, 1: "key"}, newline=True)
+
+    assert encoded.endswith(b"\n")
+    assert orjson.loads(encoded) == {"price": "10.10", "id": str(value), "1": "key"}
+
+
+async def test_list_responses_are_rendered_with_orjson(client, make_product):
+    product = await make_product()
+
+    response = await client.get("/api/products/", params={"total_mode": "none"})
+
+    assert response.headers["content-type"] == "application/json"
+    # orjson writes no whitespace between tokens, unlike json.dumps' defaults
+    assert b'","' in response.content and b'", "' not in response.content
+    assert json.loads(response.content)["items"][0]["price"] == str(product.price)
+
+
+async def test_export_is_streamed_one_batch_per_chunk(make_product, monkeypatch):
+    monkeypatch.setattr(product_io, "PRODUCT_EXPORT_BATCH_SIZE", 2)
+    products = [await make_product() for _ in range(5)]
+
+    chunks = [chunk async for chunk in export_products(async_session_factory, ProductFileFormat.NDJSON)]
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+    exported = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert sorted(row["slug"] for row in exported) == sorted(product.slug for product in products)
@@ -0,0 +1,68 @@
+import hashlib
+import time
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.middleware import authentication
+from app.middleware.authentication import token_cache, verify_jwt_token
+from app.services import cache as cache_module
+
+
+@pytest.fixture
+async def decoder(monkeypatch):
+    """
+    Replace signature verification with a stub that counts its calls.
+    """
+    calls = []
+
+    async def decode(token):
+        calls.append(token)
+        return {"sub": token, "exp": time.time() + 10}
+
+    monkeypatch.setattr(authentication, "decode_clerk_token", decode)
+    await token_cache.clear()
+    return calls
+
+
+async def _verify(token):
+    return await verify_jwt_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+
+async def test_repeated_tokens_are_decoded_once(decoder):
+    hits = token_cache.hits
+
+    for _ in range(3):
+        assert (await _verify("token-a"))["sub"] == "token-a"
+    await _verify("token-b")
+
+    assert decoder == ["token-a", "token-b"]
+    assert token_cache.hits == hits + 2
+
+
+async def test_cached_claims_expire_with_the_token(decoder, monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    await _verify("token-a")
+
+    now += 9
+    await _verify("token-a")
+    now += 2
+    await _verify("token-a")
+
+    assert decoder == ["token-a", "token-a"]
+
+
+async def test_callers_cannot_modify_cached_claims(decoder):
+    claims = await _verify("token-a")
+    claims["sub"] = "someone-else"
+
+    assert (await _verify("token-a"))["sub"] == "token-a"
+
+
+async def test_token_cache_is_keyed_by_token_hash(decoder):
+    await _verify("secret-token")
+
+    keys = list(token_cache.backend._entries)
+    assert len(keys) == 1
+    assert keys[0].endswith(hashlib.sha256(b"secret-token").hexdigest())
@@ -0,0 +1,55 @@
+import asyncio
+
+from sqlmodel import func, select
+
+from app.crud.user import user_cache
+from app.models.user import User
+
+PROFILE = {"first_name": "Test", "last_name": "Buyer"}
+
+
+async def test_first_sync_creates_the_user_in_one_statement(client, queries):
+    queries.reset()
+    response = await client.post("/api/users/sync", json=PROFILE)
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "buyer@example.com"
+    assert len(queries) == 1
+
+
+async def test_unchanged_sync_skips_the_write(client, queries):
+    first = (await client.post("/api/users/sync", json=PROFILE)).json()
+
+    queries.reset()
+    cached = await client.post("/api/users/sync", json=PROFILE)
+    assert cached.json() == first
+    assert len(queries) == 0
+
+    # Without the cache the upsert matches no changed row and writes nothing
+    await user_cache.clear()
+    queries.reset()
+    uncached = await client.post("/api/users/sync", json=PROFILE)
+    assert uncached.json() == first
+    assert uncached.json()["updated_at"] is None
+    assert [statement.split()[0] for statement in queries.statements] == ["INSERT", "SELECT"]
+
+
+async def test_changed_sync_updates_the_user(client, queries):
+    first = (await client.post("/api/users/sync", json=PROFILE)).json()
+
+    queries.reset()
+    updated = (await client.post("/api/users/sync", json={**PROFILE, "last_name": "Seller"})).json()
+
+    assert updated["id"] == first["id"]
+    assert updated["last_name"] == "Seller"
+    assert updated["updated_at"] is not None
+    assert len(queries) == 1
+    assert (await client.get("/api/users/me")).json()["last_name"] == "Seller"
+
+
+async def test_concurrent_first_syncs_create_one_user(client, session):
+    responses = await asyncio.gather(*[client.post("/api/users/sync", json=PROFILE) for _ in range(5)])
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert await session.scalar(select(func.count()).select_from(User)) == 1